@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import numpy
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+import neat
+import utils
+from settings import *
+from level import Level
+from player import Player
+from ui import UI
+from neat_game import Neat, eval_genomes, eval_genomes_multiple
+from fitness_cache import fitness_cache
+
+
+def seed(value=BENCHMARK_SEED):
+    """
+    Seed random generators used by clouds, NEAT and numpy, so that every run simulates the same frames
+    """
+    random.seed(value)
+    numpy.random.seed(value)
+
+
+def summary(durations, units=1):
+    """
+    Summarize measured durations
+    :param durations: durations of runs in seconds
+    :param units: number of measured units (frames, calls) in one run
+    :return: dict with run count, mean and best time of a run in milliseconds and units per second
+    """
+    total = sum(durations)
+    return {
+        'runs': len(durations),
+        'units': units,
+        'mean_ms': total / len(durations) * 1000,
+        'best_ms': min(durations) * 1000,
+        'per_second': units * len(durations) / total if total else None,
+    }
+
+
+def timed(function, repeat):
+    """
+    Time repeated calls of a function
+    :param function: function without arguments
+    :param repeat: number of calls
+    :return: list of durations in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def init_sound(draw):
+    """
+    Drawn level plays music, so mixer is initialized with silent driver while drawing is benchmarked. Without
+    drawing mixer stays off, the same as in headless training.
+    """
+    if draw:
+        # Driver is read when mixer is initialized, so variable doesn't have to outlive it
+        with utils.environment(SDL_AUDIODRIVER='dummy'):
+            pygame.mixer.init()
+    else:
+        pygame.mixer.quit()
+
+
+def create_level(screen, draw):
+    """
+    Create level 0 with a single NEAT player, the way it is trained
+    :return: level
+    """
+    player = Player((0, 0), neat=True)
+    ui = UI(screen, player) if draw else None
+    return Level(level_0, screen, player, ui, neat=True, draw=draw)
+
+
+def bench_level_run(screen, frames, draw):
+    """
+    Frames per second of Level.run. Player takes random decisions from seeded generator and level is reset whenever
+    player is defeated or completes it.
+    """
+    seed()
+    init_sound(draw)
+    level = create_level(screen, draw)
+    player = level.player
+    state = level.snapshot()
+    decisions = numpy.random.randint(0, 6, frames)
+
+    def run():
+        for decision in decisions:
+            level.run()
+            player.make_decision(decision)
+            if level.check_defeat(player) or level.completed:
+                level.reset(state)
+    return summary(timed(run, 1), frames)
+
+
+def bench_fov(screen, calls):
+    """
+    Level.fov calls per second. Player runs 50 frames into the level first and then stays in place, so every call
+    builds the same window away from the level start.
+    """
+    seed()
+    level = create_level(screen, False)
+    player = level.player
+    for _ in range(50):
+        player.make_decision(1)
+        level.run()
+
+    def run():
+        for _ in range(calls):
+            level.fov(player)
+    return summary(timed(run, 1), calls)
+
+
+def bench_level_init(screen, repeat, draw):
+    """
+    Construction time of Level with its player
+    """
+    seed()
+    init_sound(draw)
+    create_level(screen, draw)
+    return summary(timed(lambda: create_level(screen, draw), repeat))
+
+
+def bench_player_init(repeat, cached):
+    """
+    Construction time of Player, either with assets already cached or loaded from disk for every player
+    """
+    Player((0, 0))
+
+    def create():
+        if not cached:
+            utils.clear_cache()
+        Player((0, 0))
+    return summary(timed(create, repeat))
+
+
+def bench_generation(generations, multiple):
+    """
+    Time of evaluating one NEAT generation with eval_genomes or eval_genomes_multiple, headless and without drawing.
+    Population is created from seeded generator, reproduction between generations isn't measured. Fitness cache is
+    cleared first, so that earlier runs don't make evaluation faster.
+    """
+    seed()
+    fitness_cache.clear()
+    flags = Neat.draw, Neat.headless, Neat.generation
+    Neat.draw = False
+    Neat.headless = True
+    config = Neat.config_multiple if multiple else Neat.config
+    evaluate = eval_genomes_multiple if multiple else eval_genomes
+    durations = []
+
+    def timed_evaluate(genomes, config):
+        start = time.perf_counter()
+        evaluate(genomes, config)
+        durations.append(time.perf_counter() - start)
+
+    population = neat.Population(config)
+    try:
+        population.run(timed_evaluate, generations)
+    finally:
+        Neat.draw, Neat.headless, Neat.generation = flags
+    result = summary(durations, config.pop_size)
+    result['genomes'] = config.pop_size
+    return result
+
+
+def commit():
+    """
+    Get current git commit of the repository, if there is one
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(frames=1000, calls=10000, repeat=20, generations=2, names=None):
+    """
+    Run benchmarks headless with fixed seed
+    :param frames: frames of Level.run for each mode
+    :param calls: calls of Level.fov
+    :param repeat: number of Level and Player constructions
+    :param generations: number of NEAT generations for each mode
+    :param names: names of benchmarks to run, all by default
+    :return: dict with environment info and results by benchmark name
+    """
+    screen = utils.init_headless()
+    benchmarks = {
+        'level_run_draw': lambda: bench_level_run(screen, frames, True),
+        'level_run_no_draw': lambda: bench_level_run(screen, frames, False),
+        'level_fov': lambda: bench_fov(screen, calls),
+        'level_init': lambda: bench_level_init(screen, repeat, False),
+        'level_init_draw': lambda: bench_level_init(screen, repeat, True),
+        'player_init': lambda: bench_player_init(repeat, False),
+        'player_init_cached': lambda: bench_player_init(repeat, True),
+        'neat_generation': lambda: bench_generation(generations, False),
+        'neat_generation_multiple': lambda: bench_generation(generations, True),
+    }
+    unknown = set(names or ()) - set(benchmarks)
+    if unknown:
+        raise ValueError(f'Unknown benchmarks {sorted(unknown)}, choose from {list(benchmarks)}')
+
+    results = {}
+    for name, benchmark in benchmarks.items():
+        if names and name not in names:
+            continue
+        results[name] = benchmark()
+    pygame.mixer.quit()
+    return {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': numpy.__version__,
+        'seed': BENCHMARK_SEED,
+        'network': NEAT_NETWORK,
+        'results': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure simulation, rendering and training throughput')
+    parser.add_argument('names', nargs='*', help='benchmarks to run, all by default')
+    parser.add_argument('--frames', type=int, default=1000)
+    parser.add_argument('--calls', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--generations', type=int, default=2)
+    parser.add_argument('--output', help='json file for results, printed to stdout by default')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.frames, args.calls, args.repeat, args.generations, args.names)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
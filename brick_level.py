@@ -1,7 +1,9 @@
 import pygame
 import os
+import time
 from settings import *
 from level import Level
+from replay import Replay, encode_keys, player_results, player_state, replay_path
 
 
 class LevelBrick(pygame.sprite.Sprite):
@@ -14,6 +16,7 @@ class LevelBrick(pygame.sprite.Sprite):
         inactive - image for inactive levels
         created_level - checks whether level has already been created
         associated_level - Level instance, associated with current brick
+        replay - recording of the level until it's completed or player is defeated, None if REPLAY_DIR isn't set
         stop_level - flag to determine whether execution of level should be stopped
         :param name: name of the level
         :param pos: position of the brick
@@ -32,6 +35,7 @@ class LevelBrick(pygame.sprite.Sprite):
         # Flags
         self.created_level = False
         self.associated_level = None
+        self.replay = None
         self.stop_level = False
 
         # Images
@@ -62,6 +66,8 @@ class LevelBrick(pygame.sprite.Sprite):
         Create associated level
         """
         self.associated_level = Level(level_bricks[self.name]['level'], surface, player, ui)
+        if REPLAY_DIR:
+            self.replay = Replay('play', level_bricks[self.name]['level'], player=player_state(player))
 
     def run_level(self, surface, player, ui):
         """
@@ -78,6 +84,8 @@ class LevelBrick(pygame.sprite.Sprite):
             self.create_level(surface, player, ui)
             self.created_level = True
         self.associated_level.run()
+        if self.replay is not None:
+            self.record(player)
 
         if self.associated_level.completed:
             self.completed = True
@@ -86,6 +94,18 @@ class LevelBrick(pygame.sprite.Sprite):
             self.stop_level = True
             self.associated_level.back_to_menu = False
 
+    def record(self, player):
+        """
+        Record keys player pressed in the last frame. Replay is saved once level is completed or player is defeated.
+        :param player: player's object
+        """
+        level = self.associated_level
+        self.replay.record(encode_keys(player.keys))
+        if level.completed or level.check_defeat(player):
+            self.replay.info['results'] = [player_results(level, player, 0, len(self.replay) - 1)]
+            self.replay.save(replay_path(f'{self.name}_{time.strftime("%Y%m%d_%H%M%S")}'))
+            self.replay = None
+
     def is_completed(self):
         """
         Function to determine whether to draw check sign on a level
@@ -0,0 +1,225 @@
+import gzip
+import io
+import itertools
+import logging
+import os
+import pickle
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import neat
+from settings import *
+
+CHECKPOINT_FORMAT = 'incremental-1'
+
+log = logging.getLogger("checkpoint")
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter('%(module)s - %(levelname)s - %(message)s'))
+log.addHandler(stream_handler)
+log.setLevel(logging.INFO)
+
+
+class StatePickler(pickle.Pickler):
+    """
+    Pickler of population and species which stores genomes and reporters by reference. Genomes are saved
+    separately, only once for all checkpoints based on the same full checkpoint, and reporters are recreated on
+    restore.
+    """
+    def __init__(self, file, genomes, reporters):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.genomes = genomes
+        self.reporters = reporters
+
+    def persistent_id(self, obj):
+        if obj is self.reporters:
+            return 'reporters',
+        key = getattr(obj, 'key', None)
+        if key is not None and self.genomes.get(key) is obj:
+            return 'genome', key
+        return None
+
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, genomes):
+        super().__init__(file)
+        self.genomes = genomes
+
+    def persistent_load(self, pid):
+        if pid[0] == 'genome':
+            return self.genomes[pid[1]]
+        return None
+
+
+class Checkpointer(neat.reporting.BaseReporter):
+    """
+    NEAT reporter saving population, species, statistics and random state at the end of generations. Checkpoints
+    are incremental: genomes saved by earlier checkpoint aren't saved again, since NEAT never changes genes of a
+    genome once it's created, so a checkpoint stores only new genomes and new statistics and refers to the previous
+    one. Every full_interval checkpoints all genomes are saved, so restoring reads a short chain of files.
+    Fitness is the only thing evaluation changes in a genome, even in genomes already saved, so it's captured for
+    every genome of the checkpoint by training thread and restored from the checkpoint the population is restored
+    from. Training thread only pickles species and config and collects fitness values, genomes are pickled,
+    compressed and written in a background thread.
+    """
+    def __init__(self, interval=NEAT_CHECKPOINT, prefix=NEAT_CHECKPOINT_PREFIX,
+                 full_interval=NEAT_CHECKPOINT_FULL_INTERVAL, stats=None):
+        """
+        saved - genomes saved since the last full checkpoint, by key
+        statistics_saved - number of generations of statistics saved
+        last_path - path of the last checkpoint, the next one refers to it
+        checkpoints - number of checkpoints since the last full checkpoint
+        busy - time training thread spent on checkpoints, in seconds
+        :param interval: checkpoint is saved every interval generations
+        :param prefix: prefix of checkpoint paths, generation number is added to it
+        :param full_interval: number of checkpoints between full checkpoints
+        :param stats: neat.StatisticsReporter whose statistics are saved, if any
+        """
+        if not isinstance(interval, int) or interval < 1 or not isinstance(full_interval, int) or full_interval < 1:
+            raise ValueError(f'Checkpoint intervals should be positive integers, not {interval}, {full_interval}')
+        self.interval = interval
+        self.prefix = prefix
+        self.full_interval = full_interval
+        self.stats = stats
+        self.generation = None
+        self.saved = {}
+        self.statistics_saved = 0
+        self.last_path = None
+        self.checkpoints = 0
+        self.busy = 0
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def end_generation(self, config, population, species_set):
+        """
+        Save checkpoint of the population of the next generation if it's due
+        """
+        if (self.generation + 1) % self.interval == 0:
+            self.save(config, population, species_set, self.generation + 1)
+
+    def save(self, config, population, species_set, generation):
+        """
+        Pickle new part of the state and write it in background
+        :param config: NEAT config
+        :param population: dict of genomes by key
+        :param species_set: species of the population
+        :param generation: generation the population belongs to
+        """
+        start = time.perf_counter()
+        full = self.last_path is None or self.checkpoints % self.full_interval == 0
+        if full:
+            self.saved = {}
+            self.statistics_saved = 0
+            self.checkpoints = 0
+        genomes = {key: genome for key, genome in population.items() if self.saved.get(key) is not genome}
+        for species in species_set.species.values():
+            representative = species.representative
+            if representative is not None and self.saved.get(representative.key) is not representative:
+                genomes[representative.key] = representative
+        self.saved.update(genomes)
+        # Next generation sets fitness of the same genome objects while they are pickled in background
+        fitnesses = {key: genome.fitness for key, genome in population.items()}
+        for species in species_set.species.values():
+            if species.representative is not None:
+                fitnesses[species.representative.key] = species.representative.fitness
+
+        # Species and config change in the next generation, so they are pickled right away, while genes and
+        # statistics are never changed once created and are pickled in background together with compression
+        buffer = io.BytesIO()
+        StatePickler(buffer, self.saved, species_set.reporters).dump((list(population), species_set))
+        statistics = None
+        if self.stats is not None:
+            statistics = (self.stats.most_fit_genomes[self.statistics_saved:],
+                          self.stats.generation_statistics[self.statistics_saved:])
+            self.statistics_saved = len(self.stats.most_fit_genomes)
+        checkpoint = {
+            'format': CHECKPOINT_FORMAT,
+            'generation': generation,
+            'base': None if full else os.path.basename(self.last_path),
+            'config': pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL),
+            'genomes': genomes,
+            'fitnesses': fitnesses,
+            'state': buffer.getvalue(),
+            'statistics': statistics,
+            'random': random.getstate(),
+        }
+
+        path = f'{self.prefix}{generation}'
+        self.wait()
+        self.pending = self.executor.submit(self.write, path, checkpoint)
+        self.last_path = path
+        self.checkpoints += 1
+        self.busy += time.perf_counter() - start
+
+    @staticmethod
+    def write(path, checkpoint):
+        """
+        Pickle, compress and write checkpoint. File is replaced at once, so it's never left half written.
+        """
+        data = pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=NEAT_CHECKPOINT_COMPRESSION))
+        os.replace(temporary, path)
+        log.info(f'Saved checkpoint {path}')
+
+    def wait(self):
+        """
+        Wait for the last checkpoint to be written, error of writing it is logged
+        """
+        if self.pending is not None:
+            error = self.pending.exception()
+            if error is not None:
+                log.error(f'Checkpoint {self.last_path} wasn\'t saved: {error!r}')
+            self.pending = None
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
+
+
+def read_checkpoint(path):
+    with gzip.open(path) as f:
+        return pickle.load(f)
+
+
+def restore_checkpoint(path, stats=None):
+    """
+    Restore population from checkpoint saved by Checkpointer, or by neat.Checkpointer
+    :param path: path of the checkpoint
+    :param stats: neat.StatisticsReporter to restore saved statistics into
+    :return: neat.Population
+    """
+    data = read_checkpoint(path)
+    if not isinstance(data, dict) or data.get('format') != CHECKPOINT_FORMAT:
+        return neat.Checkpointer.restore_checkpoint(path)
+
+    chain = [data]
+    while chain[-1]['base'] is not None:
+        chain.append(read_checkpoint(os.path.join(os.path.dirname(path), chain[-1]['base'])))
+    genomes = {}
+    most_fit_genomes, generation_statistics = [], []
+    for checkpoint in reversed(chain):
+        genomes.update(checkpoint['genomes'])
+        if checkpoint['statistics'] is not None:
+            most_fit_genomes += checkpoint['statistics'][0]
+            generation_statistics += checkpoint['statistics'][1]
+
+    for key, fitness in data['fitnesses'].items():
+        genomes[key].fitness = fitness
+    keys, species_set = StateUnpickler(io.BytesIO(data['state']), genomes).load()
+    population = neat.Population(pickle.loads(data['config']), ({key: genomes[key] for key in keys}, species_set,
+                                                  data['generation']))
+    species_set.reporters = population.reporters
+    # New genomes shouldn't reuse keys of existing ones
+    population.reproduction.genome_indexer = itertools.count(max(genomes) + 1)
+    random.setstate(data['random'])
+    if stats is not None:
+        stats.most_fit_genomes = most_fit_genomes
+        stats.generation_statistics = generation_statistics
+    return population
@@ -1,4 +1,4 @@
-coverage run --source=game,brick_level,decoration,endgame,highscore,level,maker,overworld,particle,player,settings,tiles,ui,utils,victory,initial_screen,neat_game -m unittest
+coverage run --source=game,fov_grid,sim_clock,tile_groups,dirty_rects,text_cache,benchmark,profiler,compiled_network,level_compiler,level_stream,replay,env,checkpoint,fitness_cache,shared_level,brick_level,decoration,endgame,highscore,level,maker,overworld,particle,player,settings,tiles,ui,utils,victory,initial_screen,neat_game -m unittest
 coverage report -m
 
 python -m unittest
\ No newline at end of file
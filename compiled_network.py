@@ -0,0 +1,222 @@
+import numpy
+from neat.graphs import feed_forward_layers
+
+
+def sigmoid(z):
+    return 1.0 / (1.0 + numpy.exp(-numpy.clip(5.0 * z, -60.0, 60.0)))
+
+
+def softplus(z):
+    return 0.2 * numpy.log(1 + numpy.exp(numpy.clip(5.0 * z, -60.0, 60.0)))
+
+
+def inverse(z):
+    with numpy.errstate(divide='ignore', over='ignore'):
+        result = numpy.divide(1.0, z)
+    return numpy.where(numpy.isfinite(result), result, 0.0)
+
+
+# Array versions of neat-python activation functions, see neat.activations
+ACTIVATIONS = {
+    'sigmoid': sigmoid,
+    'tanh': lambda z: numpy.tanh(numpy.clip(2.5 * z, -60.0, 60.0)),
+    'sin': lambda z: numpy.sin(numpy.clip(5.0 * z, -60.0, 60.0)),
+    'gauss': lambda z: numpy.exp(-5.0 * numpy.clip(z, -3.4, 3.4) ** 2),
+    'relu': lambda z: numpy.where(z > 0.0, z, 0.0),
+    'softplus': softplus,
+    'identity': lambda z: z,
+    'clamped': lambda z: numpy.clip(z, -1.0, 1.0),
+    'inv': inverse,
+    'log': lambda z: numpy.log(numpy.maximum(z, 1e-7)),
+    'exp': lambda z: numpy.exp(numpy.clip(z, -60.0, 60.0)),
+    'abs': numpy.abs,
+    'hat': lambda z: numpy.maximum(0.0, 1 - numpy.abs(z)),
+    'square': lambda z: z ** 2,
+    'cube': lambda z: z ** 3,
+}
+
+
+def get_activation(name, config):
+    """
+    Get array version of activation function. Functions added to neat config by user are applied element-wise.
+    :param name: name of activation function
+    :param config: neat config
+    :return: function taking and returning numpy arrays
+    """
+    if name in ACTIVATIONS:
+        return ACTIVATIONS[name]
+    function = config.genome_config.activation_defs.get(name)
+    if function is None:
+        raise ValueError(f"Unknown activation function {name}")
+    return numpy.vectorize(function, otypes=[float])
+
+
+class CompiledNetwork:
+    """
+    Feed forward network of a genome compiled into numpy arrays. Alternative to neat.nn.FeedForwardNetwork giving
+    same outputs, but evaluating a whole layer of nodes with a single matrix multiplication and able to evaluate
+    many inputs at once.
+    Nodes are evaluated in layers given by neat.graphs.feed_forward_layers. Values of input nodes and evaluated
+    nodes are kept in columns of one array, and each layer takes all columns evaluated before it as its inputs:
+    value = activation(bias + response * (values @ weights)).
+    """
+    def __init__(self, num_inputs, layers, outputs):
+        """
+        :param num_inputs: number of inputs
+        :param layers: list of (weights, biases, responses, activations) for each layer, where activations is a list
+        of (activation function, indexes of layer's nodes using it)
+        :param outputs: column of each output node, None for outputs which aren't connected
+        """
+        self.num_inputs = num_inputs
+        self.layers = layers
+        self.outputs = outputs
+        self.num_values = num_inputs + sum(len(biases) for weights, biases, responses, activations in layers)
+
+    @staticmethod
+    def create(genome, config):
+        """
+        Compile a genome into network
+        :param genome: genome to compile
+        :param config: neat config
+        :return: CompiledNetwork
+        """
+        genome_config = config.genome_config
+        for node in genome.nodes.values():
+            if node.aggregation != 'sum':
+                raise ValueError(f"Only sum aggregation can be compiled, not {node.aggregation}")
+
+        connections = [connection.key for connection in genome.connections.values() if connection.enabled]
+        columns = {key: column for column, key in enumerate(genome_config.input_keys)}
+        layers = []
+        for layer in feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections):
+            layer = sorted(layer)
+            weights = numpy.zeros((len(columns), len(layer)))
+            for in_node, out_node in connections:
+                if out_node in layer:
+                    weights[columns[in_node], layer.index(out_node)] += genome.connections[in_node, out_node].weight
+            biases = numpy.array([genome.nodes[node].bias for node in layer])
+            responses = numpy.array([genome.nodes[node].response for node in layer])
+            activations = {}
+            for index, node in enumerate(layer):
+                activations.setdefault(genome.nodes[node].activation, []).append(index)
+            activations = [(get_activation(name, config), numpy.array(indexes))
+                           for name, indexes in activations.items()]
+            layers.append((weights, biases, responses, activations))
+            for node in layer:
+                columns[node] = len(columns)
+
+        outputs = [columns.get(key) for key in genome_config.output_keys]
+        return CompiledNetwork(len(genome_config.input_keys), layers, outputs)
+
+    def activate_batch(self, inputs):
+        """
+        Evaluate network for many inputs at once
+        :param inputs: 2d array with one row of inputs for every evaluation
+        :return: 2d array with one row of outputs for every evaluation
+        """
+        inputs = numpy.asarray(inputs, dtype=float)
+        if inputs.shape[1] != self.num_inputs:
+            raise RuntimeError(f"Expected {self.num_inputs} inputs, got {inputs.shape[1]}")
+        values = numpy.zeros((len(inputs), self.num_values))
+        values[:, :self.num_inputs] = inputs
+        known = self.num_inputs
+        for weights, biases, responses, activations in self.layers:
+            layer_values = biases + responses * (values[:, :known] @ weights)
+            for activation, indexes in activations:
+                layer_values[:, indexes] = activation(layer_values[:, indexes])
+            values[:, known:known + len(biases)] = layer_values
+            known += len(biases)
+        outputs = numpy.zeros((len(inputs), len(self.outputs)))
+        for index, column in enumerate(self.outputs):
+            if column is not None:
+                outputs[:, index] = values[:, column]
+        return outputs
+
+    def activate(self, inputs):
+        """
+        Evaluate network for one input, same as neat.nn.FeedForwardNetwork.activate
+        :param inputs: list of inputs
+        :return: list of outputs
+        """
+        return self.activate_batch([inputs])[0].tolist()
+
+
+class PopulationNetwork:
+    """
+    Networks of a whole population evaluated at once, each network getting its own row of inputs.
+    Layers of all networks are padded to the same size and stacked, so every layer of the population is evaluated
+    with one batched matrix multiplication.
+    """
+    def __init__(self, networks):
+        """
+        layers - for every layer: stacked weights, biases and responses, and masks of nodes for each activation
+        outputs - column of each output node for every network, columns of not connected outputs point to
+        zero column
+        :param networks: list of CompiledNetwork with same amount of inputs and outputs
+        """
+        self.size = len(networks)
+        self.num_inputs = networks[0].num_inputs if networks else 0
+        depth = max((len(network.layers) for network in networks), default=0)
+        widths = [max((len(network.layers[index][1]) for network in networks if index < len(network.layers)),
+                      default=0) for index in range(depth)]
+        # Column 0 is always zero, inputs start from column 1
+        self.zero_column = 0
+        starts = [1 + self.num_inputs + sum(widths[:index]) for index in range(depth)]
+        self.num_values = 1 + self.num_inputs + sum(widths)
+
+        self.layers = []
+        for index, (start, width) in enumerate(zip(starts, widths)):
+            weights = numpy.zeros((self.size, start, width))
+            biases = numpy.zeros((self.size, width))
+            responses = numpy.zeros((self.size, width))
+            masks = {}
+            for row, network in enumerate(networks):
+                if index >= len(network.layers):
+                    continue
+                layer_weights, layer_biases, layer_responses, activations = network.layers[index]
+                nodes = len(layer_biases)
+                columns = self.value_columns(network, widths, starts)[:len(layer_weights)]
+                weights[row, columns, :nodes] = layer_weights
+                biases[row, :nodes] = layer_biases
+                responses[row, :nodes] = layer_responses
+                for activation, indexes in activations:
+                    mask = masks.setdefault(activation, numpy.zeros((self.size, width), dtype=bool))
+                    mask[row, indexes] = True
+            self.layers.append((start, weights, biases, responses, list(masks.items())))
+
+        self.outputs = numpy.zeros((self.size, len(networks[0].outputs) if networks else 0), dtype=int)
+        for row, network in enumerate(networks):
+            columns = self.value_columns(network, widths, starts)
+            self.outputs[row] = [self.zero_column if column is None else columns[column]
+                                 for column in network.outputs]
+
+    def value_columns(self, network, widths, starts):
+        """
+        Map columns of network's values onto columns of population's padded values
+        """
+        columns = list(range(1, 1 + self.num_inputs))
+        for index, (weights, biases, responses, activations) in enumerate(network.layers):
+            columns.extend(range(starts[index], starts[index] + len(biases)))
+        return columns
+
+    def activate(self, inputs, rows=None):
+        """
+        Evaluate networks of the population
+        :param inputs: 2d array with one row of inputs for every evaluated network
+        :param rows: indexes of evaluated networks, all networks by default
+        :return: 2d array with one row of outputs for every evaluated network
+        """
+        inputs = numpy.asarray(inputs, dtype=float)
+        if rows is None:
+            rows = numpy.arange(self.size)
+        values = numpy.zeros((len(rows), self.num_values))
+        values[:, 1:1 + self.num_inputs] = inputs
+        for start, weights, biases, responses, masks in self.layers:
+            sums = numpy.matmul(values[:, None, :start], weights[rows])[:, 0]
+            layer_values = biases[rows] + responses[rows] * sums
+            result = numpy.zeros_like(layer_values)
+            for activation, mask in masks:
+                mask = mask[rows]
+                result[mask] = activation(layer_values[mask])
+            values[:, start:start + layer_values.shape[1]] = result
+        return numpy.take_along_axis(values, self.outputs[rows], axis=1)
@@ -3,7 +3,8 @@ from settings import *
 from tiles import AnimatedTile, TerrainTile
 from random import choice, randint
 import glob, os
-from utils import get_tile_img
+from utils import get_tile_img, load_image
+from tile_groups import TileGroup
 
 
 class Sky:
@@ -12,32 +13,32 @@ class Sky:
     """
     def __init__(self, horizon):
         """
-        Initializing skies with 3 different images
+        Initializing skies with 3 different images, rows of the sky are baked into one image
         :param horizon: line of horizon in rows from top
         """
-        self.top = pygame.image.load(os.path.join(SKY_TILES_DIR, 'sky_top.png')).convert()
-        self.middle = pygame.image.load(os.path.join(SKY_TILES_DIR, 'sky_middle.png')).convert()
-        self.bottom = pygame.image.load(os.path.join(SKY_TILES_DIR, 'sky_bottom.png')).convert()
+        size = (screen_width, tile_size)
+        self.top = load_image(os.path.join(SKY_TILES_DIR, 'sky_top.png'), alpha=False, scale=size)
+        self.middle = load_image(os.path.join(SKY_TILES_DIR, 'sky_middle.png'), alpha=False, scale=size)
+        self.bottom = load_image(os.path.join(SKY_TILES_DIR, 'sky_bottom.png'), alpha=False, scale=size)
         self.horizon = horizon
 
-        self.top = pygame.transform.scale(self.top, (screen_width, tile_size))
-        self.middle = pygame.transform.scale(self.middle, (screen_width, tile_size))
-        self.bottom = pygame.transform.scale(self.bottom, (screen_width, tile_size))
+        self.image = pygame.Surface((screen_width, NUM_TILES_Y * tile_size))
+        for row in range(NUM_TILES_Y):
+            y = row * tile_size
+            if row < self.horizon:
+                self.image.blit(self.top, (0, y))
+            elif row == self.horizon:
+                self.image.blit(self.middle, (0, y))
+            else:
+                self.image.blit(self.bottom, (0, y))
 
     def draw(self, surface):
         """
-        Draw sky depending on Y coordinate
+        Draw sky
         :param surface:
         :return:
         """
-        for row in range(NUM_TILES_Y):
-            y = row * tile_size
-            if row < self.horizon:
-                surface.blit(self.top, (0, y))
-            elif row == self.horizon:
-                surface.blit(self.middle, (0, y))
-            else:
-                surface.blit(self.bottom, (0, y))
+        surface.blit(self.image, (0, 0))
 
 
 class Water:
@@ -47,32 +48,39 @@ class Water:
     def __init__(self, top, level_width):
         """
         Water tiles, their amount, starting and ending points.
-        Creating all the tiles at once.
+        Tiles lie in a row in level coordinates and share one animation, so they aren't created as sprites, only
+        positions of tiles seen by the camera are computed when drawing, no matter how long the level is.
         imgs - list to save tile images in order not to load them every time
+        animation - tile holding animation shared by all water tiles
+        amount - number of water tiles
         :param top: Y coordinate for water
         :param level_width:
         """
         if top < 0 or level_width < 0:
             raise ValueError("Parameters for Water should be more than 0.")
-        water_start = -screen_width
-        water_tile_width = WATER_TILE_WIDTH
-        tile_x_amount = (level_width + 2 * screen_width) // water_tile_width
+        self.water_start = -screen_width
+        self.top = top
+        self.amount = (level_width + 2 * screen_width) // WATER_TILE_WIDTH
 
-        self.water_sprites = pygame.sprite.Group()
-        img = pygame.image.load(os.path.join(WATER_TILES_DIR, '1.png')).convert_alpha()
+        img = load_image(os.path.join(WATER_TILES_DIR, '1.png'))
         imgs = get_tile_img(WATER_TILES_DIR)
+        self.animation = AnimatedTile(WATER_TILE_WIDTH, (0, 0), img)
+        self.animation.images = imgs
+        self.animation.animated = True
 
-        for tile in range(tile_x_amount):
-            x = tile * water_tile_width + water_start
-            y = top
-            sprite = AnimatedTile(WATER_TILE_WIDTH, (x, y), img)
-            sprite.images = imgs
-            sprite.animated = True
-            self.water_sprites.add(sprite)
-
-    def draw(self, surface, shift):
-        self.water_sprites.update(shift)
-        self.water_sprites.draw(surface)
+    def draw(self, surface, offset):
+        """
+        Animate water and draw tiles seen by the camera
+        :param surface:
+        :param offset: camera offset
+        """
+        self.animation.update()
+        offset = int(offset)
+        first = max(0, (-offset - self.water_start) // WATER_TILE_WIDTH)
+        last = min(self.amount, (screen_width - offset - self.water_start) // WATER_TILE_WIDTH + 1)
+        image = self.animation.image
+        surface.blits([(image, (self.water_start + tile * WATER_TILE_WIDTH + offset, self.top))
+                       for tile in range(first, last)], doreturn=False)
 
 
 class Clouds:
@@ -88,7 +96,7 @@ class Clouds:
         """
         if horizon < 0 or level_width < 0 or cloud_number < 0:
             raise ValueError("Parameters for Clouds should be more than 0.")
-        cloud_list = [pygame.image.load(cloud).convert_alpha() for cloud in glob.glob(os.path.join(CLOUD_TILE_DIR, '*'))]
+        cloud_list = [load_image(cloud) for cloud in sorted(glob.glob(os.path.join(CLOUD_TILE_DIR, '*')))]
 
         # Boundaries
         min_x = -screen_width
@@ -96,7 +104,7 @@ class Clouds:
         min_y = 0
         max_y = horizon
 
-        self.cloud_sprites = pygame.sprite.Group()
+        self.cloud_sprites = TileGroup()
 
         for _ in range(cloud_number):
             img = choice(cloud_list)
@@ -105,6 +113,10 @@ class Clouds:
             sprite = TerrainTile(0, (x, y), img)
             self.cloud_sprites.add(sprite)
 
-    def draw(self, surface, shift):
-        self.cloud_sprites.update(shift)
-        self.cloud_sprites.draw(surface)
+    def draw(self, surface, offset):
+        """
+        Draw clouds seen by the camera
+        :param surface:
+        :param offset: camera offset
+        """
+        self.cloud_sprites.draw_visible(surface, offset)
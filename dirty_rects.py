@@ -0,0 +1,66 @@
+import pygame
+from settings import *
+
+
+class DirtyRects:
+    """
+    Tracks regions of the screen that changed since previous frame, so that screens which are mostly still (menus,
+    overworld, victory and high scores) redraw and push to the display only those regions.
+    Every frame screen describes what it is going to draw: rect of every element and a key of its appearance, e.g.
+    image and state or rendered text. Element is dirty if it appeared, disappeared, moved or changed its key, both
+    its old and new rects have to be redrawn. First frame after creation or invalidate is dirty as a whole.
+    """
+    def __init__(self, size=(screen_width, screen_height)):
+        """
+        screen - rect of the whole screen
+        previous - elements drawn during previous frame, None if whole screen has to be redrawn
+        current - elements of current frame
+        rects - dirty rects of the last collected frame
+        :param size: size of the screen
+        """
+        self.screen = pygame.Rect((0, 0), size)
+        self.previous = None
+        self.current = set()
+        self.rects = []
+
+    def add(self, rect, key):
+        """
+        Describe element of current frame
+        :param rect: area element covers
+        :param key: hashable description of element's appearance
+        """
+        self.current.add((tuple(pygame.Rect(rect)), key))
+
+    def invalidate(self):
+        """
+        Make next frame dirty as a whole, e.g. when screen is shown again after something else was drawn
+        """
+        self.previous = None
+
+    def collect(self):
+        """
+        Finish describing current frame and find its dirty rects
+        :return: list of rects to redraw, empty if nothing changed
+        """
+        if self.previous is None:
+            self.rects = [self.screen.copy()]
+        else:
+            changed = [pygame.Rect(rect) for rect, key in self.previous ^ self.current]
+            self.rects = [rect.clip(self.screen) for rect in changed if rect.colliderect(self.screen)]
+        self.previous, self.current = self.current, set()
+        return self.rects
+
+    def redraw(self, surface, draw):
+        """
+        Call drawing function with surface clipped to dirty area, if there is any
+        :param surface: surface to draw on
+        :param draw: function drawing the whole frame
+        """
+        if not self.rects:
+            return
+        clip = surface.get_clip()
+        surface.set_clip(self.rects[0].unionall(self.rects[1:]))
+        try:
+            draw()
+        finally:
+            surface.set_clip(clip)
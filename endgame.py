@@ -1,5 +1,7 @@
 import pygame
 from settings import *
+from utils import load_sound
+from text_cache import get_font, render
 
 
 class EndGame:
@@ -12,11 +14,10 @@ class EndGame:
         self.created = True
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont("Arial", 60)
+        self.font = get_font("Arial", 60)
 
         # Sound
-        self.end_sound = pygame.mixer.Sound(GAMEOVER_SOUND_DIR)
+        self.end_sound = load_sound(GAMEOVER_SOUND_DIR)
 
     def play_sound(self):
         """
@@ -38,16 +39,16 @@ class EndGame:
 
         self.surface.fill("black")
         # Message
-        surf_lost = self.font.render("YOU LOST!", True, "red")
+        surf_lost = render(self.font, "YOU LOST!", "red")
         lost_rect = surf_lost.get_rect(midtop=(screen_width/2, screen_height/5))
         # Coins gathered
-        surf_coins = self.font.render(f"Coins: {self.player.coins}", True, "red")
+        surf_coins = render(self.font, f"Coins: {self.player.coins}", "red")
         coins_rect = surf_coins.get_rect(midtop=(lost_rect.centerx, lost_rect.bottom+15))
         # Levels completed
-        surf_levels = self.font.render(f"Levels completed: {self.player.levels_completed}", True, "red")
+        surf_levels = render(self.font, f"Levels completed: {self.player.levels_completed}", "red")
         levels_rect = surf_levels.get_rect(midtop=(coins_rect.centerx, coins_rect.bottom + 15))
         # Enemies destroyed
-        surf_enemies = self.font.render(f"Enemies destroyed: {self.player.enemies_killed}", True, "red")
+        surf_enemies = render(self.font, f"Enemies destroyed: {self.player.enemies_killed}", "red")
         enemies_rect = surf_enemies.get_rect(midtop=(levels_rect.centerx, levels_rect.bottom + 15))
 
         self.surface.blit(surf_lost, lost_rect)
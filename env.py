@@ -0,0 +1,250 @@
+import multiprocessing
+from collections import deque
+import numpy
+import utils
+from settings import *
+from level import Level
+from player import Player
+from ui import UI
+from fov_grid import FOV_ROWS, FOV_COLUMNS
+from game import Platformer
+from shared_level import SharedLevels, attach
+
+# Decisions of Player.make_decision: 0 - nothing, 1 - jump, 2 - right, 3 - left, 4 - right and jump,
+# 5 - left and jump
+ACTION_COUNT = 6
+OBSERVATION_SIZE = FOV_ROWS * FOV_COLUMNS
+
+
+class EnvError(Exception):
+    pass
+
+
+class PlatformerEnv:
+    """
+    Environment with reset and step for a single NEAT player, the same simulation as Platformer.train_ai without
+    events, networks and display. Observation is player's flattened field of view, reward is the change of
+    Platformer.fitness since previous step, and episode is done when train_ai would stop the genome, so sum of
+    rewards of an episode is the fitness train_ai gives. Level is created once and reset to its initial state.
+    """
+    def __init__(self, level_data=level_0, screen=None, draw=False):
+        """
+        state - initial state of the level
+        distances - distances travelled in last PLAYER_INACTIVE_LIMIT frames, to detect staggering player
+        frame - number of steps since reset
+        fitness - fitness after the last step
+        done - whether episode is over and reset should be called
+        :param level_data: level to play
+        :param screen: surface to draw on, headless display is created if None
+        :param draw: whether to draw level, display is updated by the caller
+        """
+        if screen is None:
+            screen = utils.init_headless()
+        self.player = Player((0, 0), neat=True)
+        ui = UI(screen, self.player) if draw else None
+        self.level = Level(level_data, screen, self.player, ui, neat=True, draw=draw)
+        self.state = self.level.snapshot()
+        self.distances = deque(maxlen=PLAYER_INACTIVE_LIMIT)
+        self.frame = 0
+        self.fitness = 0
+        self.done = True
+
+    def observe(self):
+        """
+        Field of view of the player. Player who fell off the screen has no field of view, so zeros are returned
+        once episode is done.
+        :return: array of OBSERVATION_SIZE values
+        """
+        if self.done:
+            return numpy.zeros(OBSERVATION_SIZE)
+        return self.level.observe([self.player])[0]
+
+    def measure(self):
+        """
+        Fitness of the player and whether its episode is over, see Platformer.measure
+        :return: fitness, distance travelled, whether episode is done
+        """
+        return Platformer.measure(self.level, self.player, self.distances, self.frame)
+
+    def reset(self):
+        """
+        Bring level to its initial state and run its first frame, before which train_ai makes no decision
+        :return: observation
+        """
+        self.level.reset(self.state)
+        self.distances.clear()
+        self.frame = 0
+        self.fitness = 0
+        self.done = False
+        self.level.run()
+        fitness, distance, self.done = self.measure()
+        return self.observe()
+
+    def step(self, action):
+        """
+        Make decision and run one frame of the level
+        :param action: decision from 0 to ACTION_COUNT - 1
+        :return: observation, reward, whether episode is done, dict with fitness, distance, frame, whether level was
+        completed and player defeated
+        """
+        if self.done:
+            raise EnvError('Episode is over, reset should be called before step')
+        if not 0 <= action < ACTION_COUNT:
+            raise EnvError(f'Action should be from 0 to {ACTION_COUNT - 1}, not {action}')
+        self.frame += 1
+        self.player.make_decision(int(action))
+        self.level.run()
+        fitness, distance, self.done = self.measure()
+        reward = fitness - self.fitness
+        self.fitness = fitness
+        info = {'fitness': fitness, 'distance': distance, 'frame': self.frame, 'completed': self.level.completed,
+                'defeat': self.level.check_defeat(self.player)}
+        return self.observe(), reward, self.done, info
+
+
+class VectorEnv:
+    """
+    Several environments stepped together in current process. Environment whose episode is done is reset right
+    away, its last observation is kept in info as 'final_observation'.
+    """
+    def __init__(self, count, level_data=level_0):
+        """
+        :param count: number of environments
+        :param level_data: level to play
+        """
+        if not isinstance(count, int) or count < 1:
+            raise ValueError(f'Number of environments should be positive integer, not {count}')
+        self.envs = [PlatformerEnv(level_data) for _ in range(count)]
+
+    def __len__(self):
+        return len(self.envs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def reset(self):
+        """
+        :return: observations, one row for each environment
+        """
+        return numpy.array([env.reset() for env in self.envs])
+
+    def step(self, actions):
+        """
+        :param actions: action for each environment
+        :return: observations, rewards, done flags and infos of environments
+        """
+        if len(actions) != len(self.envs):
+            raise EnvError(f'Expected {len(self.envs)} actions, got {len(actions)}')
+        observations, rewards, dones, infos = [], [], [], []
+        for env, action in zip(self.envs, actions):
+            observation, reward, done, info = env.step(action)
+            if done:
+                info['final_observation'] = observation
+                observation = env.reset()
+            observations.append(observation)
+            rewards.append(reward)
+            dones.append(done)
+            infos.append(info)
+        return numpy.array(observations), numpy.array(rewards), numpy.array(dones), infos
+
+    def close(self):
+        pass
+
+
+def vector_worker(connection, count, level_data, handles=()):
+    """
+    Run VectorEnv in worker process of SubprocessVectorEnv, commands are received through the pipe
+    :param handles: levels in shared memory to attach to, see shared_level
+    """
+    attach(handles)
+    envs = VectorEnv(count, level_data)
+    while True:
+        command, data = connection.recv()
+        if command == 'reset':
+            connection.send(envs.reset())
+        elif command == 'step':
+            connection.send(envs.step(data))
+        elif command == 'close':
+            connection.close()
+            break
+
+
+class SubprocessVectorEnv:
+    """
+    Environments split between worker processes, each stepping its part with VectorEnv. Workers are spawned headless
+    and take the level from shared memory, the same way as workers of ParallelEvaluator.
+    """
+    def __init__(self, count, workers=None, level_data=level_0):
+        """
+        counts - number of environments of every worker
+        :param count: number of environments
+        :param workers: number of worker processes, defaults to number of cores
+        :param level_data: level to play
+        """
+        if not isinstance(count, int) or count < 1:
+            raise ValueError(f'Number of environments should be positive integer, not {count}')
+        workers = min(workers or multiprocessing.cpu_count(), count)
+        self.counts = [len(part) for part in numpy.array_split(numpy.arange(count), workers)]
+        context = multiprocessing.get_context('spawn')
+        self.connections = []
+        self.processes = []
+        self.shared_levels = SharedLevels([level_data])
+        with utils.headless_environment():
+            for worker_count in self.counts:
+                connection, worker_connection = context.Pipe()
+                process = context.Process(target=vector_worker, args=(worker_connection, worker_count, level_data,
+                                                                      self.shared_levels.handles), daemon=True)
+                process.start()
+                worker_connection.close()
+                self.connections.append(connection)
+                self.processes.append(process)
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def reset(self):
+        """
+        :return: observations, one row for each environment
+        """
+        for connection in self.connections:
+            connection.send(('reset', None))
+        return numpy.concatenate([connection.recv() for connection in self.connections])
+
+    def step(self, actions):
+        """
+        Send actions to all workers before waiting for any of them, so that workers step in parallel
+        :param actions: action for each environment
+        :return: observations, rewards, done flags and infos of environments
+        """
+        if len(actions) != len(self):
+            raise EnvError(f'Expected {len(self)} actions, got {len(actions)}')
+        start = 0
+        for connection, count in zip(self.connections, self.counts):
+            connection.send(('step', actions[start:start + count]))
+            start += count
+        results = [connection.recv() for connection in self.connections]
+        observations, rewards, dones, infos = zip(*results)
+        return numpy.concatenate(observations), numpy.concatenate(rewards), numpy.concatenate(dones), \
+            [info for worker_infos in infos for info in worker_infos]
+
+    def close(self):
+        """
+        Stop worker processes and free shared level
+        """
+        for connection in self.connections:
+            connection.send(('close', None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
+        self.shared_levels.close()
@@ -0,0 +1,130 @@
+import csv
+import hashlib
+import logging
+from collections import OrderedDict
+import neat
+from neat.graphs import feed_forward_layers
+from settings import *
+from level_compiler import level_key
+
+log = logging.getLogger("fitness cache")
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter('%(module)s - %(levelname)s - %(message)s'))
+log.addHandler(stream_handler)
+log.setLevel(logging.INFO)
+
+
+def phenotype_key(genome, config, level_data=level_0):
+    """
+    Canonical hash of the network genome is compiled into and the level it is evaluated on. Only nodes required for
+    outputs and their enabled connections are taken into account, the same way networks prune genomes, so genomes
+    which differ only in disabled or unused genes get the same key. Network backend is part of the key, since
+    backends may round differently, and so is the level, since the same network gets different fitness on another
+    level.
+    :param genome: genome
+    :param config: neat config
+    :param level_data: level genome is evaluated on
+    :return: hex digest
+    """
+    genome_config = config.genome_config
+    connections = [key for key, connection in genome.connections.items() if connection.enabled]
+    layers = feed_forward_layers(genome_config.input_keys, genome_config.output_keys, connections)
+    required = set().union(*layers)
+    nodes = []
+    for node_key in sorted(required):
+        node = genome.nodes[node_key]
+        incoming = sorted((in_node, genome.connections[in_node, out_node].weight)
+                          for in_node, out_node in connections if out_node == node_key)
+        nodes.append((node_key, node.bias, node.response, node.activation, node.aggregation, incoming))
+    description = (NEAT_NETWORK, level_key(level_data), tuple(genome_config.input_keys),
+                   tuple(genome_config.output_keys), nodes)
+    return hashlib.blake2b(repr(description).encode(), digest_size=16).hexdigest()
+
+
+class FitnessCache:
+    """
+    Fitness of evaluated phenotypes with LRU eviction. Simulation of a single player is deterministic, so genome
+    with the same phenotype as already evaluated one (elites, clones and genomes differing only in unused genes)
+    gets its fitness without running the level.
+    """
+    def __init__(self, size=FITNESS_CACHE_SIZE):
+        """
+        fitnesses - fitness by phenotype key from least to most recently used
+        hits, misses - cache statistics
+        :param size: maximum number of kept fitness values
+        """
+        if not isinstance(size, int) or size < 1:
+            raise ValueError(f'Fitness cache size should be positive integer, not {size}')
+        self.size = size
+        self.fitnesses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Get cached fitness
+        :param key: phenotype key
+        :return: fitness or None if phenotype wasn't evaluated
+        """
+        fitness = self.fitnesses.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.fitnesses.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        self.fitnesses[key] = fitness
+        self.fitnesses.move_to_end(key)
+        if len(self.fitnesses) > self.size:
+            self.fitnesses.popitem(last=False)
+
+    def clear(self):
+        self.fitnesses.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Cache shared by evaluations of all generations
+fitness_cache = FitnessCache()
+
+
+class StatisticsReporter(neat.StatisticsReporter):
+    """
+    Statistics reporter which also keeps hits and misses of fitness cache for every generation, logs them after
+    evaluation and saves them with the rest of statistics
+    """
+    def __init__(self, cache=None):
+        """
+        cache_statistics - (hits, misses) of every generation
+        :param cache: FitnessCache, shared fitness_cache by default
+        """
+        super().__init__()
+        self.cache = cache if cache is not None else fitness_cache
+        self.cache_statistics = []
+        self.counts = (0, 0)
+
+    def start_generation(self, generation):
+        self.counts = self.cache.hits, self.cache.misses
+
+    def post_evaluate(self, config, population, species, best_genome):
+        super().post_evaluate(config, population, species, best_genome)
+        hits, misses = self.cache.hits - self.counts[0], self.cache.misses - self.counts[1]
+        self.cache_statistics.append((hits, misses))
+        if hits + misses:
+            log.info(f'Fitness cache: {hits} hits, {misses} misses ({hits / (hits + misses):.0%} hit rate), '
+                     f'{len(self.cache.fitnesses)} phenotypes cached')
+
+    def save_cache_statistics(self, filename='fitness_cache.csv', delimiter=' '):
+        """
+        Save hits and misses of every generation
+        """
+        with open(filename, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            for hits, misses in self.cache_statistics:
+                writer.writerow([hits, misses])
+
+    def save(self):
+        super().save()
+        self.save_cache_statistics()
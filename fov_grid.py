@@ -0,0 +1,190 @@
+import numpy
+from settings import *
+
+# Codes written into FOV cells, see Level.fov
+EMPTY_CELL = 0
+TERRAIN_CELL = 1
+TREE_CELL = 2
+OBJECT_CELL = 3
+PLAYER_CELL = 4
+ENEMY_CELL = -1
+
+FOV_ROWS = (screen_height // tile_size) - 1
+FOV_COLUMNS = FOV_DISTANCE + LEFT_FOV_ADJUSTMENT
+
+
+class FovGrid:
+    """
+    Occupancy grid of the level for building players' field of view.
+    Static tiles (terrain, tree obstacles and objects) are indexed once by their tile row and column in world
+    coordinates. Tiles that are not aligned with the grid (objects are placed with an offset inside their cell)
+    are kept in separate layers per horizontal offset, so that shifting the level always moves the whole layer
+    by an integer number of columns. Enemies are written in as positions once per frame.
+    Layers are combined in the same order Level.fov used to scan tile groups: terrain, enemies, objects and tree
+    obstacles, so the latter ones win if a cell holds several tiles.
+    Layers already built for the same tiles can be passed in, e.g. read-only ones from shared memory, then tiles are
+    only mapped to their cells and a layer is copied on its first change.
+    Layers cover columns [origin, origin + columns) of the level, the whole level unless they are moved to a window
+    of it, e.g. by LevelStream, then columns outside of the window are empty.
+    """
+    def __init__(self, level_width, terrain, tree_obs, objects, layers=None):
+        """
+        layers - grids with tiles count per cell for each type of tile and horizontal offset of tile inside a cell
+        cells - position of every static tile inside layers, needed to remove tiles from the grid
+        origin, columns - first level column covered by layers and their width
+        enemy_x, enemy_y - enemies positions in world coordinates
+        :param level_width: width of the level in pixels
+        :param terrain: terrain tiles
+        :param tree_obs: invisible tiles inside fg trees
+        :param objects: coins and other objects
+        :param layers: layers built from these tiles, dict of layers by offset for every type of tile
+        """
+        if level_width < 0:
+            raise ValueError(f"Level width should be positive, not {level_width}")
+        self.origin = 0
+        self.columns = level_width // tile_size
+        self.layers = {TERRAIN_CELL: {}, OBJECT_CELL: {}, TREE_CELL: {}}
+        self.cells = {}
+        self.enemy_x = numpy.empty(0, dtype=int)
+        self.enemy_y = numpy.empty(0, dtype=int)
+        count = layers is None
+        if not count:
+            for code, residues in layers.items():
+                self.layers[code].update(residues)
+                self.columns = max([self.columns] + [layer.shape[1] for layer in residues.values()])
+
+        for tile in terrain:
+            self.add(tile, TERRAIN_CELL, count=count)
+        for tile in tree_obs:
+            self.add(tile, TREE_CELL, count=count)
+        for tile in objects:
+            self.add(tile, OBJECT_CELL, count=count)
+
+    def get_layer(self, code, residue):
+        """
+        Get grid for given type of tile and offset inside a cell, create it if needed. Read-only layer is replaced
+        by its copy, since the grid is about to change.
+        """
+        layer = self.layers[code].get(residue)
+        if layer is None:
+            layer = numpy.zeros((NUM_TILES_Y, self.columns), dtype=numpy.int16)
+            self.layers[code][residue] = layer
+        elif not layer.flags.writeable:
+            layer = layer.copy()
+            self.layers[code][residue] = layer
+        return layer
+
+    @staticmethod
+    def copy_layers(layers):
+        """
+        Copy of layers which can be changed independently of them. Read-only layers are shared, e.g. by levels
+        attached to shared memory, and get_layer never changes them in place, so only writeable layers are copied.
+        """
+        return {code: {residue: layer.copy() if layer.flags.writeable else layer for residue, layer in residues.items()}
+                for code, residues in layers.items()}
+
+    def grow(self, columns):
+        """
+        Extend all layers to given number of columns
+        """
+        for layers in self.layers.values():
+            for residue, layer in layers.items():
+                layers[residue] = numpy.pad(layer, ((0, 0), (0, columns - self.columns)))
+        self.columns = columns
+
+    def move(self, origin, columns):
+        """
+        Make layers cover columns [origin, origin + columns) of the level, tiles already written in the grid should
+        be inside them
+        """
+        low, high = max(origin, self.origin), min(origin + columns, self.origin + self.columns)
+        for layers in self.layers.values():
+            for residue, layer in layers.items():
+                moved = numpy.zeros((NUM_TILES_Y, columns), dtype=layer.dtype)
+                if low < high:
+                    moved[:, low - origin:high - origin] = layer[:, low - self.origin:high - self.origin]
+                layers[residue] = moved
+        self.origin = origin
+        self.columns = columns
+
+    def add(self, tile, code, shift=0, count=True):
+        """
+        Write static tile into the grid
+        :param tile: tile sprite
+        :param code: type of the tile
+        :param shift: world shift tile's rect is currently moved by
+        :param count: whether to count the tile in its layer, False if layers already include it
+        """
+        x = tile.rect.x - shift
+        row = tile.rect.y // tile_size
+        column = x // tile_size
+        if not 0 < row < NUM_TILES_Y or column < self.origin:
+            return
+        if column - self.origin >= self.columns:
+            self.grow(column - self.origin + 1)
+        residue = x % tile_size
+        if count:
+            self.get_layer(code, residue)[row, column - self.origin] += 1
+        self.cells[tile] = code, residue, row, column
+
+    def remove(self, tile):
+        """
+        Remove static tile from the grid, e.g. when object was collected
+        """
+        cell = self.cells.pop(tile, None)
+        if cell is not None:
+            code, residue, row, column = cell
+            self.get_layer(code, residue)[row, column - self.origin] -= 1
+
+    def sync_enemies(self, enemies, shift=0):
+        """
+        Save enemies positions. Should be called once per frame after enemies have moved.
+        :param enemies: enemy tiles
+        :param shift: world shift enemies' rects are currently moved by
+        """
+        rects = [enemy.rect for enemy in enemies]
+        self.enemy_x = numpy.fromiter((rect.x - shift for rect in rects), dtype=int, count=len(rects))
+        self.enemy_y = numpy.fromiter((rect.y for rect in rects), dtype=int, count=len(rects))
+
+    def layer_slice(self, layer, start, width):
+        """
+        Get FOV rows of the layer for given level columns. Columns outside of the layer are empty.
+        """
+        start -= self.origin
+        if 0 <= start and start + width <= self.columns:
+            return layer[1:, start:start + width]
+        part = numpy.zeros((FOV_ROWS, width), dtype=layer.dtype)
+        low, high = max(start, 0), min(start + width, self.columns)
+        if low < high:
+            part[:, low - start:high - start] = layer[1:, low:high]
+        return part
+
+    def window(self, column, width, shift):
+        """
+        Build FOV cells for screen columns [column, column + width).
+        Tile with world X coordinate x is located in the screen column (x + shift) // tile_size.
+        :param column: first screen column
+        :param width: amount of columns
+        :param shift: overall world shift of the level
+        :return: 2d array with FOV_ROWS rows and width columns
+        """
+        shift = int(shift)
+        cells = numpy.zeros((FOV_ROWS, width))
+        self.fill_static(cells, TERRAIN_CELL, column, width, shift)
+
+        enemy_columns = (self.enemy_x + shift) // tile_size - column
+        enemy_rows = self.enemy_y // tile_size - 1
+        inside = (enemy_columns >= 0) & (enemy_columns < width) & (enemy_rows >= 0) & (enemy_rows < FOV_ROWS)
+        cells[enemy_rows[inside], enemy_columns[inside]] = ENEMY_CELL
+
+        self.fill_static(cells, OBJECT_CELL, column, width, shift)
+        self.fill_static(cells, TREE_CELL, column, width, shift)
+        return cells
+
+    def fill_static(self, cells, code, column, width, shift):
+        """
+        Write static tiles of given type into FOV cells
+        """
+        for residue, layer in self.layers[code].items():
+            start = column - (residue + shift) // tile_size
+            cells[self.layer_slice(layer, start, width) > 0] = code
@@ -5,8 +5,15 @@ from overworld import Overworld
 from player import Player
 from ui import UI
 from level import Level
+from sim_clock import SimClock
+from compiled_network import CompiledNetwork, PopulationNetwork
 from collections import deque
 import neat
+import numpy
+import utils
+from text_cache import get_font, render
+from replay import Replay, NO_INPUT, player_results
+from level_compiler import level_key
 import logging
 
 # TODO Maybe try data analysis based on ai behaviour
@@ -26,15 +33,36 @@ class Platformer:
     Use Python 3.7
     """
 
-    def __init__(self, draw=True):
+    def __init__(self, draw=True, headless=False, record=True):
         """
-        Initializing pygame, creating player and overworld
+        Initializing pygame, creating player and overworld.
+        In headless mode there is no window, sound, overworld and frame rate limit, only NEAT training functions
+        are available and levels run as fast as possible.
+        :param draw: whether to draw NEAT training
+        :param headless: whether to run without window and sound
+        :param record: whether NEAT training records replays, e.g. workers which only return fitness don't
         """
-        self.screen = pygame.display.set_mode((screen_width, screen_height))
         self.clock = pygame.time.Clock()
         self.frame = 0
         self.return_to_initial = False
-        self.draw = draw
+        self.headless = headless
+        self.draw = draw and not headless
+        # Levels for training single genomes with their initial states by level, created once and reset for every
+        # genome, and the level used last
+        self.training_levels = {}
+        self.training_level = None
+        # Replay of last trained genome or population, None if replays aren't recorded
+        self.record = record
+        self.replay = None
+
+        if self.headless:
+            self.screen = utils.init_headless()
+            self.player = None
+            self.overworld = None
+            self.font = None
+            return
+
+        self.screen = pygame.display.set_mode((screen_width, screen_height))
         pygame.mixer.init()
 
         self.player = Player((0, 0))
@@ -43,8 +71,7 @@ class Platformer:
         pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL).set_volume(0.05)
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont(FONT_STD, FONT_SIZE)
+        self.font = get_font(FONT_STD, FONT_SIZE)
 
     def process_events(self):
         """
@@ -64,22 +91,44 @@ class Platformer:
 
     def run(self):
         """
-        Main game function
+        Main game function. Screen isn't cleared between frames, overworld and its menus redraw only changed regions
+        of the screen.
         :return:
         """
         while True:
             events = self.process_events()
 
-            self.screen.fill('grey')
             self.overworld.run(events)
             if self.return_to_initial and self.overworld.proceed_to_level is None and self.overworld.return_timeout():
                 break
 
-            pygame.display.update()
+            # Only changed parts of the screen are pushed to the display, whole screen while level is running.
+            # pygame.display.update(None) updates nothing, so None is never passed on
+            if self.overworld.updated_rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.overworld.updated_rects)
             self.clock.tick(CLOCK_RATE)
 
     # NEAT functions
     ####################################
+    def check_force_quit(self):
+        """
+        Process events during NEAT training. Quitting or hitting escape stops training, backspace stops training and
+        returns to initial screen. There are no events in headless mode.
+        :return: True if training should be stopped
+        """
+        if self.headless:
+            return False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+                pygame.mixer.stop()
+                self.return_to_initial = True
+                return True
+        return False
+
     @staticmethod
     def fitness(frames, distance, score, win, enemy_kills, defeat):
         """
@@ -113,16 +162,16 @@ class Platformer:
         :param surface: surface of our game
         :return:
         """
-        surf_gener = font.render(f"Generation: {generation}", True, 'red')
+        surf_gener = render(font, f"Generation: {generation}", 'red')
         surface.blit(surf_gener, (300, NEAT_INFO_Y))
         if genome is not None:
-            surf_genome = font.render(f"Genome: {genome}", True, 'red')
+            surf_genome = render(font, f"Genome: {genome}", 'red')
             surface.blit(surf_genome, (500, NEAT_INFO_Y))
         if fitness is not None:
-            surf_fit = font.render(f"Fitness: {fitness}", True, 'red')
+            surf_fit = render(font, f"Fitness: {fitness}", 'red')
             surface.blit(surf_fit, (700, NEAT_INFO_Y))
         if dist is not None:
-            surf_fit = font.render(f"Distance: {dist}", True, 'red')
+            surf_fit = render(font, f"Distance: {dist}", 'red')
             surface.blit(surf_fit, (900, NEAT_INFO_Y))
 
     @staticmethod
@@ -133,43 +182,66 @@ class Platformer:
         :param player: player to make decision
         :return:
         """
-        if decision == 0:
-            pass
-        elif decision == 1:
-            player.move_up()
-        elif decision == 2:
-            player.move_right()
-        elif decision == 3:
-            player.move_left()
-        elif decision == 4:
-            player.move_right_up()
-        elif decision == 5:
-            player.move_left_up()
-
-    def get_neat_parameters(self, l_neat, player, queue):
+        player.make_decision(decision)
+
+    @staticmethod
+    def create_network(genome, config):
+        """
+        Create neural network of a genome with network backend chosen by NEAT_NETWORK
+        :param genome: genome
+        :param config: config file
+        :return: network with activate method
+        """
+        if NEAT_NETWORK == 'compiled':
+            return CompiledNetwork.create(genome, config)
+        elif NEAT_NETWORK == 'python':
+            return neat.nn.FeedForwardNetwork.create(genome, config)
+        raise ValueError(f"Unknown network backend {NEAT_NETWORK}")
+
+    @classmethod
+    def measure(cls, level, player, distances, frame):
         """
-        Getting parameters for current genome of neat
-        :param l_neat: level with neat
+        Fitness of a single NEAT player and whether its run is over. Run is over when player is staggering (difference
+        between first and last of the last PLAYER_INACTIVE_LIMIT distances is less than double player's speed, not
+        checked until distances are filled), was defeated, completed the level or fitness fell under FITNESS_LIMIT.
+        Used by train_ai and env.PlatformerEnv.
+        :param level: level with neat
         :param player: player with neat
-        :param queue: queue for player's distance. If its full - use as it is, if not - wait for it to fill and
-        use temporary one to match our conditions
-        :return: fitness value, distance travelled, queue
+        :param distances: deque of PLAYER_INACTIVE_LIMIT last distances, current one is appended
+        :param frame: number of frames since start
+        :return: fitness value, distance travelled, whether run is over
         """
-        dist = l_neat.distance_traveled(player)
-        fitness = self.fitness(
-            self.frame, dist, player.coins, l_neat.completed,
-            player.enemies_killed, l_neat.check_defeat(player)
-        )
-
-        queue.append(dist)
-        deq = queue if len(queue) == PLAYER_INACTIVE_LIMIT else deque([1, 100])
-        return fitness, dist, deq
+        distance = level.distance_traveled(player)
+        defeat = level.check_defeat(player)
+        fitness = cls.fitness(frame, distance, player.coins, level.completed, player.enemies_killed, defeat)
+        distances.append(distance)
+        staggering = len(distances) == PLAYER_INACTIVE_LIMIT and distances[-1] - distances[0] < player.speed.x * 2 + 1
+        return fitness, distance, staggering or defeat or fitness < FITNESS_LIMIT or level.completed
+
+    def get_training_level(self, level_data=level_0):
+        """
+        Get level with NEAT player for training a single genome. Level is created on the first call and its initial
+        state is captured, next calls reset the same level instead of building it again.
+        :param level_data: level to train on
+        :return: level in its initial state
+        """
+        key = level_key(level_data)
+        if key not in self.training_levels:
+            player = Player((0, 0), neat=True)
+            ui = UI(self.screen, player) if self.draw else None
+            level = Level(level_data, self.screen, player, ui, neat=True, draw=self.draw)
+            self.training_levels[key] = level, level.snapshot()
+        else:
+            level, state = self.training_levels[key]
+            level.reset(state)
+        self.training_level = level
+        return level
 
     def test_ai(self, genome, config):
         """
         Testing certain trained genome. For more details check train_ai function
         """
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        net = self.create_network(genome, config)
 
         player = Player((0, 0), neat=True)
         ui = UI(self.screen, player)
@@ -191,10 +263,10 @@ class Platformer:
             pygame.display.update()
             self.clock.tick(CLOCK_RATE)
 
-    def train_ai(self, genome, config, genome_id, generation):
+    def train_ai(self, genome, config, genome_id, generation, level_data=level_0):
         """
         Function for training genomes of created network. Here's the whole process:
-        1. Create player, ui, level and network.
+        1. Create network, get level reset to its initial state together with its player.
         2. Introduce queue to store player's covered distance in order to check whether player has been moving for
         a duration of PLAYER_INACTIVE_LIMIT. If difference between first and last elements in the queue is less than
         double player's speed then we decide that player is staggering and remove it
@@ -206,38 +278,38 @@ class Platformer:
             4) fitness reached minimum FITNESS_LIMIT(have to implement it in cases of player moving in circles)
         5. Feed input from player's fov to neural network, get decision and decide on an output based on it's value.
         Output might be one of the 6 possible player's moves.
+        Decisions are recorded into self.replay if replays are recorded.
         :param generation: generation number
         :param draw: whether to draw level
         :param genome: genome to control player
         :param config: config player
         :param genome_id: id of input genome
+        :param level_data: level to train on
         """
-        net = neat.nn.FeedForwardNetwork.create(genome, config)
+        net = self.create_network(genome, config)
 
-        player = Player((0, 0), neat=True)
-        if self.draw:
-            ui = UI(self.screen, player)
-        else:
-            ui = None
-        l_neat = Level(level_0, self.screen, player, ui, neat=True, draw=self.draw)
+        l_neat = self.get_training_level(level_data)
+        player = l_neat.player
         queue = deque(maxlen=PLAYER_INACTIVE_LIMIT)
+        self.frame = 0
+        self.replay = Replay('single', level_data, config=CONFIG_DIR, generation=generation, genome=genome_id) \
+            if self.record else None
+        if self.replay is not None:
+            self.replay.record(0)
 
         while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                    return True
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
-                    pygame.mixer.stop()
-                    self.return_to_initial = True
-                    return True
+            if self.check_force_quit():
+                return True
 
             if self.draw:
                 self.screen.fill('grey')
             l_neat.run()
-            fitness, dist, deq = self.get_neat_parameters(l_neat, player, queue)
-            if deq[-1] - deq[0] < player.speed.x * 2 + 1 or l_neat.check_defeat(player) \
-                    or fitness < FITNESS_LIMIT or l_neat.completed:
+            fitness, dist, done = self.measure(l_neat, player, queue, self.frame)
+            if done:
                 genome.fitness += fitness
+                if self.replay is not None:
+                    self.replay.info['fitness'] = fitness
+                    self.replay.info['results'] = [player_results(l_neat, player, dist, self.frame)]
                 if not self.draw:
                     log_no_draw.info(f'Generation: {generation}, genome_id: {genome_id}, fitness: {round(fitness, 1)}, '
                                      f'distance: {int(dist)}')
@@ -246,11 +318,13 @@ class Platformer:
             output = net.activate(l_neat.nparray_to_list(player))
             decision = output.index(max(output))
             self.make_decision(decision, player)
+            if self.replay is not None:
+                self.replay.record(decision)
 
             if self.draw:
                 self.show_text(self.font, self.screen, generation, genome_id, round(fitness, 1), int(dist))
                 pygame.display.update()
-            self.clock.tick(CLOCK_RATE)
+                self.clock.tick(CLOCK_RATE)
             self.frame += 1
 
         return False
@@ -258,69 +332,93 @@ class Platformer:
     def train_ai_multiple(self, genomes, config, generation):
         """
         Function for training NEAT with multiple players simultaneously. For more details check train_ai function.
-        The only difference is that we need to work with lists of players, genomes, neural networks and queues.
-        Also we use different level function to process multiple players at once. And we dont show UI or other
-        text parameters for a single player.
+        All live players are stepped at once: level produces observations for all of them in one pass, compiled
+        networks of the population evaluate them in one batch, and level takes their decisions, while players'
+        training state is kept in arrays indexed by player, with a mask of players still in game. Removed players are
+        masked out, so the rest of players never miss a frame.
+        Distances are kept in a ring buffer of PLAYER_INACTIVE_LIMIT frames instead of queues.
+        Decisions of all players are recorded into self.replay if replays are recorded, removed players get NO_INPUT.
+        We dont show UI or other text parameters for a single player.
         :param generation: generation number
-        :param draw: whether to draw level
         :param genomes: list of genomes to control players
         :param config: config file
         """
-        players = []
-        nets = []
-        ge = []
-        queues = []
-
-        for g_id, g in genomes:
-            g.fitness = 0
-            ge.append(g)
-            net = neat.nn.FeedForwardNetwork.create(g, config)
-            nets.append(net)
-            players.append(Player((0, 0), neat=True))
-            queue = deque(maxlen=PLAYER_INACTIVE_LIMIT)
-            queues.append(queue)
-
-        l_neat = Level(level_0, self.screen, players, None, neat=True, multiple_players=True, draw=self.draw)
-
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
-                    return True
-                elif event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
-                    self.return_to_initial = True
-                    pygame.mixer.stop()
-                    return True
+        clock = SimClock()
+        ge = [genome for genome_id, genome in genomes]
+        nets = [self.create_network(genome, config) for genome in ge]
+        population = PopulationNetwork(nets) if NEAT_NETWORK == 'compiled' else None
+        players = [Player((0, 0), neat=True, clock=clock) for _ in ge]
+        for genome in ge:
+            genome.fitness = 0
+
+        alive = numpy.ones(len(players), dtype=bool)
+        distances = numpy.zeros((len(players), PLAYER_INACTIVE_LIMIT))
+        step = 0
+        self.replay = Replay('multiple', level_0, len(players), config=CONFIG_MULTIPLE_DIR, generation=generation,
+                             genomes=[genome_id for genome_id, genome in genomes]) if self.record else None
+        results = [None] * len(players)
+        inputs = numpy.zeros(len(players), dtype=numpy.uint8)
+        if self.replay is not None:
+            self.replay.record(inputs)
+
+        l_neat = Level(level_0, self.screen, players, None, neat=True, multiple_players=True, draw=self.draw,
+                       clock=clock)
+
+        while alive.any():
+            if self.check_force_quit():
+                return True
 
             if self.draw:
                 self.screen.fill('grey')
             l_neat.run()
 
-            for index, (player, genome, queue, net) in enumerate(zip(players, ge, queues, nets)):
-                fitness, dist, deq = self.get_neat_parameters(l_neat, player, queue)
-                if deq[-1] - deq[0] < player.speed.x * 2 + 1 or l_neat.check_defeat(player) or \
-                        fitness < FITNESS_LIMIT or l_neat.completed:
+            # Fitness of live players and removal of finished ones
+            live = numpy.flatnonzero(alive)
+            live_players = [players[index] for index in live]
+            dist = l_neat.distances_traveled(live_players)
+            distances[live, step % PLAYER_INACTIVE_LIMIT] = dist
+            step += 1
+            if step >= PLAYER_INACTIVE_LIMIT:
+                oldest = distances[live, step % PLAYER_INACTIVE_LIMIT]
+                speed = numpy.fromiter((player.speed.x for player in live_players), dtype=float, count=len(live))
+                finished = dist - oldest < speed * 2 + 1
+            else:
+                finished = numpy.zeros(len(live), dtype=bool)
+            for position, (index, player) in enumerate(zip(live, live_players)):
+                defeat = l_neat.check_defeat(player)
+                fitness = self.fitness(self.frame, dist[position], player.coins, l_neat.completed,
+                                       player.enemies_killed, defeat)
+                if finished[position] or defeat or fitness < FITNESS_LIMIT or l_neat.completed:
                     log_no_draw.info(f"Fitness: {round(fitness, 1)}")
-                    genome.fitness += fitness
-                    players.pop(index)
-                    ge.pop(index)
-                    queues.pop(index)
-                    nets.pop(index)
+                    ge[index].fitness += fitness
+                    results[index] = player_results(l_neat, player, dist[position], step - 1)
                     l_neat.remove_player(player)
-                    break
-
-                output = net.activate(l_neat.nparray_to_list(player))
-                decision = output.index(max(output))
-                self.make_decision(decision, player)
+                    alive[index] = False
+
+            # Decisions of players still in game
+            live = numpy.flatnonzero(alive)
+            live_players = [players[index] for index in live]
+            observations = l_neat.observe(live_players)
+            if population is not None:
+                decisions = population.activate(observations, live).argmax(axis=1)
+            else:
+                decisions = [numpy.argmax(nets[index].activate(observation))
+                             for index, observation in zip(live, observations.tolist())]
+            l_neat.apply_decisions(live_players, decisions)
+            if alive.any() and self.replay is not None:
+                inputs = numpy.full(len(players), NO_INPUT, dtype=numpy.uint8)
+                inputs[live] = decisions
+                self.replay.record(inputs)
 
             if self.draw:
                 self.show_text(self.font, self.screen, generation)
                 pygame.display.update()
-            self.clock.tick(CLOCK_RATE)
+                self.clock.tick(CLOCK_RATE)
             self.frame += 1
 
-            if len(players) == 0:
-                break
-
+        if self.replay is not None:
+            self.replay.info['fitness'] = [genome.fitness for genome in ge]
+            self.replay.info['results'] = results
         return False
 
 
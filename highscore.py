@@ -1,6 +1,8 @@
 import pygame
 import hashlib
 from settings import HASH_KEY, HIGHSCORES_DIR
+from dirty_rects import DirtyRects
+from text_cache import get_font, render
 
 
 class HighScore:
@@ -10,14 +12,23 @@ class HighScore:
     def __init__(self, surface):
         self.surface = surface
         self.highscores = []
+        self.dirty = DirtyRects()
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont("Arial", 40)
+        self.font = get_font("Arial", 40)
 
     def draw(self):
         """
-        Displays loaded high scores
+        Displays loaded high scores. Table is redrawn only when high scores change.
+        :return:
+        """
+        self.dirty.add(self.dirty.screen, ('highscores', tuple(tuple(item) for item in self.highscores)))
+        self.dirty.collect()
+        self.dirty.redraw(self.surface, self.draw_table)
+
+    def draw_table(self):
+        """
+        Draws table of high scores
         :return:
         """
         self.surface.fill("black")
@@ -26,24 +37,24 @@ class HighScore:
         y = 130
         # Initial text
         self.font.bold = True
-        surf_high = self.font.render("High scores:", True, "red")
+        surf_high = render(self.font, "High scores:", "red")
         self.surface.blit(surf_high, (50, 50))
-        surf_name = self.font.render("Name", True, "red")
+        surf_name = render(self.font, "Name", "red")
         self.surface.blit(surf_name, (x, y))
-        surf_score = self.font.render("Coins", True, "red")
+        surf_score = render(self.font, "Coins", "red")
         self.surface.blit(surf_score, (x + 200, y))
-        surf_kills = self.font.render("Enemies destroyed", True, "red")
+        surf_kills = render(self.font, "Enemies destroyed", "red")
         self.surface.blit(surf_kills, (x + 400, y))
 
         # High scores
         y = 200
         self.font.bold = False
         for item in self.highscores:
-            surf_name = self.font.render(item[0], True, "red")
+            surf_name = render(self.font, item[0], "red")
             self.surface.blit(surf_name, (x, y))
-            surf_score = self.font.render(str(item[1]), True, "red")
+            surf_score = render(self.font, item[1], "red")
             self.surface.blit(surf_score, (x+200, y))
-            surf_kills = self.font.render(str(item[2]), True, "red")
+            surf_kills = render(self.font, item[2], "red")
             self.surface.blit(surf_kills, (x+400, y))
             y += 40
 
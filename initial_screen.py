@@ -3,6 +3,8 @@ import sys
 from settings import *
 from neat_game import Neat
 from game import Platformer
+from dirty_rects import DirtyRects
+from text_cache import get_font, render
 
 
 class Button:
@@ -144,8 +146,7 @@ class InitialScreen:
         self.sound.set_volume(0.03)
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont(FONT_STD, FONT_SIZE)
+        self.font = get_font(FONT_STD, FONT_SIZE)
 
         # Buttons
         self.neat = Button(self.screen, (screen_width/8+BUTTON_SPACING, BUTTON_Y), BUTTON_SIZE, self.font, 'Run NEAT')
@@ -159,6 +160,7 @@ class InitialScreen:
         self.normal.mode = 'game'
 
         self.initial_run = True
+        self.dirty = DirtyRects()
 
     def animate(self):
         """
@@ -179,9 +181,16 @@ class InitialScreen:
         else:
             self.rect_for_loop.x = screen_width
 
+    def draw_background(self):
+        """
+        Draw moving background and welcome image
+        """
+        self.screen.blit(self.image, self.rect)
+        self.animate()
+        self.screen.blit(self.welcome, self.welcome_rect)
+
     def no_draw_message(self):
-        font = pygame.font.SysFont('Georgia', 60)
-        surf_text = font.render('Running Neat without drawing', True, 'red')
+        surf_text = render(get_font('Georgia', 60), 'Running Neat without drawing', 'red')
         text_rect = surf_text.get_rect(center=(screen_width/2, screen_height/2-50))
         self.screen.blit(surf_text, text_rect)
 
@@ -228,9 +237,16 @@ class InitialScreen:
                         pygame.quit()
                         sys.exit()
 
-                self.screen.blit(self.image, self.rect)
-                self.animate()
-                self.screen.blit(self.welcome, self.welcome_rect)
+                # Buttons are drawn every frame on top of background, background under them is redrawn only if
+                # they might have changed their look
+                self.dirty.add(self.dirty.screen, ('background', self.rect.x, self.rect_for_loop.x))
+                self.dirty.add(self.welcome_rect, 'welcome')
+                mouse = pygame.mouse.get_pos(), pygame.mouse.get_pressed(3)[0]
+                for button in self.buttons:
+                    hovered = button.initial_upper.collidepoint(mouse[0])
+                    self.dirty.add(button.lower.union(button.initial_upper), ('button', hovered, mouse[1]))
+                self.dirty.collect()
+                self.dirty.redraw(self.screen, self.draw_background)
 
                 for button in self.buttons:
                     button.draw()
@@ -240,8 +256,10 @@ class InitialScreen:
                     if button.pressed:
                         self.set_mode(button.mode)
                         started = True
+                        # Game mode has drawn over the whole screen
+                        self.dirty.invalidate()
 
-                pygame.display.update()
+                pygame.display.update(self.dirty.rects)
                 self.clock.tick(CLOCK_RATE)
 
 
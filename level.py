@@ -1,13 +1,22 @@
 import pygame
+import numpy
+import copy
 from tiles import Tile, StaticTile, EnemyTile, ObjectTile, CoinTile, TerrainTile, WideTile
 from settings import *
-from particle import Particle
+from particle import ParticlePool
 import logging
 import utils
 from decoration import Sky, Water, Clouds
 from endgame import EndGame
 from types import GeneratorType
-import numpy
+from fov_grid import FovGrid, FOV_ROWS, FOV_COLUMNS, PLAYER_CELL
+from sim_clock import SimClock
+from tile_groups import TileGroup, StaticTileGroup, BakedLayer, spritecollide
+from level_compiler import CompiledLevel, EMPTY_CELL
+from level_stream import LevelStream
+from text_cache import get_font, render
+from profiler import FrameProfiler
+import time
 
 # Logging
 log = logging.getLogger("platform")
@@ -22,18 +31,31 @@ class LevelError(Exception):
     pass
 
 
+# Level attributes changing while level runs, saved by Level.snapshot
+LEVEL_STATE = ('world_shift', 'camera_offset', 'completed', 'back_to_menu', 'postponed', 'started', 'furthest_saved',
+               'furthest_changed', 'furthest', 'max_x', 'prev_shift')
+# Attributes pygame keeps in every sprite, groups of a sprite are saved through Sprite.groups instead
+SPRITE_ATTRIBUTES = frozenset(vars(pygame.sprite.Sprite()))
+
+
 class Level:
     """
     Class for creating, adjusting and processing level of the game.
     """
 
-    def __init__(self, level_data, surface, player, ui, neat=False, multiple_players=False, draw=True):
+    def __init__(self, level_data, surface, player, ui, neat=False, multiple_players=False, draw=True, clock=None,
+                 streaming=False):
         """
         world_shift - allows us to move camera when player reaches certain lines on the screen
+        camera_offset - overall world shift since level creation. Tiles are kept in level coordinates and moved by
+        camera offset only when drawn, players are kept in screen coordinates
+        clock - simulation clock, ticks once per frame
         back_to_menu - flag to check if game should get back to overworld
         postponed - flag to pause level if backspace was hit
         endgame - class for endgame screen
-        neat_tiles - tiles level should treat as objects affected by world shift for NEAT to work properly
+        fov_grid - occupancy grid of the level for building players' field of view
+        profiler - timing of frame phases, None unless PROFILE_FLAG is set
+        stream - streaming of tiles around the camera, None if all tiles are created at once
         furthest_saved - saves furthest player from previous run
         furthest_changed - whether furthest player has changed since last run
         furthest - player with most X position of all
@@ -43,6 +65,10 @@ class Level:
         :param surface: surface to draw on
         :param neat - whether a player will be managed by NEAT
         :param multiple_players - whether level will be handling multiple AI players
+        :param draw: whether to draw level
+        :param clock: simulation clock, defaults to the clock of the (first) player
+        :param streaming: whether to create tiles only for chunks of the level around the camera (see LevelStream),
+        needs compiled level
         """
         if not isinstance(level_data, dict):
             raise LevelError(f'Level data should be dict, not {type(level_data)}')
@@ -54,9 +80,15 @@ class Level:
         self.neat = neat
         self.multiple_players = multiple_players
         self.draw = draw
+        if clock is None:
+            first_player = player[0] if self.multiple_players and player else player
+            clock = getattr(first_player, 'clock', None) or SimClock()
+        self.clock = clock
+        self.profiler = FrameProfiler() if PROFILE_FLAG else None
 
         # Local level variables
         self.world_shift = 0
+        self.camera_offset = 0
         self.gravity = GRAVITY
         self.level_width = 0
 
@@ -69,15 +101,17 @@ class Level:
         # Particles
         self.particles = pygame.sprite.Group()
         self.run_particles = pygame.sprite.GroupSingle()
-
-        # Tiles
-        self.terrain_tiles = pygame.sprite.Group()
-        self.background_tiles = pygame.sprite.Group()
-        self.enemy_tiles = pygame.sprite.Group()
-        self.objects_tiles = pygame.sprite.Group()
-        self.constrains = pygame.sprite.Group()
-        self.level_end = pygame.sprite.Group()
-        self.tree_obs = pygame.sprite.Group()
+        self.particle_pool = ParticlePool()
+
+        # Tiles. Static tiles are indexed by level cells for drawing and collisions, see StaticTileGroup
+        self.terrain_tiles = StaticTileGroup()
+        self.background_tiles = StaticTileGroup()
+        self.enemy_tiles = TileGroup()
+        self.objects_tiles = StaticTileGroup()
+        self.animated_tiles = pygame.sprite.Group()
+        self.constrains = StaticTileGroup()
+        self.level_end = StaticTileGroup()
+        self.tree_obs = StaticTileGroup()
 
         # Player
         if not self.multiple_players:
@@ -86,30 +120,48 @@ class Level:
             self.players = pygame.sprite.Group()
 
         self.preloaded = Level.preload_images()
-        [self.create_tile_group(key) for key in self.level_data]
+        # Compiled level is loaded in one read, csv layers are parsed only if it is missing or outdated
+        compiled = CompiledLevel.load(self.level_data)
+        self.stream = None
+        if streaming:
+            if compiled is None:
+                raise LevelError('Streaming needs compiled level, run level_compiler.py')
+            self.stream = LevelStream(self, compiled)
+            self.level_width = compiled.level_width
+            self.create_tile('player', 0, *compiled.spawn)
+        elif compiled is not None:
+            self.create_compiled_tiles(compiled)
+        else:
+            [self.create_tile_group(key) for key in self.level_data]
 
-        # Tile group for drawing
+        # Tile group for drawing. Background and terrain never change, so they are drawn from baked layer
         self.all_tiles = [self.background_tiles, self.terrain_tiles, self.enemy_tiles, self.objects_tiles]
+        self.dynamic_tiles = [self.enemy_tiles, self.objects_tiles]
+        self.static_layer = BakedLayer([self.background_tiles, self.terrain_tiles], lazy=streaming) \
+            if self.draw else None
 
         # Background
-        self.sky = Sky(8)
-        self.water = Water(screen_height - 40, self.level_width)
-        self.clouds = Clouds(400, self.level_width, 20)
+        if self.draw:
+            self.sky = Sky(8)
+            self.water = Water(screen_height - 40, self.level_width)
+            self.clouds = Clouds(400, self.level_width, 20)
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont('Arial', 30)
+        self.font = get_font('Arial', 30)
 
         # Sound
-        self.coin_sound = pygame.mixer.Sound(COIN_SOUND_DIR)
-        self.coin_sound.set_volume(0.3)
-        self.stomp_sound = pygame.mixer.Sound(STOMP_SOUND_DIR)
-        self.stomp_sound.set_volume(0.8)
-        self.hit_sound = pygame.mixer.Sound(HIT_SOUND_DIR)
-        self.level_music = pygame.mixer.Sound(LEVEL_MUSIC_DIR)
+        self.coin_sound = utils.load_sound(COIN_SOUND_DIR, 0.3)
+        self.stomp_sound = utils.load_sound(STOMP_SOUND_DIR, 0.8)
+        self.hit_sound = utils.load_sound(HIT_SOUND_DIR)
+        self.level_music = utils.load_sound(LEVEL_MUSIC_DIR)
 
         # Neat
-        self.tiles_neat = [self.terrain_tiles, self.enemy_tiles, self.objects_tiles, self.tree_obs]
+        # Layers of compiled level published in shared memory are used as they are, see shared_level
+        fov_layers = compiled.fov_layers if compiled is not None and self.stream is None else None
+        self.fov_grid = FovGrid(self.level_width, self.terrain_tiles, self.tree_obs, self.objects_tiles, fov_layers)
+        if self.stream is not None:
+            self.stream.update(self.camera_offset)
+        self.fov_grid.sync_enemies(self.enemy_tiles)
         # Neat multiple players
         self.furthest_saved = None
         self.furthest_changed = False
@@ -120,7 +172,7 @@ class Level:
     @staticmethod
     def load_img(path_dict):
         """
-        Loading images from their path's
+        Loading images from their path's through the asset cache
         :param path_dict: dictionary with paths to images
         :return: dictionary with same key as path_dict and loaded image as value
         """
@@ -128,14 +180,14 @@ class Level:
             raise LevelError('Wrong path to dictionary with tiles.')
         img_dict = dict()
         for index, value in path_dict.items():
-            img_dict[index] = pygame.image.load(value).convert_alpha()
+            img_dict[index] = utils.load_image(value)
         return img_dict
 
     @classmethod
     def preload_images(cls):
         """
-        Function for converting type of image into surface with image
-        :param type: type of image
+        Function for converting type of image into surface with image. Images are cached, so only the first level
+        of the process loads them from disk.
         :return:
         """
         preload_dict = {
@@ -151,7 +203,7 @@ class Level:
 
     def create_tile_group(self, type_):
         """
-        Method for creating tile groups for terrain, trees, objects, enemies ans so on
+        Method for creating tile groups for terrain, trees, objects, enemies ans so on from csv layer
         :param type_: type of tiles to create
         :return:
         """
@@ -160,8 +212,6 @@ class Level:
         tilefile = utils.import_csv(self.level_data[type_])
         if not isinstance(tilefile, GeneratorType):
             raise LevelError('Error during csv import.')
-        if type_ not in ('player', "tree obstacle"):
-            imgs = self.preloaded[type_]
         row = 0
         for line in tilefile:
             if not isinstance(line, list):
@@ -170,62 +220,78 @@ class Level:
                 self.level_width = len(line) * tile_size
             for column, item in enumerate(line):
                 if item != '-1':
-                    x = tile_size * column
-                    y = tile_size * row
-                    if type_ == 'terrain':
-                        terrain_surf = imgs[int(item)]
-                        sprite = TerrainTile(tile_size, (x, y), terrain_surf)
-                        self.terrain_tiles.add(sprite)
-                    if type_ in ('enemies', 'constrains'):
-                        enemies_surf = imgs[int(item)]
-                        if item == '0':
-                            sprite = EnemyTile(tile_size, (x, y), enemies_surf)
-                            self.enemy_tiles.add(sprite)
-                        elif item == '1':
-                            sprite = Tile(tile_size, (x, y))
-                            self.constrains.add(sprite)
-                    if type_ == 'player':
-                        if item == '0':
-                            if self.multiple_players:
-                                for player in self.player:
-                                    player.rect.topleft = (x, y)
-                                    self.players.add(player)
-                            else:
-                                self.player.rect.topleft = (x, y)
-                                self.players.add(self.player)
-                        elif item == '1':
-                            sprite = Tile(tile_size, (x, y))
-                            self.level_end.add(sprite)
-                    if type_ == 'grass':
-                        img = imgs[int(item)]
-                        sprite = StaticTile(tile_size, (x, y), img)
-                        self.background_tiles.add(sprite)
-                    if type_ == 'trees':
-                        img = imgs[int(item)]
-                        sprite = StaticTile(tile_size, (x, y), img)
-                        self.background_tiles.add(sprite)
-                    if type_ == 'fg trees':
-                        img = imgs[int(item)]
-                        sprite = StaticTile(tile_size, (x, y), img)
-                        self.background_tiles.add(sprite)
-                    if type_ == "tree obstacle":
-                        sprite = Tile(tile_size + TREE_OBSTACLE_ADDED_SPACE, (x, y))
-                        self.tree_obs.add(sprite)
-                    if type_ == 'coins':
-                        img = imgs[int(item)]
-                        if item == '0':
-                            sprite = CoinTile(tile_size, (x, y), img)
-                        else:
-                            sprite = ObjectTile(tile_size, (x, y), img)
-                            if item == '1':
-                                sprite.value = 5
-                            elif item == '3':
-                                sprite.value = 10
-                            elif item == '2':
-                                sprite.hp_recovery = True
-                        self.objects_tiles.add(sprite)
+                    self.create_tile(type_, int(item), tile_size * column, tile_size * row)
             row += 1
 
+    def create_compiled_tiles(self, compiled):
+        """
+        Method for creating all tile groups from compiled level, see level_compiler
+        :param compiled: CompiledLevel with layers of the level
+        :return:
+        """
+        self.level_width = compiled.level_width
+        for type_ in self.level_data:
+            grid = numpy.asarray(compiled.layer(type_))
+            # Cells are visited row by row, same as in csv
+            rows, columns = numpy.nonzero(grid != EMPTY_CELL)
+            for row, column, item in zip(rows.tolist(), columns.tolist(), grid[rows, columns].tolist()):
+                self.create_tile(type_, item, tile_size * column, tile_size * row)
+
+    def create_tile(self, type_, item, x, y):
+        """
+        Create tile of given type and add it to its group
+        :param type_: type of tiles
+        :param item: index of tile in its layer
+        :param x: X coordinate in the level
+        :param y: Y coordinate in the level
+        :return: created tile, None if player was placed
+        """
+        sprite = None
+        if type_ == 'terrain':
+            sprite = TerrainTile(tile_size, (x, y), self.preloaded[type_][item])
+            self.terrain_tiles.add(sprite)
+        elif type_ in ('enemies', 'constrains'):
+            if item == 0:
+                sprite = EnemyTile(tile_size, (x, y), self.preloaded[type_][item])
+                self.enemy_tiles.add(sprite)
+            elif item == 1:
+                sprite = Tile(tile_size, (x, y))
+                self.constrains.add(sprite)
+        elif type_ == 'player':
+            if item == 0:
+                if self.multiple_players:
+                    for player in self.player:
+                        player.rect.topleft = (x, y)
+                        self.players.add(player)
+                else:
+                    self.player.rect.topleft = (x, y)
+                    self.players.add(self.player)
+                return None
+            elif item == 1:
+                sprite = Tile(tile_size, (x, y))
+                self.level_end.add(sprite)
+        elif type_ in ('grass', 'trees', 'fg trees'):
+            sprite = StaticTile(tile_size, (x, y), self.preloaded[type_][item])
+            self.background_tiles.add(sprite)
+        elif type_ == "tree obstacle":
+            sprite = Tile(tile_size + TREE_OBSTACLE_ADDED_SPACE, (x, y))
+            self.tree_obs.add(sprite)
+        elif type_ == 'coins':
+            img = self.preloaded[type_][item]
+            if item == 0:
+                sprite = CoinTile(tile_size, (x, y), img)
+                self.animated_tiles.add(sprite)
+            else:
+                sprite = ObjectTile(tile_size, (x, y), img)
+                if item == 1:
+                    sprite.value = 5
+                elif item == 3:
+                    sprite.value = 10
+                elif item == 2:
+                    sprite.hp_recovery = True
+            self.objects_tiles.add(sprite)
+        return sprite
+
     def scroll_x(self, player):
         """
         Scroll the whole level if player reaches certain positions
@@ -268,8 +334,8 @@ class Level:
         :param surface: surface of our game
         :return:
         """
-        surf_lives = font.render(f"Player lives = {lives}", True, 'red')
-        surf_coins = font.render(f"Player coins = {coins}", True, 'red')
+        surf_lives = render(font, f"Player lives = {lives}", 'red')
+        surf_coins = render(font, f"Player coins = {coins}", 'red')
         surface.blit(surf_lives, (30, 30))
         surface.blit(surf_coins, (300, 30))
 
@@ -323,7 +389,7 @@ class Level:
         player.rect.y = player.exact_y
         collision_tolerance = abs(player.direction.y) + 1
 
-        collision = pygame.sprite.spritecollide(player, trees, dokill=False)
+        collision = spritecollide(player, trees, dokill=False)
         # Grouping 2 tiles into WideTile
         if len(collision) == 2:
             temp = sorted(collision, key=lambda item: item.rect.x)
@@ -346,7 +412,8 @@ class Level:
         :param objects: objects to collide with
         :return:
         """
-        for object_ in pygame.sprite.spritecollide(player, objects, dokill=True):
+        for object_ in spritecollide(player, objects, dokill=True):
+            self.fov_grid.remove(object_)
             player.coins += object_.value
             if object_.value:
                 if self.draw:
@@ -361,7 +428,7 @@ class Level:
         :return:
         """
         particle_offset = pygame.math.Vector2(20, 50)
-        self.particles.add(Particle(pos - particle_offset, 'explosion'))
+        self.particles.add(self.particle_pool.get(pos - particle_offset, 'explosion'))
 
     def enemy_collision(self, player, enemies):
         """
@@ -380,14 +447,14 @@ class Level:
         for enemy in enemies:
             if player.rect.colliderect(enemy.collision_rect):
                 if player.direction.y > 0 and player.rect.bottom - enemy.collision_rect.top < collision_tolerance:
-                    self.add_explosion_particles(enemy.rect.topleft)
+                    self.add_explosion_particles((enemy.rect.x + self.camera_offset, enemy.rect.y))
                     if self.draw:
                         self.stomp_sound.play()
                     enemies.remove(enemy)
                     player.enemies_killed += 1
                     killed = True
                 else:
-                    now = pygame.time.get_ticks()
+                    now = self.clock.get_ticks()
                     if now - player.last_hit >= AFTER_DAMAGE_INVUL:
                         player.last_hit = now
                         if self.draw:
@@ -405,7 +472,7 @@ class Level:
         :param tiles: invisible constraints for enemies
         :return:
         """
-        if pygame.sprite.spritecollide(enemy, tiles, dokill=False):
+        if spritecollide(enemy, tiles, dokill=False):
             enemy.enemy_speed *= -1
             enemy.flipped_flag = not enemy.flipped_flag
 
@@ -416,8 +483,9 @@ class Level:
         :param tiles: invisible tiles, marking level's end
         :return:
         """
-        if pygame.sprite.spritecollide(player, tiles, dokill=False):
-            pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL + 2).stop()
+        if spritecollide(player, tiles, dokill=False):
+            if self.draw:
+                pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL + 2).stop()
             player.levels_completed += 1
             self.completed = True
 
@@ -476,7 +544,7 @@ class Level:
         player.rect.x = player.exact_x
 
         collision_tolerance = (player.speed.x + 1) * abs(player.direction.x)
-        for tile in pygame.sprite.spritecollide(player, tiles, dokill=False):
+        for tile in spritecollide(player, tiles, dokill=False):
             log.info("Collision from X")
             if tile.rect.right - player.rect.left < collision_tolerance:
                 collided_x = True
@@ -509,7 +577,7 @@ class Level:
         player.rect.y = player.exact_y
         log.debug(f"Player y = {player.rect.y}, exact y = {player.exact_y}")
 
-        for tile in pygame.sprite.spritecollide(player, tiles, dokill=False):
+        for tile in spritecollide(player, tiles, dokill=False):
             log.info("Collision from Y")
             if tile.rect.bottom - player.rect.top < collision_tolerance:
                 collided_y = True
@@ -550,21 +618,22 @@ class Level:
         """
         if player.prev_state != "jump" and player.direction.y < 0:
             particle_offset = pygame.math.Vector2(-10, 30)
-            jump_particle = Particle(player.rect.bottomleft - particle_offset, 'jump')
+            jump_particle = self.particle_pool.get(player.rect.bottomleft - particle_offset, 'jump')
             self.particles.add(jump_particle)
             log.debug(f"Jump particle created {jump_particle.rect.x}, {jump_particle.rect.y}")
         elif player.prev_state == "jump" and player.on_ground:
             particle_offset = pygame.math.Vector2(20, 40)
-            landing_particle = Particle(player.rect.bottomleft - particle_offset, 'land')
+            landing_particle = self.particle_pool.get(player.rect.bottomleft - particle_offset, 'land')
             self.particles.add(landing_particle)
             log.debug(f"Landing particle created {landing_particle.rect.x}, {landing_particle.rect.y}")
 
         if player.prev_state != 'run' and player.state == "run":
             particle_offset = pygame.math.Vector2(10, 0)
             if player.moving_right:
-                run_particle = Particle(player.rect.bottomleft - particle_offset, 'run')
+                run_particle = self.particle_pool.get(player.rect.bottomleft - particle_offset, 'run')
             else:
-                run_particle = Particle(player.rect.bottomright - particle_offset, 'run', flipped=True)
+                run_particle = self.particle_pool.get(player.rect.bottomright - particle_offset, 'run',
+                                                     flipped=True)
             self.run_particles.add(run_particle)
             log.debug(f"Run particle created {run_particle.rect.x}, {run_particle.rect.y}")
 
@@ -580,7 +649,7 @@ class Level:
         sprite = run_particles.sprite
         if sprite:
             if player.state != 'run':
-                run_particles.remove(sprite)
+                self.particle_pool.release(sprite)
             else:
                 if player.moving_right:
                     sprite.rect.x, sprite.rect.y = player.rect.x - 10, player.rect.bottom - 10
@@ -618,6 +687,8 @@ class Level:
         3 - objects like coins
         4 - player itself (might try not inserting it into array)
         -1 - enemy tiles
+        Squares are taken as a slice of level's occupancy grid (see FovGrid) moved by camera offset, instead of
+        checking every tile of the level for every square.
         It might be useful to try different ways of detecting enemies and player inside the square, like based on
         X position or central position or even trying to let enemy fill all the squares where it was detected.
         we also might try to spread FOV to the left of the player since it can move towards that direction by
@@ -628,34 +699,8 @@ class Level:
         """
         pl_x = int((player.rect.x + player.speed.x + 1) // tile_size)
         pl_y = int(player.rect.y // tile_size) - 1
-        fov_array = numpy.empty(((screen_height // tile_size) - 1, FOV_DISTANCE + LEFT_FOV_ADJUSTMENT))
-        column = 0
-        for x in range((pl_x - LEFT_FOV_ADJUSTMENT) * tile_size, (pl_x + FOV_DISTANCE) * tile_size, tile_size):
-            row = 0
-            for y in range(tile_size, screen_height, tile_size):
-                tile_found = False
-                for tile_type in self.tiles_neat:
-                    for tile in tile_type.sprites():
-                        if tile.rect.x in range(x, x + tile_size) and tile.rect.y in range(y, y + tile_size):
-                            if tile_type is self.terrain_tiles:
-                                fov_array[row][column] = 1
-                                tile_found = True
-                            elif tile_type is self.tree_obs:
-                                fov_array[row][column] = 2
-                                tile_found = True
-                            elif tile_type is self.enemy_tiles:
-                                fov_array[row][column] = -1
-                                tile_found = True
-                            elif tile_type is self.objects_tiles:
-                                fov_array[row][column] = 3
-                                tile_found = True
-                if not tile_found:
-                    fov_array[row][column] = 0
-                row += 1
-            column += 1
-        fov_array[pl_y][LEFT_FOV_ADJUSTMENT] = 4
-        # print(fov_array)
-        # print("----------------------")
+        fov_array = self.fov_grid.window(pl_x - LEFT_FOV_ADJUSTMENT, FOV_COLUMNS, self.camera_offset)
+        fov_array[pl_y][LEFT_FOV_ADJUSTMENT] = PLAYER_CELL
         return fov_array
 
     def distance_traveled(self, player):
@@ -679,8 +724,73 @@ class Level:
         Convert 2d array into list with multiple values for feeding to neural network as input
         :return: list
         """
-        fv = self.fov(player)
-        return fv.reshape(-1).tolist()
+        if self.profiler is None:
+            return self.fov(player).reshape(-1).tolist()
+        start = time.perf_counter()
+        fv = self.fov(player).reshape(-1).tolist()
+        self.profiler.add('fov', time.perf_counter() - start)
+        return fv
+
+    # Batched functions for multiple AI players
+    ############################
+
+    def observe(self, players):
+        """
+        Field of view of all given players at once, see gather_fov. Timed if profiler is on.
+        :param players: list of players
+        :return: 2d array, one row of FOV_ROWS * FOV_COLUMNS values for each player
+        """
+        if self.profiler is None:
+            return self.gather_fov(players)
+        start = time.perf_counter()
+        fov_arrays = self.gather_fov(players)
+        self.profiler.add('fov', time.perf_counter() - start)
+        return fov_arrays
+
+    def gather_fov(self, players):
+        """
+        Field of view of all given players at once (see fov). Occupancy grid is sliced once for the columns
+        covering every player's FOV, then each player's part is gathered by index.
+        :param players: list of players
+        :return: 2d array, one row of FOV_ROWS * FOV_COLUMNS values for each player
+        """
+        amount = len(players)
+        if not amount:
+            return numpy.zeros((0, FOV_ROWS * FOV_COLUMNS))
+        pl_x = numpy.fromiter(((player.rect.x + player.speed.x + 1) // tile_size for player in players),
+                              dtype=int, count=amount)
+        pl_y = numpy.fromiter((player.rect.y // tile_size - 1 for player in players), dtype=int, count=amount)
+        first = pl_x.min()
+        cells = self.fov_grid.window(first - LEFT_FOV_ADJUSTMENT, pl_x.max() - first + FOV_COLUMNS,
+                                     self.camera_offset)
+        columns = (pl_x - first)[:, None] + numpy.arange(FOV_COLUMNS)
+        fov_arrays = cells[:, columns].transpose(1, 0, 2)
+        fov_arrays[numpy.arange(amount), pl_y, LEFT_FOV_ADJUSTMENT] = PLAYER_CELL
+        return fov_arrays.reshape(amount, -1)
+
+    def distances_traveled(self, players):
+        """
+        Distance each of given players has moved in the level (see distance_traveled). Camera movement is taken
+        into account once per frame for all players.
+        :param players: list of players
+        :return: array of distances
+        """
+        if not (self.prev_shift == 0 and self.world_shift != 0):
+            for player in players:
+                player.shifted += -self.world_shift
+        self.prev_shift = self.world_shift
+        return numpy.fromiter((player.rect.x + player.shifted for player in players), dtype=float,
+                              count=len(players))
+
+    @staticmethod
+    def apply_decisions(players, decisions):
+        """
+        Make every player act on decision of its neural network
+        :param players: list of players
+        :param decisions: decision for each player
+        """
+        for player, decision in zip(players, decisions):
+            player.make_decision(decision)
 
     ############################
 
@@ -720,24 +830,58 @@ class Level:
             else:
                 player.rect.x += self.world_shift
 
+    def update_tiles(self):
+        """
+        Update tiles that change every frame. Enemies move, animated tiles change images only when level is drawn.
+        Static tiles aren't touched, cause camera movement is applied only when drawing. Streamed level loads and
+        releases chunks of tiles after camera has moved.
+        """
+        if self.stream is not None:
+            self.stream.update(self.camera_offset)
+        self.enemy_tiles.update()
+        if self.draw:
+            self.animated_tiles.update()
+
+    @staticmethod
+    def shift_player(player, shift):
+        """
+        Move player along X axis together with its rounded up position. Used to move player from screen into level
+        coordinates for collisions with tiles and back.
+        :param player: player's sprite
+        :param shift: amount of pixels to move player by
+        """
+        player.rect.x += shift
+        player.exact_x += shift
+
+    def draw_tiles(self):
+        """
+        Draw tiles seen by the camera
+        """
+        self.static_layer.draw(self.surface, self.camera_offset)
+        for tiles in self.dynamic_tiles:
+            tiles.draw_visible(self.surface, self.camera_offset)
+
     def draw_multiple(self):
         """
         :param draw: whether to draw Level(useful for NEAT implementation)
         Running level with NEAT multiple players:
-        0. Draw background
+        0. Move camera, draw background
         1. Processing external changes to players states
-        2. Update tiles and other non-player objects
+        2. Update enemies and other dynamic objects
         3. Process players collisions with other objects
         4. Get players new states according to new circumstances
         5. Draw everything if draw is True
         We don't process particles when dealing with multiple players to make calculations easier.
         """
         # 0.
+        self.camera_offset += self.world_shift
         if self.draw:
             self.sky.draw(self.surface)
-            self.clouds.draw(self.surface, self.world_shift)
-            self.water.draw(self.surface, self.world_shift)
+            self.clouds.draw(self.surface, self.camera_offset)
+            self.water.draw(self.surface, self.camera_offset)
             self.start_music()
+        if self.profiler is not None:
+            self.profiler.lap('background')
 
         # 1.
         for player in self.players.sprites():
@@ -745,25 +889,29 @@ class Level:
             self.apply_gravity(self.gravity, player)
             self.permit_jump(player)
             player.get_keys(neat=self.neat)
+        if self.profiler is not None:
+            self.profiler.lap('external')
 
         # 2.
         self.players.update()
-        for tile in self.all_tiles:
-            tile.update(self.world_shift)
-        self.constrains.update(self.world_shift)
-        self.tree_obs.update(self.world_shift)
-        self.level_end.update(self.world_shift)
+        self.update_tiles()
+        if self.profiler is not None:
+            self.profiler.lap('updates')
 
         # 3.
         for player in self.players.sprites():
+            self.shift_player(player, -self.camera_offset)
             self.collision_x_handler(player, self.terrain_tiles)
             self.collision_y_handler(player, self.terrain_tiles)
             self.tree_collision(player, self.tree_obs)
             self.objects_collision(player, self.objects_tiles)
             self.enemy_collision(player, self.enemy_tiles)
             self.level_finish(player, self.level_end)
+            self.shift_player(player, self.camera_offset)
         for enemy in self.enemy_tiles.sprites():
             self.enemy_constrains(enemy, self.constrains)
+        if self.neat:
+            self.fov_grid.sync_enemies(self.enemy_tiles)
         if self.multiple_players:
             self.get_futher(self.players.sprites())
             if not self.furthest_changed:
@@ -771,79 +919,173 @@ class Level:
             self.move_other(self.players.sprites())
         else:
             self.scroll_x(self.players.sprite)
+        if self.profiler is not None:
+            self.profiler.lap('collisions')
 
         # 4.
         for player in self.players.sprites():
             self.check_state(player)
         log.info("-------------")
+        if self.profiler is not None:
+            self.profiler.lap('state')
 
         # 5.
         if self.draw:
-            for tile in self.all_tiles:
-                tile.draw(self.surface)
+            self.draw_tiles()
             self.players.draw(self.surface)
+        if self.profiler is not None:
+            self.profiler.lap('drawing')
 
     def draw_level(self):
         """
         :param draw: whether to draw Level(useful for NEAT implementation)
         Running level following these consecutive steps:
-        0. Draw background
+        0. Move camera, draw background
         1. Processing external changes to player's state
-        2. Update tiles and other non-player objects
+        2. Update enemies and other dynamic objects
         3. Process player's collisions
         4. Get player's new state according to new circumstances
         5. Draw everything
+        Background, particles and sounds are skipped if level isn't drawn.
         """
         # 0.
+        self.camera_offset += self.world_shift
         if self.draw:
             self.sky.draw(self.surface)
-            self.clouds.draw(self.surface, self.world_shift)
-            self.water.draw(self.surface, self.world_shift)
+            self.clouds.draw(self.surface, self.camera_offset)
+            self.water.draw(self.surface, self.camera_offset)
             self.start_music()
+        if self.profiler is not None:
+            self.profiler.lap('background')
 
         # 1.
         self.restore_player(self.players.sprite)
         self.apply_gravity(self.gravity, self.players.sprite)
         self.permit_jump(self.players.sprite)
         self.return_to_menu(self.players.sprite)
+        if self.profiler is not None:
+            self.profiler.lap('external')
 
         # 2.
         self.players.sprite.get_keys(neat=self.neat)
         self.players.update()
-        for tile in self.all_tiles:
-            tile.update(self.world_shift)
-        self.constrains.update(self.world_shift)
-        self.tree_obs.update(self.world_shift)
-        self.level_end.update(self.world_shift)
+        self.update_tiles()
+        if self.profiler is not None:
+            self.profiler.lap('updates')
 
         # 3.
+        self.shift_player(self.players.sprite, -self.camera_offset)
         self.collision_x_handler(self.players.sprite, self.terrain_tiles)
         self.collision_y_handler(self.players.sprite, self.terrain_tiles)
         self.tree_collision(self.players.sprite, self.tree_obs)
         self.objects_collision(self.players.sprite, self.objects_tiles)
         self.enemy_collision(self.players.sprite, self.enemy_tiles)
         self.level_finish(self.players.sprite, self.level_end)
+        self.shift_player(self.players.sprite, self.camera_offset)
         for enemy in self.enemy_tiles.sprites():
             self.enemy_constrains(enemy, self.constrains)
+        if self.neat:
+            self.fov_grid.sync_enemies(self.enemy_tiles)
         self.scroll_x(self.players.sprite)
+        if self.profiler is not None:
+            self.profiler.lap('collisions')
 
         # 4.
         self.check_state(self.players.sprite)
-        self.particle_create(self.players.sprite)
+        if self.draw:
+            self.particle_create(self.players.sprite)
         log.info("-------------")
+        if self.profiler is not None:
+            self.profiler.lap('state')
 
         # 5.
         if self.draw:
-            for tile in self.all_tiles:
-                tile.draw(self.surface)
+            self.draw_tiles()
             self.particle_draw(self.players.sprite, self.particles, self.run_particles)
             self.players.draw(self.surface)
             self.ui.draw()
+        if self.profiler is not None:
+            self.profiler.lap('drawing')
+
+    @staticmethod
+    def save_state(sprite):
+        """
+        Copy attributes of a sprite. Rects, vectors and containers are copied, so later changes don't affect saved
+        state, images and other values are shared.
+        :param sprite: sprite to save
+        :return: dict with sprite's attributes, groups the sprite belongs to
+        """
+        attributes = {name: copy.copy(value) if isinstance(value, (pygame.Rect, pygame.math.Vector2, dict, list))
+                      else value for name, value in vars(sprite).items() if name not in SPRITE_ATTRIBUTES}
+        return attributes, sprite.groups()
+
+    @staticmethod
+    def load_state(sprite, state):
+        """
+        Restore attributes and groups of a sprite saved by save_state. Groups the sprite still belongs to keep their
+        order of sprites.
+        """
+        attributes, groups = state
+        for name, value in attributes.items():
+            setattr(sprite, name, copy.copy(value) if isinstance(value, (pygame.Rect, pygame.math.Vector2, dict, list))
+                    else value)
+        sprite.remove(*[group for group in sprite.groups() if group not in groups])
+        sprite.add(*groups)
+
+    def snapshot(self):
+        """
+        Capture state of the level which changes while level runs: camera, flags, members of tile groups that can
+        lose tiles, state of enemies, animated tiles and players, FOV grid and clock. Terrain and other static
+        tiles are never changed, so they aren't saved, unless level is streamed and they are loaded and released.
+        :return: state to pass to reset
+        """
+        groups = (self.enemy_tiles, self.objects_tiles, self.animated_tiles, self.players)
+        if self.stream is not None:
+            groups = self.stream.groups + (self.players,)
+        sprites = set(self.enemy_tiles) | set(self.animated_tiles) | set(self.players)
+        return {
+            'level': {name: getattr(self, name) for name in LEVEL_STATE},
+            'groups': [(group, group.sprites()) for group in groups],
+            'sprites': {sprite: self.save_state(sprite) for sprite in sprites},
+            'fov grid': (FovGrid.copy_layers(self.fov_grid.layers), dict(self.fov_grid.cells), self.fov_grid.origin,
+                         self.fov_grid.columns),
+            'frame': self.clock.frame,
+            'stream': self.stream.snapshot() if self.stream is not None else None,
+        }
+
+    def reset(self, state):
+        """
+        Bring level back to captured state, so the same level can be played again without being created anew,
+        e.g. by every genome of NEAT population. Particles are removed.
+        :param state: state returned by snapshot
+        """
+        for name, value in state['level'].items():
+            setattr(self, name, value)
+        for group, sprites in state['groups']:
+            group.empty()
+            group.add(*sprites)
+        for sprite, sprite_state in state['sprites'].items():
+            self.load_state(sprite, sprite_state)
+        layers, cells, origin, columns = state['fov grid']
+        self.fov_grid.layers = FovGrid.copy_layers(layers)
+        self.fov_grid.cells = dict(cells)
+        self.fov_grid.origin = origin
+        self.fov_grid.columns = columns
+        if self.stream is not None:
+            self.stream.reset(state['stream'])
+        self.fov_grid.sync_enemies(self.enemy_tiles)
+        for particle in self.particles.sprites() + self.run_particles.sprites():
+            self.particle_pool.release(particle)
+        self.clock.frame = state['frame']
 
     def run(self):
         """
-        Function for running level depending on NEAT mode and whether player has been defeated
+        Function for running level depending on NEAT mode and whether player has been defeated.
+        Advances simulation clock by one frame. If profiler is on, phases of the frame are timed and their statistics
+        are drawn over the level.
         """
+        if self.profiler is not None:
+            self.profiler.begin()
         if self.neat:
             if self.multiple_players:
                 self.draw_multiple()
@@ -854,4 +1096,9 @@ class Level:
                 self.goto_endscore()
             else:
                 self.draw_level()
+        if self.profiler is not None:
+            self.profiler.end()
+            if self.draw:
+                self.profiler.draw(self.surface)
+        self.clock.tick()
 
@@ -0,0 +1,142 @@
+import os
+import numpy
+import utils
+from settings import *
+
+# Layers of a level in the order they are stacked in compiled file
+LEVEL_LAYERS = ('terrain', 'coins', 'constrains', 'enemies', 'player', 'grass', 'trees', 'fg trees', 'tree obstacle')
+# Value of empty cell in layer grids
+EMPTY_CELL = -1
+# Levels attached from shared memory by level_key, see shared_level
+shared_levels = {}
+
+
+class LevelCompilerError(Exception):
+    pass
+
+
+def compiled_path(level_data):
+    """
+    Get path to compiled level, it is kept in the directory of level's csv layers
+    :param level_data: dict with paths to csv layers of the level
+    :return: path to compiled file
+    """
+    return os.path.join(os.path.dirname(next(iter(level_data.values()))), COMPILED_LEVEL_FILE)
+
+
+def level_key(level_data):
+    """
+    Hashable key of a level
+    :param level_data: dict with paths to csv layers of the level
+    """
+    return tuple(sorted(level_data.items()))
+
+
+def read_layer(path):
+    """
+    Read csv layer of a level into grid
+    :param path: path to csv
+    :return: 2d int16 array with tile indexes, EMPTY_CELL for cells without tiles
+    """
+    rows = [[int(item) for item in row] for row in utils.import_csv(path)]
+    if not rows or len({len(row) for row in rows}) != 1:
+        raise LevelCompilerError(f'Layer {path} should be a non empty table.')
+    return numpy.array(rows, dtype=numpy.int16)
+
+
+def compile_level(level_data, path=None):
+    """
+    Compile csv layers of the level into one binary file with all layers stacked in LEVEL_LAYERS order
+    :param level_data: dict with paths to csv layers of the level
+    :param path: path to compiled file, see compiled_path by default
+    :return: path to compiled file
+    """
+    if set(level_data) != set(LEVEL_LAYERS):
+        raise LevelCompilerError(f'Level should have layers {LEVEL_LAYERS}, not {tuple(level_data)}')
+    grids = [read_layer(level_data[layer]) for layer in LEVEL_LAYERS]
+    if len({grid.shape for grid in grids}) != 1:
+        raise LevelCompilerError('All layers of the level should have the same size.')
+    path = path or compiled_path(level_data)
+    numpy.save(path, numpy.stack(grids))
+    return path
+
+
+def is_stale(level_data, path):
+    """
+    Check whether compiled level is missing or older than any of its csv layers
+    """
+    try:
+        compiled_time = os.path.getmtime(path)
+        return any(os.path.getmtime(layer) > compiled_time for layer in level_data.values())
+    except OSError:
+        return True
+
+
+class CompiledLevel:
+    """
+    Layers of a level loaded from compiled file. File is memory-mapped, so loading it costs a single read of its
+    header and cells are read only when used. Levels published into shared memory are used instead of the file.
+    """
+    def __init__(self, grids, fov_layers=None):
+        """
+        :param grids: 3d array of layer grids stacked in LEVEL_LAYERS order
+        :param fov_layers: static layers of FovGrid built from the level by type of tile and offset, if known
+        """
+        self.grids = grids
+        self.fov_layers = fov_layers
+
+    @staticmethod
+    def load(level_data):
+        """
+        Load compiled level if it is up to date
+        :param level_data: dict with paths to csv layers of the level
+        :return: CompiledLevel or None if level has to be read from csv
+        """
+        if set(level_data) != set(LEVEL_LAYERS):
+            return None
+        shared = shared_levels.get(level_key(level_data))
+        if shared is not None:
+            return shared
+        path = compiled_path(level_data)
+        if is_stale(level_data, path):
+            return None
+        grids = numpy.load(path, mmap_mode='r')
+        if grids.ndim != 3 or len(grids) != len(LEVEL_LAYERS):
+            return None
+        return CompiledLevel(grids)
+
+    def layer(self, type_):
+        """
+        Get grid of the layer
+        :param type_: layer name from LEVEL_LAYERS
+        :return: 2d array with tile indexes
+        """
+        return self.grids[LEVEL_LAYERS.index(type_)]
+
+    @property
+    def level_width(self):
+        return self.grids.shape[2] * tile_size
+
+    def find(self, type_, item):
+        """
+        Get level coordinates of the first tile with given index in the layer, rows are checked top to bottom
+        :return: (x, y) of tile's top left corner or None if there is no such tile
+        """
+        cells = numpy.argwhere(self.layer(type_) == item)
+        if not len(cells):
+            return None
+        row, column = cells[0]
+        return int(column) * tile_size, int(row) * tile_size
+
+    @property
+    def spawn(self):
+        return self.find('player', 0)
+
+    @property
+    def finish(self):
+        return self.find('player', 1)
+
+
+if __name__ == '__main__':
+    for level in levels:
+        print(f'Compiled {compile_level(level)}')
@@ -0,0 +1,149 @@
+import numpy
+from settings import *
+from level_compiler import EMPTY_CELL
+from fov_grid import TERRAIN_CELL, TREE_CELL, OBJECT_CELL
+
+# Codes of static tiles written into FOV grid by type of layer
+FOV_CODES = {'terrain': TERRAIN_CELL, 'tree obstacle': TREE_CELL, 'coins': OBJECT_CELL}
+
+
+class LevelStream:
+    """
+    Streaming of tiles for very long levels. Sprites are created from compiled level grids only for chunks of
+    columns inside a window around the camera and released when the window leaves them, and FOV grid covers only the
+    window, so amount of sprites, memory and per frame cost don't depend on level width.
+    Tiles of loaded chunks are kept in level's groups in the same order eager loading adds them (by layer, row and
+    column), so collisions are resolved the same way. Collected objects and destroyed enemies are remembered and
+    aren't created again. Enemies are released with the chunk they were spawned in, and start from their spawn
+    position when it is loaded, so unlike eager loading, where all enemies move from the first frame, enemies seen by
+    players and their FOV depend on when the chunk was loaded.
+    """
+    def __init__(self, level, compiled, chunk_columns=STREAM_CHUNK_COLUMNS, margin=STREAM_MARGIN):
+        """
+        layers - types of layers in the order their tiles are created, grids of layers are memory-mapped
+        chunks - sprites of every loaded chunk, chunk with index i covers columns [i * chunk_columns,
+        (i + 1) * chunk_columns)
+        keys - (layer, row, column) cell of every loaded sprite
+        consumed - cells of collected objects and destroyed enemies
+        window - range of loaded chunks
+        :param level: level to create tiles in, see Level.create_tile
+        :param compiled: CompiledLevel with layers of the level
+        :param chunk_columns: width of a chunk in columns
+        :param margin: pixels loaded on both sides of the screen
+        """
+        if chunk_columns < 1 or margin < 0:
+            raise ValueError(f'Chunks should be at least 1 column wide and margin positive, not {chunk_columns}, '
+                             f'{margin}')
+        self.level = level
+        self.layers = [(type_, compiled.layer(type_)) for type_ in level.level_data]
+        self.columns = compiled.level_width // tile_size
+        self.chunk_columns = chunk_columns
+        self.margin = margin
+        self.chunks = {}
+        self.keys = {}
+        self.consumed = set()
+        self.window = range(0)
+
+    @property
+    def groups(self):
+        """
+        Level's groups tiles are created in
+        """
+        level = self.level
+        return (level.terrain_tiles, level.background_tiles, level.enemy_tiles, level.objects_tiles,
+                level.animated_tiles, level.constrains, level.level_end, level.tree_obs)
+
+    def chunks_around(self, offset):
+        """
+        Get chunks seen by the camera together with margin around the screen
+        :param offset: camera offset
+        :return: range of chunk indexes
+        """
+        offset = int(offset)
+        width = self.chunk_columns * tile_size
+        first = (-offset - self.margin) // width
+        last = (screen_width - 1 - offset + self.margin) // width
+        chunks = -(-self.columns // self.chunk_columns)
+        return range(max(first, 0), min(last + 1, chunks))
+
+    def update(self, offset):
+        """
+        Load chunks that entered the window around the camera and release chunks that left it
+        :param offset: camera offset
+        """
+        window = self.chunks_around(offset)
+        if window == self.window:
+            return
+        for index in [index for index in self.chunks if index not in window]:
+            self.release(index)
+        self.level.fov_grid.move(window.start * self.chunk_columns, len(window) * self.chunk_columns)
+        added = [index for index in window if index not in self.chunks]
+        for index in added:
+            self.load(index)
+        if added:
+            self.sort_groups()
+        self.window = window
+
+    def load(self, index):
+        """
+        Create sprites for tiles of the chunk
+        :param index: index of the chunk
+        """
+        first = index * self.chunk_columns
+        last = min(first + self.chunk_columns, self.columns)
+        sprites = []
+        for layer, (type_, grid) in enumerate(self.layers):
+            block = numpy.asarray(grid[:, first:last])
+            rows, columns = numpy.nonzero(block != EMPTY_CELL)
+            for row, column, item in zip(rows.tolist(), columns.tolist(), block[rows, columns].tolist()):
+                column += first
+                key = layer, row, column
+                # Player is placed once, when level is created
+                if key in self.consumed or (type_ == 'player' and item == 0):
+                    continue
+                sprite = self.level.create_tile(type_, item, tile_size * column, tile_size * row)
+                if sprite is None:
+                    continue
+                self.keys[sprite] = key
+                sprites.append(sprite)
+                if type_ in FOV_CODES:
+                    self.level.fov_grid.add(sprite, FOV_CODES[type_])
+        self.chunks[index] = sprites
+
+    def release(self, index):
+        """
+        Remove sprites of the chunk from the level. Sprites which aren't in any group were collected or destroyed.
+        :param index: index of the chunk
+        """
+        for sprite in self.chunks.pop(index):
+            key = self.keys.pop(sprite)
+            if sprite.alive():
+                sprite.kill()
+            else:
+                self.consumed.add(key)
+            self.level.fov_grid.remove(sprite)
+
+    def sort_groups(self):
+        """
+        Put tiles of every group in the order of their cells
+        """
+        for group in self.groups:
+            sprites = sorted(group.sprites(), key=self.keys.__getitem__)
+            group.empty()
+            group.add(*sprites)
+
+    def snapshot(self):
+        """
+        Capture loaded chunks and consumed cells, see Level.snapshot
+        """
+        return {index: list(sprites) for index, sprites in self.chunks.items()}, dict(self.keys), \
+            set(self.consumed), self.window
+
+    def reset(self, state):
+        """
+        Restore captured chunks and consumed cells, groups are restored by level
+        """
+        chunks, keys, consumed, self.window = state
+        self.chunks = {index: list(sprites) for index, sprites in chunks.items()}
+        self.keys = dict(keys)
+        self.consumed = set(consumed)
@@ -1,7 +1,14 @@
 import neat
 import pickle
+import multiprocessing
+import numpy
 from settings import *
 from game import Platformer
+from replay import replay_path
+from utils import headless_environment
+from checkpoint import Checkpointer, restore_checkpoint
+from fitness_cache import StatisticsReporter, fitness_cache, phenotype_key
+from shared_level import SharedLevels, attach
 
 
 class Neat:
@@ -9,6 +16,7 @@ class Neat:
     Class for implementing NEAT algorithm for Platformer game
     Set generation count to 0
     :param draw: whether to draw Level
+    :param headless: whether to run NEAT without window, sound and frame rate limit
     :param config: config for single player NEAT
     :param config_multiple: config for multiple players NEAT
     """
@@ -20,13 +28,20 @@ class Neat:
                          neat.DefaultSpeciesSet, neat.DefaultStagnation, CONFIG_DIR).fitness_threshold
     generation = 0
     draw = DRAW_FLAG
+    headless = HEADLESS_FLAG
     return_to_initial = False
 
-    def __init__(self, multiple=False):
+    def __init__(self, multiple=False, parallel=False, workers=NEAT_WORKERS, checkpoint_prefix=NEAT_CHECKPOINT_PREFIX):
         """
         :param multiple: whether neat will be used with multiple genomes at once
+        :param parallel: whether genomes will be evaluated in worker processes (single player only)
+        :param workers: number of worker processes
+        :param checkpoint_prefix: prefix of checkpoint paths, None to run without checkpoints
         """
         self.multiple = multiple
+        self.parallel = parallel
+        self.workers = workers
+        self.checkpoint_prefix = checkpoint_prefix
 
     def restore_treshhold(self):
         """
@@ -39,29 +54,43 @@ class Neat:
 
     def run_neat(self, load_from_checkpoint=None):
         """
-        Runs NEAT and prepares population
-        :param load_from_checkpoint: sets a checkpoint to load from
+        Runs NEAT and prepares population. Checkpoints are saved in background every NEAT_CHECKPOINT generations,
+        see checkpoint.Checkpointer.
+        :param load_from_checkpoint: sets a checkpoint to load from, saved by Checkpointer or neat.Checkpointer
         """
+        stats = StatisticsReporter()
         if load_from_checkpoint:
-            p = neat.Checkpointer.restore_checkpoint(load_from_checkpoint)
+            p = restore_checkpoint(load_from_checkpoint, stats)
+            Neat.generation = p.generation
         else:
             if self.multiple:
                 p = neat.Population(self.config_multiple)
             else:
                 p = neat.Population(self.config)
         p.add_reporter(neat.StdOutReporter(True))
-        stats = neat.StatisticsReporter()
         p.add_reporter(stats)
-        # p.add_reporter(neat.Checkpointer(NEAT_CHECKPOINT))
+        checkpointer = None
+        if self.checkpoint_prefix is not None:
+            checkpointer = Checkpointer(prefix=self.checkpoint_prefix, stats=stats)
+            p.add_reporter(checkpointer)
 
         self.restore_treshhold()
         try:
             if self.multiple:
                 winner = p.run(eval_genomes_multiple, GENERATION_AMOUNT * 10)
+            elif self.parallel:
+                evaluator = ParallelEvaluator(self.workers)
+                try:
+                    winner = p.run(evaluator.evaluate, GENERATION_AMOUNT)
+                finally:
+                    evaluator.close()
             else:
                 winner = p.run(eval_genomes, GENERATION_AMOUNT)
         except TypeError as exc:
             self.return_to_initial = True
+        finally:
+            if checkpointer is not None:
+                checkpointer.close()
 
         if not self.return_to_initial:
             with open(WINNER_DIR, "wb") as f:
@@ -84,15 +113,24 @@ class Neat:
 def eval_genomes(genomes, config):
     """
     Runs game with fitness function for single player. Allows force quit and return to initial screen.
+    Genomes whose phenotype is already in fitness cache aren't simulated, unless they are drawn.
+    Replay of the best simulated genome is saved if REPLAY_DIR is set.
     :param genomes: genome from current generation
     """
     if Neat.return_to_initial:
         pass
     else:
         Neat.generation += 1
+        # One game and level are reused by all genomes of the generation
+        game = Platformer(Neat.draw, headless=Neat.headless)
+        best = None
         for genome_id, genome in genomes:
+            key = phenotype_key(genome, config)
+            fitness = None if Neat.draw else fitness_cache.get(key)
+            if fitness is not None:
+                genome.fitness = fitness
+                continue
             genome.fitness = 0
-            game = Platformer(Neat.draw)
             force_quit = game.train_ai(genome, config, genome_id, Neat.generation)
             if force_quit and game.return_to_initial:
                 Neat.return_to_initial = True
@@ -100,18 +138,139 @@ def eval_genomes(genomes, config):
                 break
             elif force_quit and not game.return_to_initial:
                 quit()
+            fitness_cache.put(key, genome.fitness)
+            if REPLAY_DIR and (best is None or genome.fitness > best[0]):
+                best = genome.fitness, genome_id, game.replay
+        if best is not None:
+            fitness, genome_id, replay = best
+            replay.save(replay_path(f'generation_{Neat.generation}_genome_{genome_id}'))
+
+
+# Game of worker process of ParallelEvaluator, created once by init_worker and kept for all evaluations
+worker_game = None
+
+
+def init_worker(handles, level_datas):
+    """
+    Initializer of ParallelEvaluator workers: attaches to shared levels, starts headless game which doesn't record
+    replays and builds training level for every level, so that evaluations only reset levels
+    :param handles: levels in shared memory, see shared_level
+    :param level_datas: levels to build
+    """
+    global worker_game
+    attach(handles)
+    worker_game = Platformer(draw=False, headless=True, record=False)
+    for level_data in level_datas:
+        worker_game.get_training_level(level_data)
+
+
+def eval_genome(genome, config, generation=0, level_data=level_0):
+    """
+    Runs headless game with fitness function for a single genome. Game of the worker process is used if there is
+    one, otherwise it is created. Replay isn't recorded, since only fitness is returned.
+    :param genome: genome to evaluate
+    :param config: config file
+    :param generation: generation number
+    :param level_data: level to train on
+    :return: fitness of the genome
+    """
+    genome.fitness = 0
+    game = worker_game or Platformer(draw=False, headless=True, record=False)
+    game.train_ai(genome, config, genome.key, generation, level_data)
+    return genome.fitness
+
+
+def eval_batch(genomes, config, generation=0, level_data=level_0):
+    """
+    Evaluate several genomes one after another with eval_genome. Used in worker processes of ParallelEvaluator.
+    :return: list of fitness values
+    """
+    return [eval_genome(genome, config, generation, level_data) for genome in genomes]
+
+
+class ParallelEvaluator(neat.ParallelEvaluator):
+    """
+    Evaluates single player genomes in a pool of worker processes, each running headless Level.
+    Workers are spawned instead of forked, so that they don't inherit parent's window and sound, and are told to
+    run headless through environment variables before any of the game modules are imported. Levels are published
+    into shared memory once and workers attach to them instead of reading level files, see shared_level.
+    Workers are long-lived: every worker starts pygame and builds a Level for the level genomes are trained on once,
+    then evaluates batches of genomes resetting the level between them without recording replays, so a genome costs
+    only its simulation. Only the trained level is published and built, so warm-up and memory of workers don't
+    grow with the number of levels.
+    """
+    def __init__(self, workers=NEAT_WORKERS, timeout=None, level_data=level_0):
+        """
+        :param workers: number of worker processes, defaults to number of cores
+        :param timeout: how long to wait for a batch of genomes
+        :param level_data: level genomes are trained on, it's shared with workers and built by them
+        """
+        self.num_workers = workers or multiprocessing.cpu_count()
+        self.eval_function = eval_batch
+        self.timeout = timeout
+        self.level_data = level_data
+        self.shared_levels = SharedLevels([level_data])
+
+        with headless_environment():
+            self.pool = multiprocessing.get_context('spawn').Pool(self.num_workers, init_worker,
+                                                                  (self.shared_levels.handles, [level_data]))
+
+    def evaluate(self, genomes, config):
+        """
+        Sends genomes of current generation to workers in NEAT_WORKER_BATCHES batches per worker and assigns fitness
+        values they return. Only one genome of every phenotype missing in fitness cache is sent.
+        :param genomes: genomes from current generation
+        :param config: config file
+        """
+        Neat.generation += 1
+        keys = [phenotype_key(genome, config, self.level_data) for genome_id, genome in genomes]
+        fitnesses = {}
+        missing = {}
+        for key, (genome_id, genome) in zip(keys, genomes):
+            if key in fitnesses or key in missing:
+                # Duplicate phenotype of the generation is evaluated once
+                fitness_cache.hits += 1
+                continue
+            fitness = fitness_cache.get(key)
+            if fitness is None:
+                missing[key] = genome
+            else:
+                fitnesses[key] = fitness
+
+        batch_count = min(len(missing), self.num_workers * NEAT_WORKER_BATCHES)
+        batches = [list(batch) for batch in numpy.array_split(numpy.arange(len(missing)), batch_count)] \
+            if batch_count else []
+        missing_keys, missing_genomes = list(missing), list(missing.values())
+        jobs = [self.pool.apply_async(self.eval_function, ([missing_genomes[index] for index in batch], config,
+                                                           Neat.generation, self.level_data))
+                for batch in batches]
+        for batch, job in zip(batches, jobs):
+            for index, fitness in zip(batch, job.get(timeout=self.timeout)):
+                fitnesses[missing_keys[index]] = fitness
+                fitness_cache.put(missing_keys[index], fitness)
+        for key, (genome_id, genome) in zip(keys, genomes):
+            genome.fitness = fitnesses[key]
+
+    def close(self):
+        """
+        Stop worker processes and free shared levels
+        """
+        self.pool.close()
+        self.pool.join()
+        self.shared_levels.close()
 
 
 def eval_genomes_multiple(genomes, config):
     """
     Runs game with fitness function for multiple players at once. Allows force quit and return to initial screen.
+    Replay of the generation is saved if REPLAY_DIR is set.
     :param genomes: all genomes from current GENERATION
     """
     if Neat.return_to_initial:
         pass
     else:
         Neat.generation += 1
-        game = Platformer(Neat.draw)
+        game = Platformer(Neat.draw, headless=Neat.headless)
         force_quit = game.train_ai_multiple(genomes, config, Neat.generation)
         if force_quit and game.return_to_initial:
             Neat.return_to_initial = True
@@ -119,6 +278,8 @@ def eval_genomes_multiple(genomes, config):
             config.fitness_threshold = -50
         elif force_quit and not game.return_to_initial:
             quit()
+        elif REPLAY_DIR:
+            game.replay.save(replay_path(f'generation_{Neat.generation}_multiple'))
 
 
 if __name__ == '__main__':
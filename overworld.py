@@ -5,7 +5,8 @@ from collections import namedtuple
 from decoration import Sky
 from victory import Victory
 from ui import UI
-from time import time
+from dirty_rects import DirtyRects
+from text_cache import get_font, render
 
 
 class Overworld:
@@ -23,6 +24,11 @@ class Overworld:
         proceed_to_level - brick level that was chosen
         started - whether overworld was launched at this frame
         player_pos - saving position of player in the overworld to restore it when game returns to overworld
+        clock - simulation clock of the player, ticks once per overworld frame
+        escape_timeout - simulated time when player returned to overworld
+        dirty - tracker of changed screen regions, overworld is redrawn only where something changed
+        updated_rects - rects of the screen changed during last frame, None if whole screen was changed
+        lines_image - lines between bricks drawn for points saved in lines_key
         :param surface:
         :param player:
         """
@@ -47,15 +53,19 @@ class Overworld:
         self.proceed_to_level = None
         self.started = False
         self.player_pos = self.points[0]
-        self.escape_timeout = time()
+        self.clock = self.player.clock
+        self.escape_timeout = self.clock.get_ticks()
 
         self.create_player()
 
         self.sky = Sky(8)
+        self.dirty = DirtyRects()
+        self.updated_rects = None
+        self.lines_key = None
+        self.lines_image = None
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont('Arial', 30)
+        self.font = get_font('Arial', 30)
 
         # Music
         self.overworld_music = pygame.mixer.Sound(OVERWORLD_MUSIC_DIR)
@@ -129,7 +139,7 @@ class Overworld:
         Allows returning from overworld to initial screen only after some timeout after returning to overworld from game
         :return:
         """
-        if time() - self.escape_timeout < OVERWORLD_ESCAPE_TIMEOUT:
+        if self.clock.get_ticks() - self.escape_timeout < OVERWORLD_ESCAPE_TIMEOUT * 1000:
             return False
         else:
             pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL).stop()
@@ -193,7 +203,7 @@ class Overworld:
         else:
             self.proceed_to_level = None
             self.started = False
-            self.escape_timeout = time()
+            self.escape_timeout = self.clock.get_ticks()
             brick.stop_level = False
 
     def check_victory(self):
@@ -209,6 +219,8 @@ class Overworld:
         :return:
         """
         if not self.started:
+            # Screen was drawn by level in the meantime
+            self.dirty.invalidate()
             pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL).set_volume(0.03)
             pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL).play(self.overworld_music, loops=-1)
             self.check_level_activation()
@@ -224,8 +236,16 @@ class Overworld:
         :return:
         """
         if level:
-            surf_completed = self.font.render(f"LeveL {level.name} was completed!", True, 'red')
-            self.surface.blit(surf_completed, (screen_width/2-40, screen_width/2-20))
+            surf_completed = render(self.font, self.completed_text(level), 'red')
+            self.surface.blit(surf_completed, self.completed_pos)
+
+    @staticmethod
+    def completed_text(level):
+        return f"LeveL {level.name} was completed!"
+
+    @property
+    def completed_pos(self):
+        return screen_width/2-40, screen_width/2-20
 
     def check_level_activation(self):
         """
@@ -241,21 +261,52 @@ class Overworld:
 
     def draw_lines(self):
         """
-        Draw lines between center points of brick levels
+        Draw lines between center points of brick levels. Lines are drawn once on transparent image, which is
+        blitted while points don't change, so lines look the same when only part of the screen is redrawn.
         :return:
         """
-        pygame.draw.lines(self.surface, 'black', False, self.points, 10)
-        if len(self.ava_points) > 1:
-            pygame.draw.lines(self.surface, 'red', False, self.ava_points, 10)
+        key = tuple(self.points), tuple(self.ava_points)
+        if key != self.lines_key:
+            self.lines_key = key
+            self.lines_image = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
+            pygame.draw.lines(self.lines_image, 'black', False, self.points, 10)
+            if len(self.ava_points) > 1:
+                pygame.draw.lines(self.lines_image, 'red', False, self.ava_points, 10)
+            self.lines_image.set_alpha(255, pygame.RLEACCEL)
+        self.surface.blit(self.lines_image, (0, 0))
+
+    def describe(self):
+        """
+        Describe elements of the overworld frame for dirty rects tracking
+        """
+        self.dirty.add(self.dirty.screen, 'sky')
+        lines = pygame.Rect(self.points[0], (0, 0)).unionall([pygame.Rect(point, (0, 0)) for point in self.points])
+        self.dirty.add(lines.inflate(10, 10), ('lines', tuple(self.ava_points)))
+        for brick in self.brick_levels.sprites():
+            self.dirty.add(brick.rect, ('brick', id(brick.image), brick.completed))
+        for player in self.players.sprites():
+            self.dirty.add(player.rect, ('player', id(player.image)))
+        if self.compl_brick:
+            text = self.completed_text(self.compl_brick)
+            self.dirty.add(pygame.Rect(self.completed_pos, self.font.size(text)), ('completed', text))
+
+    def draw_frame(self):
+        """
+        Draw all elements of the overworld
+        """
+        self.sky.draw(self.surface)
+        self.draw_lines()
+        self.brick_levels.draw(self.surface)
+        self.players.draw(self.surface)
+        self.completed_level(self.compl_brick)
 
     def draw_overworld(self):
         """
-        Function for drawing overworld
+        Function for drawing overworld. Only regions changed since previous frame are redrawn.
         :return:
         """
         # Creating level
         self.set_state()
-        self.sky.draw(self.surface)
         self.brick_levels.update()
 
         # Player interactions
@@ -266,23 +317,30 @@ class Overworld:
         self.go_to_level()
 
         # Drawing objects
-        self.draw_lines()
-        self.brick_levels.draw(self.surface)
-        self.players.draw(self.surface)
-        self.completed_level(self.compl_brick)
+        self.describe()
+        self.dirty.collect()
+        self.dirty.redraw(self.surface, self.draw_frame)
 
     def run(self, events):
         """
         Function for running overworld. Draws overworld except for few scenarios:
         - player has won, then proceed to victory
         - player has selected level, then proceed to level
+        Simulation clock is advanced here unless level is running, which advances clock by itself.
+        Rects of the screen changed by the frame are saved to updated_rects.
         :param events:
         :return:
         """
         if self.check_victory():
             pygame.mixer.Channel(BACKGROUND_MUSIC_CHANNEL).stop()
             self.victory.draw(events)
+            self.updated_rects = self.victory.updated_rects()
+            self.clock.tick()
         elif self.proceed_to_level and not self.check_victory():
             self.run_brick(self.proceed_to_level)
+            # Level redraws whole screen, nothing is drawn when level stops
+            self.updated_rects = None if self.proceed_to_level else []
         else:
             self.draw_overworld()
+            self.updated_rects = self.dirty.rects
+            self.clock.tick()
@@ -7,29 +7,43 @@ class Particle(pygame.sprite.Sprite):
     """
     Class for creating and drawing particles
     """
-    def __init__(self, pos, state, flipped=False):
+    def __init__(self, pos, state, flipped=False, frames=None, pool=None):
         """
         states - dict that contains images for different types of particles
         :param pos: position of sprite
         :param state: type of particle to create
         :param flipped: whether we should flip particle image
+        :param frames: images and flipped images of states shared with other particles, loaded for the state if None
+        :param pool: ParticlePool particle is returned to when its animation is over
         """
         super().__init__()
         # Images managing
-        self.state = state
-        self.states = {self.state: []}
-        self.states = get_img(PARTICLE_IMAGES_DIR, self.states)
-        self.flipped = load_flipped(self.states)
-        self.flipped_flag = flipped
-
-        self.image = self.states[self.state][0]
-        self.rect = self.image.get_rect(topleft=pos)
+        if frames is None:
+            states = get_img(PARTICLE_IMAGES_DIR, {state: []})
+            frames = states, load_flipped(states)
+        self.states, self.flipped = frames
+        self.pool = pool
+        self.rect = pygame.Rect(0, 0, 0, 0)
 
         # Animation parameters
-        self.frame_index = 0
         self.animation_speed = ANIMATION_SPEED
         if not isinstance(self.animation_speed, int) and not isinstance(self.animation_speed, float):
             raise TypeError(f'Animation speed should be a number, not {type(self.animation_speed)}')
+        self.spawn(pos, state, flipped)
+
+    def spawn(self, pos, state, flipped=False):
+        """
+        Start animation of the particle from the first frame, used for new and recycled particles
+        :param pos: position of sprite
+        :param state: type of particle
+        :param flipped: whether we should flip particle image
+        """
+        self.state = state
+        self.flipped_flag = flipped
+        self.frame_index = 0
+        self.image = self.states[self.state][0]
+        self.rect.size = self.image.get_size()
+        self.rect.topleft = pos
 
     def animate(self):
         """
@@ -40,7 +54,10 @@ class Particle(pygame.sprite.Sprite):
         if self.frame_index >= len(self.states[self.state]):
             self.frame_index = 0
             if self.state != 'run':
-                self.kill()
+                if self.pool is None:
+                    self.kill()
+                else:
+                    self.pool.release(self)
         self.image = self.states[self.state][int(self.frame_index)]
 
     def update(self, x_shift):
@@ -61,3 +78,54 @@ class Particle(pygame.sprite.Sprite):
         if self.state != "run":
             self.rect.x += x_shift
 
+
+class ParticlePool:
+    """
+    Pool of particles. Images of every state are loaded once and shared by all particles, and particles which
+    finished their animation are kept and spawned again, so dust and explosions don't load images or create sprites
+    while level runs.
+    """
+    def __init__(self, size=PARTICLE_POOL_SIZE):
+        """
+        states, flipped - images and flipped images of loaded states
+        free - particles which aren't in any group and can be spawned again
+        :param size: maximum number of kept free particles
+        """
+        if not isinstance(size, int) or size < 0:
+            raise ValueError(f'Particle pool size should be non negative integer, not {size}')
+        self.size = size
+        self.states = {}
+        self.flipped = {}
+        self.free = []
+
+    def load(self, state):
+        """
+        Load images of the state if they aren't loaded yet
+        """
+        if state not in self.states:
+            states = get_img(PARTICLE_IMAGES_DIR, {state: []})
+            self.states.update(states)
+            self.flipped.update(load_flipped(states))
+
+    def get(self, pos, state, flipped=False):
+        """
+        Spawn particle, reusing a free one if there is any
+        :param pos: position of sprite
+        :param state: type of particle
+        :param flipped: whether we should flip particle image
+        :return: particle
+        """
+        self.load(state)
+        if self.free:
+            particle = self.free.pop()
+            particle.spawn(pos, state, flipped)
+            return particle
+        return Particle(pos, state, flipped, frames=(self.states, self.flipped), pool=self)
+
+    def release(self, particle):
+        """
+        Remove particle from its groups and keep it for spawning again
+        """
+        particle.kill()
+        if len(self.free) < self.size and particle not in self.free:
+            self.free.append(particle)
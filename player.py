@@ -1,14 +1,24 @@
 import pygame
 import os
-from maker import refactor_image
 from math import ceil
 from settings import *
-from utils import get_img, load_flipped
+from utils import get_img, load_flipped, load_sound, cached
+from sim_clock import SimClock
 import glob
 
-# Create images if they haven't been created before
-if not os.path.exists(PLAYER_IMAGES_DIR):
-    refactor_image(54, 60, glob.glob('img/*.png'), ('idle', 'jump', 'run'), PLAYER_IMAGES_DIR)
+
+def prepare_images():
+    """
+    Create images if they haven't been created before. Checked once, when the first player is created, so
+    importing player doesn't touch the disk or import PIL.
+    :return: directory with player's images
+    """
+    def create():
+        if not os.path.exists(PLAYER_IMAGES_DIR):
+            from maker import refactor_image
+            refactor_image(54, 60, glob.glob('img/*.png'), ('idle', 'jump', 'run'), PLAYER_IMAGES_DIR)
+        return PLAYER_IMAGES_DIR
+    return cached(('player images',), create)
 
 
 class PlayerCreationError(Exception):
@@ -19,12 +29,13 @@ class Player(pygame.sprite.Sprite):
     """
     Class for player object
     """
-    def __init__(self, pos, neat=False):
+    def __init__(self, pos, neat=False, clock=None):
         """
         states - dict that contains images for different states of the player
         exact x and y - rounded up coordinates for collision detection
         shift_speed - variable to preserve speed value for level's world shifting
         changed - whether the image was changed during blinking
+        clock - simulation clock, shared with the level player is in
         last_hit - time when player was hit by an enemy last time
         keys - keys to move player
         on_ground - whether player stands on the ground
@@ -33,6 +44,7 @@ class Player(pygame.sprite.Sprite):
         determining covered distance)
         :param pos: position of player's sprite
         :param neat: whether a player will be managed by neural network
+        :param clock: simulation clock, new one is created if not given
         """
         super().__init__()
 
@@ -40,7 +52,8 @@ class Player(pygame.sprite.Sprite):
         self.all_states = ALL_STATES
         self.state = self.all_states[0]
         self.prev_state = ""
-        self.states = get_img(PLAYER_IMAGES_DIR, self.all_states)
+        # Images come from the asset cache and are shared with other players
+        self.states = get_img(prepare_images(), self.all_states)
         self.flipped = load_flipped(self.states)
         self.changed = False
 
@@ -57,7 +70,8 @@ class Player(pygame.sprite.Sprite):
 
         # Player internal parameters
         self.neat = neat
-        self.last_hit = pygame.time.get_ticks()
+        self.clock = clock if clock is not None else SimClock()
+        self.last_hit = self.clock.get_ticks()
         self.max_lives = PLAYER_MAX_LIVES if not self.neat else 1
         self.lives = self.max_lives if not self.neat else 1
         self.coins = 0
@@ -71,8 +85,7 @@ class Player(pygame.sprite.Sprite):
         self.shifted = 0
 
         # Sound
-        self.jump_sound = pygame.mixer.Sound(JUMP_SOUND_DIR)
-        self.jump_sound.set_volume(0.1)
+        self.jump_sound = load_sound(JUMP_SOUND_DIR, 0.1)
 
         # Animation parameters
         self.frame_index = 0
@@ -114,13 +127,20 @@ class Player(pygame.sprite.Sprite):
 
     def if_blinked(self):
         """
-        Revert image transparency back
+        Show current animation frame again instead of its transparent copy
         :return:
         """
         if self.changed:
-            self.image.set_alpha(255)
+            self.image = self.current_image()
             self.changed = False
 
+    def current_image(self):
+        """
+        Image of current animation frame, facing the direction player moves in
+        """
+        images = self.states if self.moving_right else self.flipped
+        return images[self.state][int(self.frame_index)]
+
     def animate(self):
         """
         Function for animation
@@ -131,9 +151,7 @@ class Player(pygame.sprite.Sprite):
             self.frame_index = 0
         if self.frame_index >= len(self.states[self.state]):
             self.frame_index = 0
-        self.image = self.states[self.state][int(self.frame_index)]
-        if not self.moving_right:
-            self.image = self.flipped[self.state][int(self.frame_index)]
+        self.image = self.current_image()
 
     @staticmethod
     def keys_encoding(keys):
@@ -186,11 +204,13 @@ class Player(pygame.sprite.Sprite):
 
     def blinking(self):
         """
-        Function for blinking
+        Function for blinking. Images are shared with other players, so player is hidden by its own transparent copy
+        of the image.
         :return:
         """
         if self.blinks < BLINKING_DURATION:
             if not self.blinks % 2:
+                self.image = self.image.copy()
                 self.image.set_alpha(0)
                 self.changed = True
             self.blinks += 1
@@ -224,6 +244,23 @@ class Player(pygame.sprite.Sprite):
         self.keys['left'] = True
         self.keys['up'] = True
 
+    def make_decision(self, decision):
+        """
+        Press keys based on neural network's decision: 0 - nothing, 1 - jump, 2 - right, 3 - left,
+        4 - right and jump, 5 - left and jump
+        :param decision: index of network's output with the highest value
+        """
+        if decision == 1:
+            self.move_up()
+        elif decision == 2:
+            self.move_right()
+        elif decision == 3:
+            self.move_left()
+        elif decision == 4:
+            self.move_right_up()
+        elif decision == 5:
+            self.move_left_up()
+
     def restore_keys(self):
         """
         Revert keys for new frame
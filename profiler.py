@@ -0,0 +1,142 @@
+import csv
+import logging
+import os
+import time
+from collections import deque
+import numpy
+import pygame
+from settings import *
+from text_cache import get_font, render
+
+# Phases of Level.draw_level and Level.draw_multiple in the order of their docstrings, and FOV built for networks
+# between frames
+PHASES = ('background', 'external', 'updates', 'collisions', 'state', 'drawing', 'fov')
+CSV_FIELDS = ('time', 'frames', 'phase', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms')
+
+log = logging.getLogger("profiler")
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter('%(module)s - %(levelname)s - %(message)s'))
+log.addHandler(stream_handler)
+log.setLevel(logging.INFO)
+
+
+class FrameProfiler:
+    """
+    Times phases of every level frame and keeps durations of last frames for rolling statistics and histograms.
+    Frame is started with begin, then lap is called at the end of every phase and end finishes the frame, so
+    a phase costs a single perf_counter call. Level creates profiler only when PROFILE_FLAG is set.
+    """
+    def __init__(self, window=PROFILE_WINDOW, dump_interval=PROFILE_DUMP_INTERVAL, csv_path=PROFILE_CSV):
+        """
+        durations - durations of phases in seconds for last frames, one deque per phase
+        current - durations of phases of current frame
+        frames - number of finished frames
+        :param window: number of last frames kept for statistics
+        :param dump_interval: statistics are logged (and written to csv) every dump_interval frames, 0 turns it off
+        :param csv_path: csv file statistics are appended to, None to only log them
+        """
+        if not isinstance(window, int) or window < 1:
+            raise ValueError(f'Profiler window should be positive integer, not {window}')
+        self.durations = {phase: deque(maxlen=window) for phase in PHASES}
+        self.current = dict.fromkeys(PHASES, 0)
+        self.dump_interval = dump_interval
+        self.csv_path = csv_path
+        self.frames = 0
+        self.last = None
+
+    def begin(self):
+        """
+        Start timing a frame
+        """
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        """
+        Finish phase of current frame
+        :param phase: name of the phase from PHASES
+        """
+        now = time.perf_counter()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def add(self, phase, duration):
+        """
+        Add work done outside of level frame (e.g. FOV) to current frame
+        :param phase: name of the phase from PHASES
+        :param duration: duration in seconds
+        """
+        self.current[phase] += duration
+
+    def end(self):
+        """
+        Finish frame, its phases are added to statistics, which are dumped every dump_interval frames
+        """
+        for phase, duration in self.current.items():
+            self.durations[phase].append(duration)
+            self.current[phase] = 0
+        self.frames += 1
+        if self.dump_interval and self.frames % self.dump_interval == 0:
+            self.dump()
+
+    def stats(self):
+        """
+        Statistics of phases over last frames
+        :return: dict with mean, median, 95th percentile and max duration in milliseconds for every phase
+        """
+        stats = {}
+        for phase, durations in self.durations.items():
+            values = numpy.fromiter(durations, dtype=float, count=len(durations)) * 1000
+            if not len(values):
+                values = numpy.zeros(1)
+            p50, p95 = numpy.percentile(values, (50, 95))
+            stats[phase] = {'mean_ms': values.mean(), 'p50_ms': p50, 'p95_ms': p95, 'max_ms': values.max()}
+        return stats
+
+    def histogram(self, phase, bins=PROFILE_BINS):
+        """
+        Histogram of phase durations over last frames
+        :param phase: name of the phase from PHASES
+        :param bins: number of bins
+        :return: counts and edges of bins in milliseconds, see numpy.histogram
+        """
+        values = numpy.fromiter(self.durations[phase], dtype=float, count=len(self.durations[phase])) * 1000
+        return numpy.histogram(values, bins)
+
+    def dump(self):
+        """
+        Log statistics of last frames and append them to csv file if there is one
+        """
+        stats = self.stats()
+        log.info(f'Frames: {self.frames}, ' + ', '.join(
+            f'{phase}: {values["mean_ms"]:.3f} ms (p95 {values["p95_ms"]:.3f})' for phase, values in stats.items()))
+        if self.csv_path is None:
+            return
+        new_file = not os.path.exists(self.csv_path)
+        with open(self.csv_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(CSV_FIELDS)
+            now = round(time.time(), 3)
+            for phase, values in stats.items():
+                writer.writerow([now, self.frames, phase] + [round(values[field], 4) for field in CSV_FIELDS[3:]])
+
+    def draw(self, surface, pos=PROFILE_OVERLAY_POS):
+        """
+        Draw overlay with mean and 95th percentile of every phase and its histogram over last frames
+        :param surface: surface to draw on
+        :param pos: top left corner of the overlay
+        """
+        font = get_font(FONT_STD, 16)
+        x, y = pos
+        bar_width = 4
+        for phase, values in self.stats().items():
+            text = render(font, f'{phase}: {values["mean_ms"]:.2f} ms, p95 {values["p95_ms"]:.2f}', 'red')
+            surface.blit(text, (x, y))
+            counts, edges = self.histogram(phase)
+            top = counts.max() or 1
+            for index, count in enumerate(counts):
+                height = round(count / top * 16)
+                if height:
+                    pygame.draw.rect(surface, 'red', (x + 240 + index * bar_width, y + 18 - height, bar_width - 1,
+                                                      height))
+            y += 20
@@ -0,0 +1,356 @@
+import json
+import os
+import random
+import numpy
+import pygame
+import utils
+from settings import *
+from level import Level
+from player import Player
+from ui import UI
+from sim_clock import SimClock
+
+# Replay modes: genome trained by Platformer.train_ai, population trained by Platformer.train_ai_multiple and
+# level played by a human
+MODES = ('single', 'multiple', 'play')
+# Input of a player which was removed from the level in multiple mode
+NO_INPUT = 255
+REPLAY_VERSION = 1
+
+
+def encode_keys(keys):
+    """
+    Encode pressed keys as decision of Player.make_decision. Left key wins over right one, as in
+    Player.get_inputs.
+    :param keys: dict with 'left', 'right' and 'up' keys
+    :return: decision from 0 to 5
+    """
+    if keys.get('left'):
+        return 5 if keys.get('up') else 3
+    if keys.get('right'):
+        return 4 if keys.get('up') else 2
+    return 1 if keys.get('up') else 0
+
+
+class Replay:
+    """
+    Recorded run of a level: input of every player for every frame together with level, seed and config it was run
+    with. Frame i is replayed by making decision inputs[i] for every player and running the level once, so the first
+    input of trained genomes is always 0. Inputs are kept as uint8 array and saved into compressed npz file with
+    json metadata, a few hundred bytes for a genome.
+    """
+    def __init__(self, mode, level_data, players=1, seed=None, config=None, **info):
+        """
+        info - anything else worth saving: generation, genome ids, fitness, results of players, state of the player
+        in play mode
+        :param mode: one of MODES
+        :param level_data: dict with csv layers of the level
+        :param players: number of players
+        :param seed: seed of random generator the level was created with, None if it wasn't seeded
+        :param config: path of NEAT config
+        """
+        if mode not in MODES:
+            raise ValueError(f'Replay mode should be one of {MODES}, not {mode}')
+        if not isinstance(players, int) or players < 1:
+            raise ValueError(f'Replay should have at least one player, not {players}')
+        self.mode = mode
+        self.level_data = dict(level_data)
+        self.players = players
+        self.seed = seed
+        self.config = config
+        self.network = NEAT_NETWORK
+        self.info = info
+        self.rows = []
+        self.array = None
+
+    def __len__(self):
+        return len(self.array) + len(self.rows) if self.array is not None else len(self.rows)
+
+    @property
+    def level(self):
+        """
+        Index of the level in settings.levels, None for other levels
+        """
+        return levels.index(self.level_data) if self.level_data in levels else None
+
+    def record(self, inputs):
+        """
+        Add inputs of one frame
+        :param inputs: decision for single player, or decisions of all players with NO_INPUT for removed ones
+        """
+        self.rows.append(inputs)
+
+    @property
+    def inputs(self):
+        """
+        Inputs of all frames
+        :return: uint8 array with row of player inputs for every frame
+        """
+        if self.rows:
+            rows = numpy.array(self.rows, dtype=numpy.uint8).reshape(len(self.rows), self.players)
+            self.array = rows if self.array is None else numpy.concatenate((self.array, rows))
+            self.rows = []
+        if self.array is None:
+            return numpy.zeros((0, self.players), dtype=numpy.uint8)
+        return self.array
+
+    def metadata(self):
+        return {
+            'version': REPLAY_VERSION,
+            'mode': self.mode,
+            'level': self.level,
+            'level_data': self.level_data,
+            'players': self.players,
+            'seed': self.seed,
+            'config': self.config,
+            'network': self.network,
+            'info': self.info,
+        }
+
+    def save(self, path):
+        """
+        Save replay into compressed npz file
+        :param path: path of the file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            numpy.savez_compressed(f, inputs=self.inputs, metadata=numpy.array(json.dumps(self.metadata())))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load replay saved with save
+        :param path: path of the file
+        :return: replay
+        """
+        with numpy.load(path) as data:
+            metadata = json.loads(str(data['metadata']))
+            inputs = data['inputs']
+        if metadata.get('version') != REPLAY_VERSION:
+            raise ValueError(f'Unsupported replay version {metadata.get("version")} in {path}')
+        replay = cls(metadata['mode'], metadata['level_data'], metadata['players'], metadata['seed'],
+                     metadata['config'], **metadata['info'])
+        replay.network = metadata['network']
+        replay.array = inputs
+        return replay
+
+
+def replay_path(name):
+    """
+    Path of a replay file in REPLAY_DIR
+    :param name: name of the file without extension
+    """
+    return os.path.join(REPLAY_DIR, f'{name}{REPLAY_EXTENSION}')
+
+
+def player_state(player):
+    """
+    State of human player kept between levels, which is needed to replay a played level
+    :return: dict with lives, coins, destroyed enemies, time since last hit, facing direction and position, direction
+    and speed Level.restore_player sets on the first frame
+    """
+    return {'lives': player.lives, 'coins': player.coins, 'enemies': player.enemies_killed,
+            'since_hit': player.clock.get_ticks() - player.last_hit, 'moving_right': player.moving_right,
+            'pps': player.pps}
+
+
+def player_results(level, player, distance, frame):
+    """
+    Results of a player used to verify replays
+    :return: dict with frame, position and distance of the player, coins, destroyed enemies, whether level was
+    completed and player defeated
+    """
+    return {'frame': frame, 'position': list(player.rect.topleft), 'distance': float(distance), 'coins': player.coins,
+            'enemies': player.enemies_killed, 'completed': bool(level.completed),
+            'defeat': bool(level.check_defeat(player))}
+
+
+class ReplayPlayer:
+    """
+    Simulates recorded replay in a level created anew. Replays run headless as fast as possible for verification,
+    or are drawn at any speed. Level state is captured every REPLAY_KEYFRAME_INTERVAL frames, so seeking backwards
+    resets level to the nearest captured frame and simulates the rest without drawing.
+    """
+    def __init__(self, replay, screen=None, draw=False):
+        """
+        frame - number of replayed frames
+        keyframes - level states and players in game by frame
+        results - results of players when they were removed, or at the end of replay
+        :param replay: Replay to play
+        :param screen: surface to draw on, headless display is created if None
+        :param draw: whether to draw level
+        """
+        self.replay = replay
+        self.inputs = replay.inputs
+        self.draw = draw
+        if screen is None:
+            screen = utils.init_headless()
+        self.screen = screen
+        if replay.seed is not None:
+            random.seed(replay.seed)
+
+        if replay.mode == 'multiple':
+            clock = SimClock()
+            self.players = [Player((0, 0), neat=True, clock=clock) for _ in range(replay.players)]
+            self.level = Level(replay.level_data, screen, self.players, None, neat=True, multiple_players=True,
+                               draw=draw, clock=clock)
+        else:
+            player = Player((0, 0), neat=True)
+            self.players = [player]
+            ui = UI(screen, player) if draw else None
+            self.level = Level(replay.level_data, screen, player, ui, neat=True, draw=draw)
+            if replay.mode == 'play':
+                self.restore_player(player, replay.info.get('player', {}))
+        self.frame = 0
+        self.live = list(range(len(self.players)))
+        self.results = {}
+        self.distances = {}
+        self.keyframes = {0: self.capture()}
+
+    @staticmethod
+    def restore_player(player, state):
+        """
+        Human player keeps lives and coins between levels and starts the level where Level.restore_player puts it,
+        see player_state
+        """
+        player.max_lives = PLAYER_MAX_LIVES
+        player.lives = state.get('lives', PLAYER_MAX_LIVES)
+        player.coins = state.get('coins', 0)
+        player.enemies_killed = state.get('enemies', 0)
+        player.last_hit = -state.get('since_hit', AFTER_DAMAGE_INVUL)
+        player.moving_right = state.get('moving_right', True)
+        if 'pps' in state:
+            (player.rect.x, player.rect.y), (player.direction.x, player.direction.y), (
+                player.speed.x, player.speed.y) = state['pps']
+
+    def __len__(self):
+        return len(self.inputs)
+
+    @property
+    def finished(self):
+        return self.frame >= len(self.inputs)
+
+    def capture(self):
+        return self.level.snapshot(), list(self.live), dict(self.results), dict(self.distances)
+
+    def step(self):
+        """
+        Replay one frame. Distance is measured every frame the way training does, since it tracks camera shifts.
+        """
+        row = self.inputs[self.frame]
+        if self.replay.mode == 'multiple':
+            for index in [index for index in self.live if row[index] == NO_INPUT]:
+                self.remove(index, self.frame - 1)
+            players = [self.players[index] for index in self.live]
+            self.level.apply_decisions(players, row[self.live].tolist())
+            self.level.run()
+            self.distances = dict(zip(self.live, self.level.distances_traveled(players).tolist()))
+            for player in players:
+                self.level.check_defeat(player)
+        else:
+            self.level.player.make_decision(int(row[0]))
+            self.level.run()
+            if self.replay.mode == 'single':
+                self.distances = {0: self.level.distance_traveled(self.level.player)}
+        self.frame += 1
+        if self.frame % REPLAY_KEYFRAME_INTERVAL == 0 and self.frame not in self.keyframes:
+            self.keyframes[self.frame] = self.capture()
+        if self.finished:
+            for index in list(self.live):
+                self.remove(index, self.frame - 1)
+
+    def remove(self, index, frame):
+        """
+        Remove player from the game and save its results
+        """
+        player = self.players[index]
+        self.results[index] = player_results(self.level, player, self.distances.get(index, 0), frame)
+        if self.replay.mode == 'multiple':
+            self.level.remove_player(player)
+        self.live.remove(index)
+
+    def seek(self, frame):
+        """
+        Bring replay to the given frame. Frames are simulated without drawing.
+        :param frame: number of replayed frames, clipped to length of the replay
+        """
+        frame = max(0, min(frame, len(self.inputs)))
+        if frame < self.frame:
+            start = max(key for key in self.keyframes if key <= frame)
+            state, live, results, distances = self.keyframes[start]
+            self.level.reset(state)
+            self.live, self.results, self.distances = list(live), dict(results), dict(distances)
+            self.frame = start
+        draw, self.level.draw = self.level.draw, False
+        try:
+            while self.frame < frame:
+                self.step()
+        finally:
+            self.level.draw = draw
+
+    def verify(self):
+        """
+        Replay all frames headless and compare results of players with recorded ones
+        :return: True if replay has no recorded results or all of them match
+        """
+        self.seek(len(self.inputs))
+        recorded = self.replay.info.get('results')
+        if recorded is None:
+            return True
+        return [self.results.get(index) for index in range(len(self.players))] == recorded
+
+    def play(self, speed=1.0):
+        """
+        Draw replay in a window. Left and right arrows seek by REPLAY_SEEK frames, up and down change speed,
+        space pauses and escape stops playing.
+        :param speed: replayed frames per displayed frame
+        """
+        clock = pygame.time.Clock()
+        paused = False
+        frames = 0
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    return
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_RIGHT:
+                        self.seek(self.frame + REPLAY_SEEK)
+                    elif event.key == pygame.K_LEFT:
+                        self.seek(self.frame - REPLAY_SEEK)
+                    elif event.key == pygame.K_UP:
+                        speed *= 2
+                    elif event.key == pygame.K_DOWN:
+                        speed /= 2
+                    elif event.key == pygame.K_SPACE:
+                        paused = not paused
+            frames += speed
+            if not paused and frames >= 1 and not self.finished:
+                # Only the last of the frames replayed at once is drawn
+                self.seek(self.frame + int(frames) - 1)
+                frames -= int(frames)
+                if not self.finished:
+                    self.screen.fill('grey')
+                    self.step()
+                    pygame.display.update()
+            clock.tick(CLOCK_RATE)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Verify or watch recorded replays')
+    parser.add_argument('paths', nargs='+', help='replay files')
+    parser.add_argument('--play', action='store_true', help='draw replay instead of verifying it')
+    parser.add_argument('--speed', type=float, default=1.0, help='replayed frames per displayed frame')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        replay = Replay.load(path)
+        if args.play:
+            screen = pygame.display.set_mode((screen_width, screen_height))
+            pygame.mixer.init()
+            ReplayPlayer(replay, screen, draw=True).play(args.speed)
+        else:
+            player = ReplayPlayer(replay)
+            print(f'{path}: {len(player)} frames, {"ok" if player.verify() else "mismatch"}')
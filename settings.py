@@ -1,3 +1,5 @@
+import os
+
 # Position attributes for levels and screen
 NUM_TILES_Y = 11
 tile_size = 64
@@ -28,6 +30,7 @@ HEALTH_BAR_COLOR = 'red'
 # Level images
 PLAYER_IMAGES_DIR = "img_new"
 PARTICLE_IMAGES_DIR = "dust_particles"
+PARTICLE_POOL_SIZE = 32
 COINS_DIR = "graphics/collect_new/coins"
 ENEMY_DIR = "graphics/enemy/run"
 BLOCK_DIR = "new blocks"
@@ -82,14 +85,43 @@ LEFT_FOV_ADJUSTMENT = 2
 NEAT_INFO_Y = 30
 PLAYER_INACTIVE_LIMIT = 200
 FITNESS_LIMIT = -10
-NEAT_CHECKPOINT = 5
+NEAT_CHECKPOINT = 1  # Generations between checkpoints (see checkpoint.py)
+NEAT_CHECKPOINT_PREFIX = 'checkpoints/neat-checkpoint-'  # Generation number is added to it, None turns checkpoints off
+NEAT_CHECKPOINT_FULL_INTERVAL = 10  # Checkpoints between full checkpoints, others store only new genomes
+NEAT_CHECKPOINT_COMPRESSION = 5  # gzip level
+NEAT_WORKERS = None  # Worker processes for parallel NEAT, None means number of cores
+NEAT_WORKER_BATCHES = 4  # Batches of genomes sent to every worker per generation, more batches balance load better
+NEAT_NETWORK = 'compiled'  # 'compiled' - networks compiled into numpy arrays, 'python' - neat-python networks
 GENERATION_AMOUNT = 50
+BENCHMARK_SEED = 0  # Seed of clouds and NEAT random generators in benchmark.py
 WINNER_DIR = 'best.pickle'
 DRAW_FLAG = True
+# Running NEAT without window, sound and frame rate limit. Can be turned on with PLATFORMER_HEADLESS=1
+HEADLESS_FLAG = os.environ.get('PLATFORMER_HEADLESS', '0') == '1'
+# Timing phases of level frames (see profiler.py). Can be turned on with PLATFORMER_PROFILE=1, statistics are
+# logged every PROFILE_DUMP_INTERVAL frames and appended to csv file from PLATFORMER_PROFILE_CSV if it's set
+PROFILE_FLAG = os.environ.get('PLATFORMER_PROFILE', '0') == '1'
+PROFILE_CSV = os.environ.get('PLATFORMER_PROFILE_CSV')
+PROFILE_WINDOW = 300
+PROFILE_DUMP_INTERVAL = 600
+PROFILE_BINS = 20
+PROFILE_OVERLAY_POS = (screen_width - 340, 20)
+# Streamed levels (Level with streaming=True) create tiles for chunks of STREAM_CHUNK_COLUMNS columns seen by the
+# camera and STREAM_MARGIN pixels around the screen
+STREAM_CHUNK_COLUMNS = 10
+STREAM_MARGIN = screen_width
+# Replays of the best genome of every generation, of every generation of multiple players NEAT and of played levels
+# are saved into PLATFORMER_REPLAY_DIR if it's set (see replay.py)
+REPLAY_DIR = os.environ.get('PLATFORMER_REPLAY_DIR')
+REPLAY_EXTENSION = '.npz'
+REPLAY_KEYFRAME_INTERVAL = 300  # Frames between level states captured for seeking in replays
+REPLAY_SEEK = 300  # Frames skipped by arrow keys while watching replay
+FITNESS_CACHE_SIZE = 10000  # Fitness values of evaluated network phenotypes kept for the following generations
 
 CLOCK_RATE = 60
 FONT_SIZE = 30
 FONT_STD = 'Arial'
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept by text_cache
 BACKGROUND_MUSIC_CHANNEL = 0
 OVERWORLD_ESCAPE_TIMEOUT = 2
 
@@ -144,6 +176,8 @@ level_3 = {
 
 # Levels list
 levels = [level_0, level_1, level_2, level_3, ]
+# Name of level file compiled from csv layers by level_compiler.py, kept in level's directory
+COMPILED_LEVEL_FILE = 'level.npy'
 
 # Brick levels data
 level_bricks = {
@@ -0,0 +1,133 @@
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy
+import utils
+from settings import *
+from level import Level
+from player import Player
+from level_compiler import CompiledLevel, read_layer, level_key, shared_levels, LEVEL_LAYERS
+
+# Everything worker needs to attach to a published level: name of shared memory block, key of the level, shape of
+# stacked layer grids, (type of tile, offset) of every stacked FOV layer and their columns
+SharedLevelHandle = namedtuple('SharedLevelHandle', ['name', 'key', 'shape', 'fov_keys', 'fov_columns'])
+LEVEL_DTYPE = numpy.int16
+
+# Shared memory blocks attached by this process, they have to stay open while levels are used
+attached = []
+
+
+def level_arrays(level_data):
+    """
+    Layer grids of the level and static layers of FovGrid built from them. Grids are read from compiled file if it
+    is up to date, otherwise from csv. Level is built on the current display, or on a dummy one which is closed
+    afterwards if nothing is displayed.
+    :param level_data: dict with paths to csv layers of the level
+    :return: 3d array of grids stacked in LEVEL_LAYERS order, list of (type of tile, offset), 3d array of FOV layers
+    """
+    compiled = CompiledLevel.load(level_data)
+    if compiled is None:
+        grids = numpy.stack([read_layer(level_data[layer]) for layer in LEVEL_LAYERS])
+    else:
+        grids = numpy.asarray(compiled.grids)
+    with utils.display_surface() as screen:
+        level = Level(level_data, screen, Player((0, 0), neat=True), None, neat=True, draw=False)
+    fov_keys = [(code, residue) for code, residues in level.fov_grid.layers.items() for residue in residues]
+    fov_layers = numpy.array([level.fov_grid.layers[code][residue] for code, residue in fov_keys],
+                             dtype=LEVEL_DTYPE).reshape(len(fov_keys), NUM_TILES_Y, level.fov_grid.columns)
+    return grids.astype(LEVEL_DTYPE, copy=False), fov_keys, fov_layers
+
+
+def views(buffer, handle):
+    """
+    Arrays of a published level on top of shared memory buffer
+    :return: grids, FOV layers
+    """
+    grids = numpy.ndarray(handle.shape, dtype=LEVEL_DTYPE, buffer=buffer)
+    fov_shape = (len(handle.fov_keys), NUM_TILES_Y, handle.fov_columns)
+    fov_layers = numpy.ndarray(fov_shape, dtype=LEVEL_DTYPE, buffer=buffer, offset=grids.nbytes)
+    return grids, fov_layers
+
+
+class SharedLevels:
+    """
+    Read-only level data published once into shared memory for worker processes: layer grids of every level and
+    static layers of its FovGrid, one shared memory block per level. Workers attach to them with attach, after which
+    Level takes its grids and FOV layers from shared memory without copying and without reading level files, so
+    workers hold a single copy of level data no matter how many levels they train on.
+    Sprites and their collision indexes are pygame objects of a process, so every Level still creates its own.
+    """
+    def __init__(self, level_datas=levels):
+        """
+        blocks - shared memory blocks owned by publishing process
+        handles - SharedLevelHandle of every level, picklable and passed to workers
+        :param level_datas: levels to publish
+        """
+        self.blocks = []
+        self.handles = []
+        try:
+            for level_data in level_datas:
+                grids, fov_keys, fov_layers = level_arrays(level_data)
+                block = shared_memory.SharedMemory(create=True, size=grids.nbytes + fov_layers.nbytes)
+                self.blocks.append(block)
+                handle = SharedLevelHandle(block.name, level_key(level_data), grids.shape, fov_keys,
+                                           fov_layers.shape[2])
+                shared_grids, shared_fov_layers = views(block.buf, handle)
+                shared_grids[:] = grids
+                shared_fov_layers[:] = fov_layers
+                del shared_grids, shared_fov_layers
+                self.handles.append(handle)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def nbytes(self):
+        return sum(block.size for block in self.blocks)
+
+    def close(self):
+        """
+        Free shared memory. Workers should be stopped first.
+        """
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        self.handles = []
+
+
+def attach(handles):
+    """
+    Attach to levels published by SharedLevels, Level created afterwards uses them instead of level files. Used as
+    initializer of worker processes.
+    :param handles: list of SharedLevelHandle
+    """
+    for handle in handles:
+        block = shared_memory.SharedMemory(name=handle.name)
+        attached.append(block)
+        grids, fov_layers = views(block.buf, handle)
+        grids.flags.writeable = False
+        fov_layers.flags.writeable = False
+        layers = {}
+        for (code, residue), layer in zip(handle.fov_keys, fov_layers):
+            layers.setdefault(code, {})[residue] = layer
+        shared_levels[handle.key] = CompiledLevel(grids, layers)
+
+
+def detach():
+    """
+    Forget attached levels and close their shared memory, Level reads level files again
+    """
+    shared_levels.clear()
+    for block in attached:
+        try:
+            block.close()
+        except BufferError:
+            # Arrays of a level still in use keep the block mapped until they are freed
+            pass
+    attached.clear()
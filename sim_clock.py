@@ -0,0 +1,37 @@
+from settings import *
+
+
+class SimClock:
+    """
+    Simulation clock that counts frames instead of measuring real time.
+    Time based behaviour of the game (invulnerability after damage, overworld timeouts) is measured in frames,
+    so the game plays the same way no matter how fast frames are processed, e.g. during headless NEAT training.
+    """
+    def __init__(self, rate=CLOCK_RATE):
+        """
+        frame - amount of frames passed since clock creation
+        :param rate: frames per simulated second
+        """
+        if rate <= 0:
+            raise ValueError(f"Clock rate should be positive, not {rate}")
+        self.rate = rate
+        self.frame = 0
+
+    def tick(self):
+        """
+        Advance clock by one frame, should be called once per processed frame
+        """
+        self.frame += 1
+
+    def get_ticks(self):
+        """
+        Simulated time, mimics pygame.time.get_ticks
+        :return: milliseconds passed since clock creation
+        """
+        return self.frame * 1000 // self.rate
+
+    def reset(self):
+        """
+        Set clock back to the first frame
+        """
+        self.frame = 0
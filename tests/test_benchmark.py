@@ -0,0 +1,38 @@
+import unittest
+import json
+import os
+from unittest.mock import patch
+from benchmark import run_benchmarks, summary
+from neat_game import Neat
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_summary(self):
+        result = summary([0.5, 1.5], 10)
+        self.assertEqual(result['runs'], 2)
+        self.assertEqual(result['mean_ms'], 1000)
+        self.assertEqual(result['best_ms'], 500)
+        self.assertEqual(result['per_second'], 10)
+
+    def test_run(self):
+        draw, headless = Neat.draw, Neat.headless
+        with patch.dict(os.environ):
+            os.environ.pop('SDL_AUDIODRIVER', None)
+            report = run_benchmarks(frames=20, calls=20, repeat=2, generations=1,
+                                    names=['level_run_draw', 'level_run_no_draw', 'level_fov', 'level_init',
+                                           'player_init_cached', 'neat_generation_multiple'])
+            # Silent audio driver is set only while mixer is initialized
+            self.assertNotIn('SDL_AUDIODRIVER', os.environ)
+        self.assertEqual(set(report['results']), {'level_run_draw', 'level_run_no_draw', 'level_fov', 'level_init',
+                                                  'player_init_cached', 'neat_generation_multiple'})
+        self.assertEqual(report['results']['level_fov']['units'], 20)
+        self.assertEqual(report['results']['level_init']['runs'], 2)
+        self.assertEqual(report['results']['neat_generation_multiple']['runs'], 1)
+        self.assertEqual((Neat.draw, Neat.headless), (draw, headless))
+        json.dumps(report)
+
+        self.assertRaises(ValueError, run_benchmarks, names=['unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+import threading
+import neat
+from checkpoint import Checkpointer, restore_checkpoint, read_checkpoint
+from neat_game import Neat
+
+
+def evaluate(genomes, config):
+    for genome_id, genome in genomes:
+        genome.fitness = sum(connection.weight for connection in genome.connections.values())
+
+
+def describe(population):
+    return {key: (sorted(genome.connections), sorted(genome.nodes)) for key, genome in population.population.items()}
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.prefix = os.path.join(self.directory, 'checkpoint-')
+
+    def test_incremental(self):
+        self.assertRaises(ValueError, Checkpointer, 0)
+        population = neat.Population(Neat.config)
+        stats = neat.StatisticsReporter()
+        checkpointer = Checkpointer(1, self.prefix, full_interval=3, stats=stats)
+        population.add_reporter(stats)
+        population.add_reporter(checkpointer)
+        population.run(evaluate, 5)
+        checkpointer.close()
+        self.assertEqual(sorted(os.listdir(self.directory)), [f'checkpoint-{generation}' for generation in range(1, 6)])
+        self.assertLess(checkpointer.busy, 1)
+
+        full, incremental = read_checkpoint(f'{self.prefix}4'), read_checkpoint(f'{self.prefix}5')
+        self.assertIsNone(full['base'])
+        self.assertEqual(incremental['base'], 'checkpoint-4')
+        # Elites were saved by previous checkpoint
+        self.assertLess(len(incremental['genomes']), len(population.population))
+        self.assertLess(len(incremental['genomes']), len(full['genomes']))
+
+        restored_stats = neat.StatisticsReporter()
+        restored = restore_checkpoint(f'{self.prefix}5', restored_stats)
+        self.assertEqual(restored.generation, population.generation)
+        self.assertEqual(describe(restored), describe(population))
+        self.assertEqual(set(restored.species.species), set(population.species.species))
+        self.assertIs(restored.species.reporters, restored.reporters)
+        self.assertEqual(len(restored_stats.most_fit_genomes), 5)
+        self.assertEqual(restored_stats.generation_statistics, stats.generation_statistics)
+
+        # Restored population evolves the same way as the one which kept running
+        population.reporters.remove(checkpointer)
+        state = random.getstate()
+        population.run(evaluate, 1)
+        random.setstate(state)
+        restored.run(evaluate, 1)
+        self.assertEqual(describe(restored), describe(population))
+
+    def test_fitness(self):
+        population = neat.Population(Neat.config)
+        for key, genome in population.population.items():
+            genome.fitness = key
+        fitnesses = {key: genome.fitness for key, genome in population.population.items()}
+        checkpointer = Checkpointer(1, self.prefix)
+        # Writing waits until the next generation evaluates the same genomes
+        evaluated = threading.Event()
+        checkpointer.executor.submit(evaluated.wait)
+        checkpointer.save(population.config, population.population, population.species, 1)
+        for genome in population.population.values():
+            genome.fitness = None
+        evaluated.set()
+        checkpointer.close()
+        restored = restore_checkpoint(f'{self.prefix}1')
+        self.assertEqual({key: genome.fitness for key, genome in restored.population.items()}, fitnesses)
+
+    def test_neat_checkpoint(self):
+        population = neat.Population(Neat.config)
+        population.add_reporter(neat.Checkpointer(1, None, self.prefix))
+        population.run(evaluate, 1)
+        restored = restore_checkpoint(f'{self.prefix}0')
+        self.assertEqual(set(restored.population), set(population.population))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import neat
+import numpy
+from compiled_network import CompiledNetwork, PopulationNetwork
+from settings import *
+
+
+class TestCompiledNetwork(unittest.TestCase):
+    def setUp(self):
+        self.configs = [neat.Config(neat.DefaultGenome, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                                    neat.DefaultStagnation, path)
+                        for path in (CONFIG_DIR, 'neat_complete_1_sigmoid/config.txt')]
+
+    def get_genomes(self, config):
+        genomes = list(neat.Population(config).population.values())
+        for genome in genomes:
+            for _ in range(10):
+                genome.mutate(config.genome_config)
+        return genomes
+
+    def test_activate(self):
+        rng = numpy.random.default_rng(0)
+        for config in self.configs:
+            genomes = self.get_genomes(config)
+            inputs = rng.integers(-1, 5, size=(len(genomes), len(config.genome_config.input_keys)))
+            expected = numpy.array([neat.nn.FeedForwardNetwork.create(genome, config).activate(row)
+                                    for genome, row in zip(genomes, inputs.tolist())])
+            networks = [CompiledNetwork.create(genome, config) for genome in genomes]
+            numpy.testing.assert_allclose([network.activate(row) for network, row in zip(networks, inputs.tolist())],
+                                          expected, atol=1e-9)
+            numpy.testing.assert_allclose(networks[0].activate_batch(inputs), [
+                neat.nn.FeedForwardNetwork.create(genomes[0], config).activate(row) for row in inputs.tolist()],
+                atol=1e-9)
+
+            population = PopulationNetwork(networks)
+            numpy.testing.assert_allclose(population.activate(inputs), expected, atol=1e-9)
+            rows = numpy.arange(1, len(genomes), 2)
+            numpy.testing.assert_allclose(population.activate(inputs[rows], rows), expected[rows], atol=1e-9)
+            self.assertRaises(RuntimeError, networks[0].activate, [1])
+
+    def test_aggregation(self):
+        config = self.configs[0]
+        genome = next(iter(neat.Population(config).population.values()))
+        next(iter(genome.nodes.values())).aggregation = 'max'
+        self.assertRaises(ValueError, CompiledNetwork.create, genome, config)
+
+
+if __name__ == '__main__':
+    unittest.main()
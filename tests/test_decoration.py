@@ -3,10 +3,15 @@ from unittest.mock import patch, Mock
 from decoration import *
 from random import seed
 from settings import *
+from utils import clear_cache
 import pygame
 
 
 class TestDecoration(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+        self.addCleanup(clear_cache)
+
     @staticmethod
     def helper_inc():
         i = 0
@@ -37,7 +42,7 @@ class TestDecoration(unittest.TestCase):
             with patch('decoration.get_tile_img'):
                 water = Water(10, 10)
                 amount = (10 + 2 * screen_width) // WATER_TILE_WIDTH
-                self.assertEqual(len(water.water_sprites.sprites()), amount)
+                self.assertEqual(water.amount, amount)
                 self.assertRaises(ValueError, Water, 10, -1,)
                 self.assertRaises(TypeError, Water, 'str', '1')
 
@@ -0,0 +1,49 @@
+import unittest
+import pygame
+from dirty_rects import DirtyRects
+
+
+class TestDirtyRects(unittest.TestCase):
+    def test_collect(self):
+        dirty = DirtyRects((100, 100))
+        dirty.add((10, 10, 20, 20), 'a')
+        self.assertEqual(dirty.collect(), [pygame.Rect(0, 0, 100, 100)])
+        dirty.add((10, 10, 20, 20), 'a')
+        self.assertEqual(dirty.collect(), [])
+        dirty.add((15, 10, 20, 20), 'a')
+        self.assertCountEqual(dirty.collect(), [pygame.Rect(10, 10, 20, 20), pygame.Rect(15, 10, 20, 20)])
+        dirty.add((15, 10, 20, 20), 'b')
+        dirty.add((90, 90, 20, 20), 'c')
+        self.assertCountEqual(dirty.collect(), [pygame.Rect(15, 10, 20, 20), pygame.Rect(15, 10, 20, 20),
+                                                pygame.Rect(90, 90, 10, 10)])
+        self.assertCountEqual(dirty.collect(), [pygame.Rect(15, 10, 20, 20), pygame.Rect(90, 90, 10, 10)])
+        dirty.add((200, 200, 10, 10), 'd')
+        self.assertEqual(dirty.collect(), [])
+        dirty.invalidate()
+        self.assertEqual(dirty.collect(), [pygame.Rect(0, 0, 100, 100)])
+
+    def test_redraw(self):
+        surface = pygame.Surface((100, 100))
+        dirty = DirtyRects((100, 100))
+        dirty.add((10, 10, 10, 10), 'a')
+        dirty.collect()
+        dirty.redraw(surface, lambda: surface.fill('white'))
+        self.assertEqual(surface.get_at((15, 15)), pygame.Color('white'))
+        self.assertEqual(surface.get_at((50, 50)), pygame.Color('white'))
+        self.assertEqual(surface.get_clip(), pygame.Rect(0, 0, 100, 100))
+
+        surface.fill('black')
+        dirty.add((10, 10, 10, 10), 'b')
+        dirty.collect()
+        dirty.redraw(surface, lambda: surface.fill('white'))
+        self.assertEqual(surface.get_at((15, 15)), pygame.Color('white'))
+        self.assertEqual(surface.get_at((50, 50)), pygame.Color('black'))
+        self.assertEqual(surface.get_clip(), pygame.Rect(0, 0, 100, 100))
+
+        dirty.add((10, 10, 10, 10), 'b')
+        dirty.collect()
+        dirty.redraw(surface, lambda: self.fail('Nothing should be redrawn'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import neat
+import numpy
+from unittest.mock import patch
+from env import PlatformerEnv, VectorEnv, SubprocessVectorEnv, EnvError, OBSERVATION_SIZE
+from game import Platformer
+from neat_game import Neat
+
+
+class TestEnv(unittest.TestCase):
+    @staticmethod
+    def actions(steps, count):
+        return numpy.random.RandomState(0).randint(0, 6, (steps, count))
+
+    def test_env(self):
+        with patch('game.pygame.time.Clock'):
+            game = Platformer(headless=True)
+        env = PlatformerEnv()
+        self.assertRaises(EnvError, env.step, 0)
+        for genome_id, genome in list(neat.Population(Neat.config).population.items())[:3]:
+            genome.fitness = 0
+            game.train_ai(genome, Neat.config, genome_id, 1)
+            net = Platformer.create_network(genome, Neat.config)
+            observation = env.reset()
+            self.assertEqual(observation.shape, (OBSERVATION_SIZE,))
+            total, done = 0, False
+            while not done:
+                output = net.activate(observation.tolist())
+                observation, reward, done, info = env.step(output.index(max(output)))
+                total += reward
+            self.assertAlmostEqual(total, genome.fitness)
+            self.assertEqual(info['fitness'], genome.fitness)
+            self.assertEqual(env.frame, game.frame)
+            self.assertRaises(EnvError, env.step, 0)
+        env.reset()
+        self.assertRaises(EnvError, env.step, 6)
+
+    def test_vector(self):
+        envs = [PlatformerEnv() for _ in range(3)]
+        actions = self.actions(300, 3)
+        with VectorEnv(3) as vector:
+            observations = vector.reset()
+            numpy.testing.assert_array_equal(observations, [env.reset() for env in envs])
+            self.assertRaises(EnvError, vector.step, [0, 0])
+            finished = 0
+            for row in actions:
+                observations, rewards, dones, infos = vector.step(row)
+                for index, (env, action) in enumerate(zip(envs, row)):
+                    observation, reward, done, info = env.step(action)
+                    self.assertEqual((rewards[index], dones[index]), (reward, done))
+                    if done:
+                        finished += 1
+                        numpy.testing.assert_array_equal(infos[index]['final_observation'], observation)
+                        observation = env.reset()
+                    numpy.testing.assert_array_equal(observations[index], observation)
+            self.assertGreater(finished, 0)
+
+    def test_subprocess(self):
+        actions = self.actions(100, 3)
+        with VectorEnv(3) as vector, SubprocessVectorEnv(3, workers=2) as subprocess_vector:
+            self.assertEqual(subprocess_vector.counts, [2, 1])
+            numpy.testing.assert_array_equal(subprocess_vector.reset(), vector.reset())
+            for row in actions:
+                expected = vector.step(row)
+                result = subprocess_vector.step(row)
+                for value, expected_value in zip(result[:3], expected[:3]):
+                    numpy.testing.assert_array_equal(value, expected_value)
+                self.assertEqual([info['fitness'] for info in result[3]],
+                                 [info['fitness'] for info in expected[3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
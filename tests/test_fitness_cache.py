@@ -0,0 +1,81 @@
+import unittest
+import copy
+import neat
+from unittest.mock import patch, Mock
+from fitness_cache import FitnessCache, StatisticsReporter, fitness_cache, phenotype_key
+from neat_game import Neat, eval_genomes
+from settings import level_1
+
+
+class TestFitnessCache(unittest.TestCase):
+    def setUp(self):
+        fitness_cache.clear()
+        self.addCleanup(fitness_cache.clear)
+        self.config = Neat.config
+        self.genome = next(iter(neat.Population(self.config).population.values()))
+
+    def test_lru(self):
+        self.assertRaises(ValueError, FitnessCache, 0)
+        cache = FitnessCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        cache.clear()
+        self.assertEqual((len(cache.fitnesses), cache.hits, cache.misses), (0, 0, 0))
+
+    def test_key(self):
+        clone = copy.deepcopy(self.genome)
+        clone.key = self.genome.key + 1000
+        self.assertEqual(phenotype_key(clone, self.config), phenotype_key(self.genome, self.config))
+
+        # Disabled connection and node it leads to don't change the network
+        node = self.config.genome_config.get_new_node_key(clone.nodes)
+        clone.nodes[node] = clone.create_node(self.config.genome_config, node)
+        connection = clone.create_connection(self.config.genome_config, self.config.genome_config.input_keys[0], node)
+        connection.enabled = False
+        clone.connections[connection.key] = connection
+        self.assertEqual(phenotype_key(clone, self.config), phenotype_key(self.genome, self.config))
+
+        enabled = next(connection for connection in clone.connections.values() if connection.enabled)
+        enabled.weight += 0.5
+        self.assertNotEqual(phenotype_key(clone, self.config), phenotype_key(self.genome, self.config))
+        self.assertNotEqual(phenotype_key(self.genome, self.config, level_1), phenotype_key(self.genome, self.config))
+
+    def test_eval_genomes(self):
+        clone = copy.deepcopy(self.genome)
+        clone.key = self.genome.key + 1000
+        flags = Neat.draw, Neat.return_to_initial, Neat.generation
+        self.addCleanup(lambda: setattr(Neat, 'draw', flags[0]))
+        self.addCleanup(lambda: setattr(Neat, 'return_to_initial', flags[1]))
+        self.addCleanup(lambda: setattr(Neat, 'generation', flags[2]))
+        Neat.draw = False
+        Neat.return_to_initial = False
+        stats = StatisticsReporter()
+
+        def train_ai(genome, config, genome_id, generation):
+            genome.fitness += 42
+            return False
+
+        with patch('neat_game.Platformer') as platformer:
+            platformer().train_ai.side_effect = train_ai
+            stats.start_generation(0)
+            eval_genomes([(self.genome.key, self.genome), (clone.key, clone)], self.config)
+            self.assertEqual(platformer().train_ai.call_count, 1)
+            self.assertEqual((self.genome.fitness, clone.fitness), (42, 42))
+            stats.post_evaluate(self.config, {}, Mock(species={}), self.genome)
+            self.assertEqual(stats.cache_statistics, [(1, 1)])
+
+            # Elite of the next generation isn't simulated again
+            stats.start_generation(1)
+            eval_genomes([(self.genome.key, self.genome)], self.config)
+            self.assertEqual(platformer().train_ai.call_count, 1)
+            stats.post_evaluate(self.config, {}, Mock(species={}), self.genome)
+            self.assertEqual(stats.cache_statistics, [(1, 1), (1, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
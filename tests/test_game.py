@@ -3,6 +3,7 @@ from unittest.mock import Mock, patch
 from game import Platformer
 from neat_game import Neat, eval_genomes, eval_genomes_multiple
 import pygame
+import neat
 from collections import namedtuple
 
 
@@ -21,6 +22,27 @@ class TestGame(unittest.TestCase):
                 pygame.mixer.quit()
                 pygame.display.quit()
 
+    def test_level_update(self):
+        with patch('game.pygame.time.Clock'):
+            game = Platformer(draw=True)
+            overworld = game.overworld
+
+            def run(events):
+                # Level runs during the first frame and stops in the second one
+                running = overworld.run.call_count == 1
+                overworld.proceed_to_level = Mock() if running else None
+                overworld.updated_rects = None if running else []
+
+            overworld.run = Mock(side_effect=run)
+            overworld.return_timeout = Mock(return_value=True)
+            events = namedtuple('events', 'type, key')
+            with patch('game.pygame.event.get', return_value=[events(pygame.KEYDOWN, pygame.K_BACKSPACE)]), \
+                    patch('game.pygame.display.update') as update:
+                game.run()
+            update.assert_called_once_with()
+            pygame.mixer.quit()
+            pygame.display.quit()
+
     def test_neat(self):
         with patch('game.pygame.time.Clock'):
             neat_run = Neat()
@@ -50,6 +72,35 @@ class TestGame(unittest.TestCase):
             Neat.generation = 0
             Neat.return_to_initial = False
 
+    def test_headless(self):
+        with patch('game.pygame.time.Clock') as clock:
+            game = Platformer(draw=True, headless=True)
+            self.assertFalse(game.draw)
+            self.assertIsNone(game.overworld)
+            self.assertEqual(pygame.display.get_driver(), 'dummy')
+            genome_id, genome = next(iter(neat.Population(Neat.config).population.items()))
+            genome.fitness = 0
+            self.assertFalse(game.train_ai(genome, Neat.config, genome_id, 1))
+            clock().tick.assert_not_called()
+            self.assertGreater(game.frame, 0)
+            # Simulation doesn't depend on real time, so same genome gets same fitness
+            fitness = genome.fitness
+            genome.fitness = 0
+            Platformer(headless=True).train_ai(genome, Neat.config, genome_id, 1)
+            self.assertEqual(genome.fitness, fitness)
+            # Level is reused by next genomes and reset to its initial state
+            level = game.training_level
+            genome.fitness = 0
+            game.train_ai(genome, Neat.config, genome_id, 1)
+            self.assertIs(game.training_level, level)
+            self.assertEqual(genome.fitness, fitness)
+
+            genomes = list(neat.Population(Neat.config_multiple).population.items())[:10]
+            game = Platformer(headless=True)
+            self.assertFalse(game.train_ai_multiple(genomes, Neat.config_multiple, 1))
+            self.assertTrue(all(isinstance(genome.fitness, float) for genome_id, genome in genomes))
+        pygame.display.quit()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,8 +4,10 @@ from level import Level, LevelError
 from settings import *
 from player import Player
 import pygame
+import numpy
 from tiles import ObjectTile, CoinTile, WideTile
 import tiles
+import utils
 
 
 class TestLevelUtils(unittest.TestCase):
@@ -25,6 +27,9 @@ class TestLevelUtils(unittest.TestCase):
         yield from lst
 
     def setUp(self):
+        # Mocked images shouldn't be taken from or left in the asset cache
+        utils.clear_cache()
+        self.addCleanup(utils.clear_cache)
         level_test = {'player': ''}
         gen1 = self.helper_gen([['0']])
         pygame.mixer.init()
@@ -50,7 +55,7 @@ class TestLevelUtils(unittest.TestCase):
         inc2 = self.helper_inc()
         img.return_value = Mock()
         img().convert_alpha = Mock(side_effect=lambda x=0: inc2())
-        self.assertEqual(self.level.load_img({1: '', 2: ''}), {1: 1, 2: 2})
+        self.assertEqual(self.level.load_img({1: 'first', 2: 'second', 3: 'first'}), {1: 1, 2: 2, 3: 1})
         self.patcher1.stop()
 
     def test_create_tiles(self):
@@ -84,9 +89,8 @@ class TestLevelUtils(unittest.TestCase):
         gen2 = self.helper_gen([['0', '1'], ['-1', '2']])
         self.level.level_data = {'coins': ''}
         with patch('level.utils.import_csv', Mock(return_value=gen2)):
-            with patch('tiles.get_coin_images', Mock(return_value=mock_imgs)):
+            with patch.object(CoinTile.__dict__['images'], 'images', mock_imgs):
                 self.level.preloaded = {'coins': mock_imgs}
-                CoinTile.images = tiles.get_coin_images()
                 self.level.create_tile_group('coins')
                 test_coins = self.level.objects_tiles.sprites()
                 self.assertEqual(len(test_coins), 3)
@@ -241,6 +245,11 @@ class TestLevel(unittest.TestCase):
         self.assertEqual(self.player.coins, 6)
         self.assertEqual(len(self.level.objects_tiles.sprites()), n_tiles - 1)
 
+    def pass_invulnerability(self):
+        # Advance simulation clock until invulnerability after the last hit is over
+        while self.level.clock.get_ticks() - self.player.last_hit < AFTER_DAMAGE_INVUL:
+            self.level.clock.tick()
+
     def test_enemy_col(self):
         # Enemies 449, 338/833,466
         with patch('level.AFTER_DAMAGE_INVUL', -2):
@@ -272,9 +281,10 @@ class TestLevel(unittest.TestCase):
         self.player.update()
         self.level.add_explosion_particles = Mock()
         n_lives = self.player.lives
-        with patch('level.pygame.time.get_ticks', Mock(return_value=AFTER_DAMAGE_INVUL+1)) as mm:
-            self.level.enemy_collision(self.player, self.level.enemy_tiles)
-            mm.assert_called_once()
+        self.assertIs(self.level.clock, self.player.clock)
+        self.pass_invulnerability()
+        self.level.enemy_collision(self.player, self.level.enemy_tiles)
+        self.assertEqual(self.player.last_hit, self.level.clock.get_ticks())
         self.assertEqual(self.player.enemies_killed, 1)
         self.assertTrue(pygame.mixer.get_busy())
         self.level.add_explosion_particles.assert_not_called()
@@ -303,8 +313,8 @@ class TestLevel(unittest.TestCase):
         mocked_keys = {pygame.K_LEFT: False, pygame.K_RIGHT: True, pygame.K_UP: False}
         with patch('player.pygame.key.get_pressed', return_value=mocked_keys):
             self.player.update()
-        with patch('level.pygame.time.get_ticks', Mock(return_value=AFTER_DAMAGE_INVUL+self.player.last_hit)):
-            self.level.enemy_collision(self.player, self.level.enemy_tiles)
+        self.pass_invulnerability()
+        self.level.enemy_collision(self.player, self.level.enemy_tiles)
         self.assertEqual(self.player.blinks, 0)
         self.assertTrue(pygame.mixer.get_busy())
         self.assertEqual(self.player.direction.y, -10)
@@ -320,8 +330,8 @@ class TestLevel(unittest.TestCase):
         mocked_keys = {pygame.K_LEFT: False, pygame.K_RIGHT: True, pygame.K_UP: False}
         with patch('player.pygame.key.get_pressed', return_value=mocked_keys):
             self.player.update()
-        with patch('level.pygame.time.get_ticks', Mock(return_value=AFTER_DAMAGE_INVUL + self.player.last_hit)):
-            self.level.enemy_collision(self.player, self.level.enemy_tiles)
+        self.pass_invulnerability()
+        self.level.enemy_collision(self.player, self.level.enemy_tiles)
         self.assertFalse(pygame.mixer.get_busy())
         self.assertEqual(self.player.lives, n_lives)
         self.assertEqual(self.player.enemies_killed, 1)
@@ -532,6 +542,41 @@ class TestLevel(unittest.TestCase):
 
         assert isinstance(self.level.nparray_to_list(self.player), list)
 
+    def scan_fov(self, player):
+        # Reference implementation, checking every tile of the level for every square on the screen
+        tiles_neat = [(self.level.terrain_tiles, 1), (self.level.enemy_tiles, -1), (self.level.objects_tiles, 3),
+                      (self.level.tree_obs, 2)]
+        pl_x = int((player.rect.x + player.speed.x + 1) // tile_size)
+        pl_y = int(player.rect.y // tile_size) - 1
+        fov_array = numpy.zeros(((screen_height // tile_size) - 1, FOV_DISTANCE + LEFT_FOV_ADJUSTMENT))
+        for column, x in enumerate(range((pl_x - LEFT_FOV_ADJUSTMENT) * tile_size, (pl_x + FOV_DISTANCE) * tile_size,
+                                         tile_size)):
+            for row, y in enumerate(range(tile_size, screen_height, tile_size)):
+                for tile_type, code in tiles_neat:
+                    for tile in tile_type.sprites():
+                        tile_x = tile.rect.x + self.level.camera_offset
+                        if tile_x in range(x, x + tile_size) and tile.rect.y in range(y, y + tile_size):
+                            fov_array[row][column] = code
+        fov_array[pl_y][LEFT_FOV_ADJUSTMENT] = 4
+        return fov_array
+
+    def test_fov_grid(self):
+        self.level.neat = True
+        self.level.draw = False
+        for shift in (0, -7, -64, -250, 13):
+            self.level.world_shift = shift
+            self.level.players.update = Mock()
+            self.level.draw_level()
+            for x, y in ((0, 0), (70, 300), (400, 100), (833, 450), (1100, 640)):
+                self.player.rect.topleft = (x, y)
+                numpy.testing.assert_array_equal(self.level.fov(self.player), self.scan_fov(self.player))
+
+        collected = self.level.objects_tiles.sprites()[0]
+        self.player.rect.topleft = collected.rect.topleft
+        self.level.objects_collision(self.player, self.level.objects_tiles)
+        self.player.rect.x -= 2 * tile_size
+        numpy.testing.assert_array_equal(self.level.fov(self.player), self.scan_fov(self.player))
+
     def test_distance(self):
         self.player.neat = True
         self.player.animate = Mock()
@@ -557,6 +602,38 @@ class TestLevel(unittest.TestCase):
         self.assertEqual(self.level.world_shift, -15)
         self.assertEqual(self.level.distance_traveled(self.player), 960)
 
+    def test_snapshot(self):
+        self.level = Level(level_0, self.screen, self.player, Mock(), draw=False)
+        state = self.level.snapshot()
+        objects, enemies = len(self.level.objects_tiles), len(self.level.enemy_tiles)
+
+        def play():
+            trace = []
+            for frame in range(300):
+                mocked_keys = {pygame.K_LEFT: False, pygame.K_RIGHT: True, pygame.K_UP: frame % 20 < 10,
+                               pygame.K_BACKSPACE: False}
+                with patch('player.pygame.key.get_pressed', return_value=mocked_keys):
+                    self.level.run()
+                trace.append((self.player.rect.topleft, self.player.coins, self.player.lives, self.level.camera_offset,
+                              [enemy.rect.topleft for enemy in self.level.enemy_tiles]))
+            return trace
+
+        first = play()
+        self.assertGreater(self.player.coins, 0)
+        self.level.reset(state)
+        self.assertEqual((len(self.level.objects_tiles), len(self.level.enemy_tiles)), (objects, enemies))
+        self.assertEqual(self.level.clock.frame, 0)
+        self.assertEqual(play(), first)
+
+        # Sprites get back to their groups, also to those level doesn't track
+        enemy = next(iter(self.level.enemy_tiles))
+        extra = pygame.sprite.Group(enemy)
+        state = self.level.snapshot()
+        enemy.kill()
+        self.level.reset(state)
+        self.assertIn(enemy, extra)
+        self.assertIn(enemy, self.level.enemy_tiles)
+
     def tearDown(self):
         self.patcher.stop()
         pygame.mixer.quit()
@@ -605,6 +682,26 @@ class TestMultiplePlayers(unittest.TestCase):
         self.level.draw = False
         self.assertEqual(self.level.run(), None)
 
+    def test_observe(self):
+        self.level.draw = False
+        for frame in range(30):
+            self.level.run()
+            self.level.apply_decisions(self.players, [2, 4, 0])
+        self.players[2].rect.x += 5 * tile_size
+        observations = self.level.observe(self.players)
+        self.assertEqual(observations.shape, (3, 70))
+        for player, observation in zip(self.players, observations):
+            numpy.testing.assert_array_equal(observation, self.level.fov(player).reshape(-1))
+        self.assertEqual(self.level.observe([]).shape, (0, 70))
+
+        self.level.world_shift = -5
+        self.level.prev_shift = -5
+        shifted = [player.shifted for player in self.players]
+        distances = self.level.distances_traveled(self.players)
+        for player, distance, old_shifted in zip(self.players, distances, shifted):
+            self.assertEqual(player.shifted, old_shifted + 5)
+            self.assertEqual(distance, player.rect.x + player.shifted)
+
     def tearDown(self):
         self.patcher.stop()
         pygame.mixer.quit()
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+import numpy
+import pygame
+from level_compiler import CompiledLevel, LevelCompilerError, compile_level, compiled_path, read_layer
+from level import Level
+from player import Player
+from settings import *
+
+
+class TestLevelCompiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.level_data = {}
+        for layer, path in level_0.items():
+            self.level_data[layer] = shutil.copy(path, self.directory)
+
+    def test_compile(self):
+        path = compile_level(self.level_data)
+        self.assertEqual(path, os.path.join(self.directory, COMPILED_LEVEL_FILE))
+        compiled = CompiledLevel.load(self.level_data)
+        self.assertIsInstance(compiled.grids, numpy.memmap)
+        terrain = read_layer(self.level_data['terrain'])
+        numpy.testing.assert_array_equal(compiled.layer('terrain'), terrain)
+        self.assertEqual(compiled.level_width, terrain.shape[1] * tile_size)
+        row, column = numpy.argwhere(read_layer(self.level_data['player']) == 1)[0]
+        self.assertEqual(compiled.finish, (column * tile_size, row * tile_size))
+        self.assertIsNotNone(compiled.spawn)
+
+        self.assertRaises(LevelCompilerError, compile_level, {'terrain': self.level_data['terrain']})
+
+    def test_stale(self):
+        self.assertIsNone(CompiledLevel.load(self.level_data))
+        compile_level(self.level_data)
+        self.assertIsNotNone(CompiledLevel.load(self.level_data))
+        modified = os.path.getmtime(compiled_path(self.level_data)) + 10
+        os.utime(self.level_data['coins'], (modified, modified))
+        self.assertIsNone(CompiledLevel.load(self.level_data))
+        self.assertIsNone(CompiledLevel.load({'terrain': self.level_data['terrain']}))
+
+    def test_level(self):
+        screen = pygame.display.set_mode((screen_width, screen_height))
+        compile_level(self.level_data)
+        compiled = Level(self.level_data, screen, Player((0, 0)), None, draw=False)
+        with patch('level.CompiledLevel.load', return_value=None):
+            parsed = Level(self.level_data, screen, Player((0, 0)), None, draw=False)
+        self.assertEqual(compiled.level_width, parsed.level_width)
+        self.assertEqual(compiled.player.rect, parsed.player.rect)
+        for compiled_group, parsed_group in zip(
+                (compiled.terrain_tiles, compiled.background_tiles, compiled.enemy_tiles, compiled.objects_tiles,
+                 compiled.constrains, compiled.level_end, compiled.tree_obs),
+                (parsed.terrain_tiles, parsed.background_tiles, parsed.enemy_tiles, parsed.objects_tiles,
+                 parsed.constrains, parsed.level_end, parsed.tree_obs)):
+            self.assertEqual([(type(tile), tile.rect, tile.image) for tile in compiled_group],
+                             [(type(tile), tile.rect, tile.image) for tile in parsed_group])
+        pygame.display.quit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy
+import pygame
+from level import Level, LevelError
+from level_compiler import LEVEL_LAYERS, compile_level, read_layer
+from player import Player
+from settings import *
+
+
+class TestLevelStream(unittest.TestCase):
+    copies = 5
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.level_data = self.write_level(self.directory)
+        self.screen = pygame.display.set_mode((screen_width, screen_height))
+        self.addCleanup(pygame.display.quit)
+
+    def write_level(self, directory, flat=False):
+        """
+        Create level made of several copies of level 0, with player starting in the first one and finish in the last
+        :param directory: directory for csv layers
+        :param flat: whether to fill pits with terrain and remove enemies, so that level can be walked through
+        :return: level data
+        """
+        level_data = {}
+        for layer in LEVEL_LAYERS:
+            grid = read_layer(level_0[layer])
+            width = grid.shape[1]
+            if flat and layer == 'terrain':
+                pits = (grid == -1).all(axis=0)
+                grid[:, pits] = grid[:, [0]]
+            elif flat and layer == 'enemies':
+                grid[:] = -1
+            long_grid = numpy.concatenate([grid] * self.copies, axis=1)
+            if layer == 'player':
+                long_grid[:, width:] = -1
+                row, column = numpy.argwhere(grid == 1)[0]
+                long_grid[row, column] = -1
+                long_grid[row, column + width * (self.copies - 1)] = 1
+            path = os.path.join(directory, f'{layer}.csv')
+            numpy.savetxt(path, long_grid, fmt='%d', delimiter=',')
+            level_data[layer] = path
+        return level_data
+
+    def create(self, streaming, draw=False):
+        return Level(self.level_data, self.screen, Player((0, 0), neat=True), None, neat=True, draw=draw,
+                     streaming=streaming)
+
+    @staticmethod
+    def tiles(level):
+        """
+        Cells of tiles in level's groups
+        """
+        return [[level.stream.keys[tile] for tile in group] for group in level.stream.groups]
+
+    def test_compiled(self):
+        self.assertRaises(LevelError, self.create, True)
+
+    def test_run(self):
+        self.level_data = self.write_level(self.directory, flat=True)
+        compile_level(self.level_data)
+        eager, streamed = self.create(False), self.create(True)
+        self.assertEqual(streamed.level_width, eager.level_width)
+        self.assertEqual(streamed.player.rect, eager.player.rect)
+        self.assertLess(len(streamed.terrain_tiles), len(eager.terrain_tiles))
+        for frame in range(1000):
+            keys = {'right': True, 'left': False, 'up': frame % 20 < 10}
+            for level in (eager, streamed):
+                level.run()
+                level.player.keys = dict(keys)
+            self.assertEqual(streamed.player.rect, eager.player.rect)
+            self.assertEqual(streamed.camera_offset, eager.camera_offset)
+            if eager.check_defeat(eager.player):
+                break
+            numpy.testing.assert_array_equal(streamed.fov(streamed.player), eager.fov(eager.player))
+            # Every loaded tile is at its place in the whole level
+            for streamed_group, eager_group in zip(streamed.stream.groups, (
+                    eager.terrain_tiles, eager.background_tiles, eager.enemy_tiles, eager.objects_tiles,
+                    eager.animated_tiles, eager.constrains, eager.level_end, eager.tree_obs)):
+                self.assertLessEqual({tuple(tile.rect) for tile in streamed_group},
+                                     {tuple(tile.rect) for tile in eager_group})
+        self.assertNotIn(0, streamed.stream.chunks)
+
+    def test_enemies(self):
+        compile_level(self.level_data)
+        eager, streamed = self.create(False), self.create(True)
+        stream = streamed.stream
+        enemy = next(enemy for enemy in eager.enemy_tiles if enemy.rect.x > 2 * screen_width)
+        spawn = enemy.rect.copy()
+        self.assertNotIn(spawn, [streamed_enemy.rect for streamed_enemy in streamed.enemy_tiles])
+        for frame in range(30):
+            for level in (eager, streamed):
+                level.update_tiles()
+        self.assertNotEqual(enemy.rect, spawn)
+
+        # Enemy starts moving when its chunk is loaded, not from the first frame
+        offset = screen_width // 2 - spawn.x
+        stream.update(offset)
+        self.assertIn(spawn, [streamed_enemy.rect for streamed_enemy in streamed.enemy_tiles])
+        for frame in range(30):
+            streamed.enemy_tiles.update()
+        self.assertNotIn(spawn, [streamed_enemy.rect for streamed_enemy in streamed.enemy_tiles])
+        # and starts from its spawn position again after its chunk was released
+        stream.update(0)
+        stream.update(offset)
+        self.assertIn(spawn, [streamed_enemy.rect for streamed_enemy in streamed.enemy_tiles])
+
+    def test_window(self):
+        compile_level(self.level_data)
+        level = self.create(True, draw=True)
+        stream = level.stream
+        self.assertEqual(stream.window, stream.chunks_around(0))
+        coin = next(iter(level.animated_tiles))
+        coin_cell = stream.keys[coin]
+        coin.kill()
+        level.fov_grid.remove(coin)
+        state = level.snapshot()
+        start = self.tiles(level)
+
+        counts = []
+        for offset in range(0, -level.level_width, -tile_size * 3):
+            level.camera_offset = offset
+            level.update_tiles()
+            level.draw_tiles()
+            counts.append(sum(len(group) for group in stream.groups))
+            # FOV grid covers only loaded chunks
+            self.assertEqual((level.fov_grid.origin, level.fov_grid.columns),
+                             (stream.window.start * stream.chunk_columns, len(stream.window) * stream.chunk_columns))
+            self.assertLessEqual(len(level.static_layer.chunks), 3)
+        self.assertLess(max(counts), len(self.create(False).terrain_tiles))
+        self.assertNotIn(0, stream.chunks)
+        self.assertIn(coin_cell, stream.consumed)
+
+        level.camera_offset = 0
+        level.update_tiles()
+        self.assertEqual(self.tiles(level), start)
+        self.assertNotIn(coin_cell, stream.keys.values())
+
+        level.camera_offset = -level.level_width // 2
+        level.update_tiles()
+        level.reset(state)
+        self.assertEqual(self.tiles(level), start)
+        self.assertEqual(stream.window, stream.chunks_around(0))
+        self.assertEqual(set(level.fov_grid.cells), set(level.terrain_tiles) | set(level.tree_obs)
+                         | set(level.objects_tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
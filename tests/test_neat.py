@@ -1,6 +1,20 @@
+import os
+import random
 import unittest
+import neat
 from unittest.mock import patch, Mock
-from neat_game import Neat
+import neat_game
+from neat_game import Neat, ParallelEvaluator, eval_genome
+from fitness_cache import fitness_cache
+from settings import level_1
+
+
+def worker_levels():
+    """
+    Number of levels built by game of the worker process, the level it trained on last and whether it recorded replay
+    """
+    game = neat_game.worker_game
+    return len(game.training_levels), id(game.training_level), game.replay is not None
 
 
 class TestNeat(unittest.TestCase):
@@ -45,4 +59,51 @@ class TestNeat(unittest.TestCase):
             self.assertEqual(neat_run.config_multiple.fitness_threshold, 5000)
             self.assertEqual(neat_run.generation, 1)
 
+    def test_parallel(self):
+        neat_run = Neat(parallel=True, workers=2)
+        Neat.generation = 0
+        Neat.return_to_initial = False
+        population = neat.Population(neat_run.config)
+        genomes = list(population.population.items())[:3]
+        evaluator = ParallelEvaluator(neat_run.workers)
+        try:
+            evaluator.evaluate(genomes, neat_run.config)
+        finally:
+            evaluator.close()
+        self.assertEqual(Neat.generation, 1)
+        for genome_id, genome in genomes:
+            self.assertIsInstance(genome.fitness, (int, float))
+        self.assertNotIn('PLATFORMER_HEADLESS', os.environ)
+        with patch('neat_game.ParallelEvaluator') as m:
+            neat_run.config.fitness_threshold = -50
+            neat_run.run_neat()
+            m.assert_called_with(2)
+            m().close.assert_called()
+            neat_run.restore_treshhold()
 
+    def test_warm_workers(self):
+        self.addCleanup(setattr, Neat, 'generation', Neat.generation)
+        self.addCleanup(random.setstate, random.getstate())
+        population = neat.Population(Neat.config)
+        genomes = list(population.population.items())[:4]
+        fitnesses = [eval_genome(genome, Neat.config) for genome_id, genome in genomes]
+        fitness_cache.clear()
+        self.addCleanup(fitness_cache.clear)
+        evaluator = ParallelEvaluator(1)
+        try:
+            evaluator.evaluate(genomes, Neat.config)
+            built, level, recorded = evaluator.pool.apply(worker_levels)
+            # Worker builds only the trained level and doesn't record replays
+            self.assertEqual((built, recorded), (1, False))
+            fitness_cache.clear()
+            evaluator.evaluate(genomes, Neat.config)
+            # Worker keeps its levels and resets them for next genomes
+            self.assertEqual(evaluator.pool.apply(worker_levels), (built, level, recorded))
+            self.assertEqual([genome.fitness for genome_id, genome in genomes], fitnesses)
+            # Fitness cached for one level isn't reused on another
+            evaluator.level_data = level_1
+            misses = fitness_cache.misses
+            evaluator.evaluate(genomes, Neat.config)
+            self.assertEqual(fitness_cache.misses - misses, len(genomes))
+        finally:
+            evaluator.close()
@@ -32,6 +32,14 @@ class TestOverworld(unittest.TestCase):
         self.assertEqual(len(self.over.players.sprites()), 1)
         self.assertEqual(self.over.players.sprite.rect.center, (60, 60))
 
+    def test_return_timeout(self):
+        self.assertIs(self.over.clock, self.player.clock)
+        self.over.escape_timeout = self.over.clock.get_ticks()
+        self.assertFalse(self.over.return_timeout())
+        for _ in range(OVERWORLD_ESCAPE_TIMEOUT * CLOCK_RATE):
+            self.over.clock.tick()
+        self.assertTrue(self.over.return_timeout())
+
     def test_start(self):
         bricks = self.over.brick_levels.sprites()
         self.over.set_state()
@@ -1,7 +1,8 @@
 import unittest
 from unittest.mock import patch, Mock
-from particle import Particle
+from particle import Particle, ParticlePool
 from pygame import Surface
+from pygame.sprite import Group
 from settings import ANIMATION_SPEED
 
 
@@ -41,6 +42,35 @@ class TestParticle(unittest.TestCase):
                 with patch('particle.ANIMATION_SPEED', 'str'):
                     self.assertRaises(TypeError, Particle, (0, 0), 'land')
 
+    def test_pool(self):
+        srf = Surface((5, 5))
+        get_img = Mock(side_effect=lambda directory, states: {state: [srf, srf] for state in states})
+        with patch('particle.get_img', get_img), patch('particle.load_flipped', Mock(return_value={'land': [1, 2]})):
+            self.assertRaises(ValueError, ParticlePool, -1)
+            pool = ParticlePool(size=1)
+            group = Group()
+            p1 = pool.get((0, 0), 'land')
+            p2 = pool.get((5, 5), 'land')
+            group.add(p1, p2)
+            self.assertIsNot(p1, p2)
+            self.assertIs(p1.states, pool.states)
+            get_img.assert_called_once()
+
+            p1.frame_index = 1.9
+            p1.update(0)
+            self.assertFalse(p1.alive())
+            self.assertEqual(pool.free, [p1])
+            pool.release(p2)
+            self.assertEqual(pool.free, [p1])
+
+            p3 = pool.get((10, 20), 'land', flipped=True)
+            self.assertIs(p3, p1)
+            self.assertEqual(pool.free, [])
+            self.assertEqual((p3.frame_index, p3.flipped_flag, p3.rect.topleft, p3.rect.size), (0, True, (10, 20),
+                                                                                                   (5, 5)))
+            pool.get((0, 0), 'jump')
+            self.assertEqual(get_img.call_count, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -101,11 +101,13 @@ class TestPlayer(unittest.TestCase):
 
         self.assertEqual(self.player.image.get_alpha(), 0)
         self.assertEqual(self.player.blinks, 1)
-        self.assertEqual(self.player.states['idle'][0].get_alpha(), 0)
+        # Images shared with other players stay opaque
+        self.assertEqual(self.player.states['idle'][0].get_alpha(), 255)
+        self.assertEqual(Player((0, 0)).image.get_alpha(), 255)
         self.player.update()
 
-        self.assertEqual(self.player.states['idle'][0].get_alpha(), 255)
         self.assertEqual(self.player.blinks, 2)
+        self.assertIs(self.player.image, self.player.states['idle'][0])
         self.assertEqual(self.player.image.get_alpha(), 255)
 
     def test_neat(self):
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+import csv
+import os
+import shutil
+import tempfile
+import pygame
+from profiler import FrameProfiler, PHASES, CSV_FIELDS
+from level import Level
+from player import Player
+from settings import *
+
+
+class TestProfiler(unittest.TestCase):
+    def test_frames(self):
+        self.assertRaises(ValueError, FrameProfiler, 0)
+        profiler = FrameProfiler(window=3, dump_interval=0)
+        for frame in range(5):
+            profiler.begin()
+            profiler.lap('background')
+            profiler.add('fov', frame / 1000)
+            profiler.end()
+        self.assertEqual(profiler.frames, 5)
+        self.assertEqual(list(profiler.durations['fov']), [0.002, 0.003, 0.004])
+        self.assertEqual(list(profiler.durations['drawing']), [0, 0, 0])
+        stats = profiler.stats()
+        self.assertEqual(set(stats), set(PHASES))
+        self.assertAlmostEqual(stats['fov']['mean_ms'], 3)
+        self.assertAlmostEqual(stats['fov']['max_ms'], 4)
+        counts, edges = profiler.histogram('fov', 2)
+        self.assertEqual(list(counts), [1, 2])
+        self.assertEqual(FrameProfiler().stats()['fov']['mean_ms'], 0)
+
+        surface = pygame.Surface((screen_width, screen_height))
+        profiler.draw(surface, (0, 0))
+        self.assertNotEqual(surface.get_bounding_rect().size, (0, 0))
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'profile.csv')
+        profiler = FrameProfiler(dump_interval=2, csv_path=path)
+        with patch('profiler.log') as log:
+            for _ in range(4):
+                profiler.begin()
+                profiler.end()
+        self.assertEqual(log.info.call_count, 2)
+        with open(path) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(tuple(rows[0]), CSV_FIELDS)
+        self.assertEqual(len(rows), 1 + 2 * len(PHASES))
+        self.assertEqual(rows[-1][1:3], ['4', 'fov'])
+
+    def test_level(self):
+        screen = pygame.display.set_mode((screen_width, screen_height))
+        player = Player((0, 0), neat=True)
+        level = Level(level_0, screen, player, None, neat=True, draw=False)
+        self.assertIsNone(level.profiler)
+        # Without profiler frames and FOV aren't timed at all
+        with patch('level.time.perf_counter') as perf_counter:
+            level.run()
+            level.nparray_to_list(player)
+            level.observe([player])
+        perf_counter.assert_not_called()
+        level.profiler = FrameProfiler(dump_interval=0)
+        for _ in range(3):
+            level.run()
+            level.nparray_to_list(player)
+        self.assertEqual(level.profiler.frames, 3)
+        for phase in PHASES:
+            self.assertEqual(len(level.profiler.durations[phase]), 3)
+        self.assertGreater(sum(level.profiler.durations['collisions']), 0)
+        self.assertGreater(level.profiler.current['fov'], 0)
+        pygame.display.quit()
+
+
+if __name__ == '__main__':
+    unittest.main()
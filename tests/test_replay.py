@@ -0,0 +1,107 @@
+import unittest
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from unittest.mock import patch
+import neat
+import pygame
+from game import Platformer
+from neat_game import Neat
+from brick_level import LevelBrick
+from player import Player
+from ui import UI
+from replay import Replay, ReplayPlayer, encode_keys, NO_INPUT
+from settings import *
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(pygame.display.quit)
+
+    def test_encode(self):
+        pygame.display.set_mode((screen_width, screen_height))
+        player = Player((0, 0), neat=True)
+        for decision in range(6):
+            player.make_decision(decision)
+            self.assertEqual(encode_keys(player.keys), decision)
+            player.restore_keys()
+        self.assertEqual(encode_keys({'left': True, 'right': True, 'up': False}), 3)
+
+    def test_save(self):
+        self.assertRaises(ValueError, Replay, 'watch', level_0)
+        self.assertRaises(ValueError, Replay, 'multiple', level_0, 0)
+        replay = Replay('multiple', level_0, 3, seed=5, config=CONFIG_MULTIPLE_DIR, generation=2)
+        replay.record([0, 0, 0])
+        replay.record([1, NO_INPUT, 4])
+        self.assertEqual(replay.inputs.tolist(), [[0, 0, 0], [1, NO_INPUT, 4]])
+        replay.record([2, NO_INPUT, 5])
+        path = os.path.join(self.directory, 'replays', 'replay.npz')
+        replay.save(path)
+        loaded = Replay.load(path)
+        self.assertEqual(loaded.inputs.tolist(), replay.inputs.tolist())
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(loaded.metadata(), replay.metadata())
+        self.assertEqual(loaded.level, 0)
+
+    def test_training(self):
+        with patch('game.pygame.time.Clock'):
+            game = Platformer(headless=True)
+            genome_id, genome = next(iter(neat.Population(Neat.config).population.items()))
+            genome.fitness = 0
+            game.train_ai(genome, Neat.config, genome_id, 1)
+            path = os.path.join(self.directory, 'single.npz')
+            game.replay.save(path)
+            replay = Replay.load(path)
+            self.assertEqual(replay.info['fitness'], genome.fitness)
+            self.assertEqual(replay.inputs[0, 0], 0)
+            player = ReplayPlayer(replay)
+            self.assertTrue(player.verify())
+            self.assertEqual(player.results[0]['frame'], game.frame)
+            # Seeking backwards resets level to captured state and simulates the same frames again
+            results = dict(player.results)
+            player.seek(len(player) // 2)
+            self.assertEqual(player.frame, len(player) // 2)
+            self.assertEqual(player.results, {})
+            player.seek(len(player))
+            self.assertEqual(player.results, results)
+
+            genomes = list(neat.Population(Neat.config_multiple).population.items())[:10]
+            game.train_ai_multiple(genomes, Neat.config_multiple, 1)
+            self.assertEqual(game.replay.players, len(genomes))
+            self.assertIn(NO_INPUT, game.replay.inputs)
+            self.assertTrue(ReplayPlayer(game.replay).verify())
+
+    def test_play(self):
+        screen = pygame.display.set_mode((screen_width, screen_height))
+        pygame.mixer.init()
+        self.addCleanup(pygame.mixer.quit)
+        player = Player((0, 0))
+        player.lives = 2
+        ui = UI(screen, player)
+        brick = LevelBrick('level_0', (0, 0), level_0)
+
+        def get_pressed():
+            frame = brick.associated_level.clock.frame if brick.associated_level else 0
+            pressed = defaultdict(bool)
+            pressed[pygame.K_RIGHT] = True
+            pressed[pygame.K_UP] = frame % 40 < 20
+            return pressed
+        with patch('brick_level.REPLAY_DIR', self.directory), patch('replay.REPLAY_DIR', self.directory), \
+                patch('pygame.key.get_pressed', get_pressed):
+            for _ in range(3000):
+                brick.run_level(screen, player, ui)
+                if brick.replay is None:
+                    break
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        replay = Replay.load(os.path.join(self.directory, files[0]))
+        self.assertEqual(replay.mode, 'play')
+        self.assertEqual(replay.info['player']['lives'], 2)
+        self.assertTrue(ReplayPlayer(replay).verify())
+
+
+if __name__ == '__main__':
+    unittest.main()
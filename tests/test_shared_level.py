@@ -0,0 +1,99 @@
+import unittest
+import os
+import multiprocessing
+import random
+import neat
+import numpy
+import pygame
+from unittest.mock import patch
+from game import Platformer
+from level import Level
+from level_compiler import CompiledLevel, level_key, shared_levels
+from player import Player
+from shared_level import SharedLevels, attach, detach
+from neat_game import Neat
+from settings import *
+
+
+def attached_levels():
+    """
+    Keys of levels attached in worker process and whether their grids are views of shared memory
+    """
+    return {key: not compiled.grids.flags.owndata for key, compiled in shared_levels.items()}
+
+
+class TestSharedLevel(unittest.TestCase):
+    def setUp(self):
+        self.screen = pygame.display.set_mode((screen_width, screen_height))
+        self.addCleanup(pygame.display.quit)
+
+    def create(self):
+        return Level(level_0, self.screen, Player((0, 0), neat=True), None, neat=True, draw=False)
+
+    def test_attach(self):
+        eager = self.create()
+        with SharedLevels([level_0]) as shared:
+            attach(shared.handles)
+            self.addCleanup(detach)
+            compiled = CompiledLevel.load(level_0)
+            self.assertIs(compiled, shared_levels[level_key(level_0)])
+            self.assertFalse(compiled.grids.flags.writeable)
+            level = self.create()
+            shared_layers = {code: {residue: layer.copy() for residue, layer in residues.items()}
+                             for code, residues in compiled.fov_layers.items()}
+
+            for frame in range(600):
+                keys = {'right': True, 'left': False, 'up': frame % 30 < 15}
+                for current in (eager, level):
+                    current.run()
+                    current.player.keys = dict(keys)
+                self.assertEqual(level.player.rect, eager.player.rect)
+                if eager.check_defeat(eager.player):
+                    break
+                numpy.testing.assert_array_equal(level.fov(level.player), eager.fov(eager.player))
+            self.assertGreater(eager.player.coins, 0)
+            self.assertEqual(level.player.coins, eager.player.coins)
+            # Collected coins changed only the copies of shared layers
+            for code, residues in shared_layers.items():
+                for residue, layer in residues.items():
+                    numpy.testing.assert_array_equal(compiled.fov_layers[code][residue], layer)
+            detach()
+            self.assertIsNone(CompiledLevel.load(level_0).fov_layers)
+
+    def test_train_ai(self):
+        self.addCleanup(random.setstate, random.getstate())
+        with SharedLevels([level_0]) as shared:
+            attach(shared.handles)
+            self.addCleanup(detach)
+            compiled = CompiledLevel.load(level_0)
+            with patch('game.pygame.time.Clock'):
+                game = Platformer(headless=True)
+            for genome_id, genome in list(neat.Population(Neat.config).population.items())[:2]:
+                genome.fitness = 0
+                game.train_ai(genome, Neat.config, genome_id, 1)
+            # Resetting the level copies only layers changed by collected coins, the rest stay in shared memory
+            layers = game.training_level.fov_grid.layers
+            shared_layers = [(code, residue) for code, residues in compiled.fov_layers.items() for residue in residues
+                             if layers[code][residue] is compiled.fov_layers[code][residue]]
+            self.assertGreater(len(shared_layers), 0)
+
+    def test_no_display(self):
+        # Publishing levels doesn't leave process without a window on dummy driver
+        pygame.display.quit()
+        with patch.dict(os.environ):
+            os.environ.pop('SDL_VIDEODRIVER', None)
+            with SharedLevels([level_0]) as shared:
+                self.assertEqual(len(shared.handles), 1)
+            self.assertNotIn('SDL_VIDEODRIVER', os.environ)
+        self.assertFalse(pygame.display.get_init())
+
+    def test_workers(self):
+        with SharedLevels() as shared:
+            self.assertEqual(len(shared.handles), len(levels))
+            with multiprocessing.get_context('spawn').Pool(2, attach, (shared.handles,)) as pool:
+                attached = pool.apply(attached_levels)
+        self.assertEqual(attached, {level_key(level_data): True for level_data in levels})
+
+
+if __name__ == '__main__':
+    unittest.main()
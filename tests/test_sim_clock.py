@@ -0,0 +1,19 @@
+import unittest
+from sim_clock import SimClock
+
+
+class TestSimClock(unittest.TestCase):
+    def test_ticks(self):
+        self.assertRaises(ValueError, SimClock, 0)
+        clock = SimClock(60)
+        self.assertEqual(clock.get_ticks(), 0)
+        for _ in range(90):
+            clock.tick()
+        self.assertEqual(clock.frame, 90)
+        self.assertEqual(clock.get_ticks(), 1500)
+        clock.reset()
+        self.assertEqual(clock.get_ticks(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import pygame
+import utils
+from text_cache import TextCache, get_font
+
+
+class TestTextCache(unittest.TestCase):
+    def setUp(self):
+        utils.clear_cache()
+        self.addCleanup(utils.clear_cache)
+        self.font = get_font('Arial', 30)
+
+    def test_font(self):
+        self.assertIs(get_font('Arial', 30), self.font)
+        self.assertIsNot(get_font('Arial', 40), self.font)
+
+    def test_render(self):
+        self.assertRaises(ValueError, TextCache, 0)
+        cache = TextCache(2)
+        surface = cache.render(self.font, 10, 'red')
+        self.assertIs(cache.render(self.font, '10', 'red'), surface)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(surface.get_size(), self.font.render('10', True, 'red').get_size())
+        self.assertIsNot(cache.render(self.font, 10, 'black'), surface)
+        self.font.bold = True
+        self.addCleanup(setattr, self.font, 'bold', False)
+        bold = cache.render(self.font, 10, 'red')
+        self.assertIsNot(bold, surface)
+        self.assertEqual(len(cache.surfaces), 2)
+        self.assertIs(cache.render(self.font, 10, 'red'), bold)
+        self.font.bold = False
+        self.assertIsNot(cache.render(self.font, 10, 'red'), surface)
+        self.assertEqual(cache.misses, 4)
+
+        cache.clear()
+        self.assertEqual((len(cache.surfaces), cache.hits, cache.misses), (0, 0, 0))
+        cache.render(self.font, 1, pygame.Color('red'))
+        self.assertEqual(len(cache.surfaces), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
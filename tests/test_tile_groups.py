@@ -0,0 +1,75 @@
+import unittest
+import pygame
+import utils
+from tiles import Tile, StaticTile
+from tile_groups import TileGroup, StaticTileGroup, BakedLayer, spritecollide
+from settings import *
+
+
+class TestTileGroups(unittest.TestCase):
+    def setUp(self):
+        utils.clear_cache()
+        self.addCleanup(utils.clear_cache)
+        self.tiles = [Tile(tile_size, (column * tile_size, 0)) for column in range(100)]
+        self.wide = Tile(3 * tile_size, ((screen_width // tile_size + 1) * tile_size, tile_size))
+
+    def test_visible(self):
+        group = StaticTileGroup(self.tiles, self.wide)
+        columns = screen_width // tile_size
+        self.assertEqual(group.visible(0), self.tiles[:columns + 1])
+        self.assertEqual(group.visible(-tile_size * 10), self.tiles[10:columns + 11] + [self.wide])
+        # Wide tile is still seen while its right part is on the screen
+        self.assertIn(self.wide, group.visible(-self.wide.rect.right + 1))
+        self.assertNotIn(self.wide, group.visible(-self.wide.rect.right))
+        self.assertEqual(group.visible(-tile_size * 10), TileGroup(self.tiles, self.wide).visible(-tile_size * 10))
+
+        self.tiles[15].kill()
+        self.assertNotIn(self.tiles[15], group.visible(-tile_size * 10))
+        group.add(self.tiles[15])
+        self.assertIn(self.tiles[15], group.visible(-tile_size * 10))
+
+    def test_collide(self):
+        group = StaticTileGroup(self.tiles, self.wide)
+        probe = Tile(50, (0, 0))
+        for x, y in ((0, 0), (100, 30), (screen_width - 20, 40), (screen_width + 70, 70), (-200, 0), (500, 500)):
+            probe.rect.topleft = (x, y)
+            self.assertEqual(spritecollide(probe, group), pygame.sprite.spritecollide(probe, group, False))
+        probe.rect.topleft = (tile_size * 2 - 10, 10)
+        collided = spritecollide(probe, group, dokill=True)
+        self.assertEqual(collided, self.tiles[1:3])
+        self.assertFalse(collided[0].alive())
+        self.assertEqual(spritecollide(probe, group), [])
+
+    def test_draw(self):
+        surface = pygame.Surface((screen_width, screen_height))
+        # Tiles without image share one blank image, so tile gets its own
+        self.tiles[3].image = self.tiles[3].image.copy()
+        self.tiles[3].image.fill('red')
+        StaticTileGroup(self.tiles).draw_visible(surface, -tile_size)
+        self.assertEqual(surface.get_at((2 * tile_size + 1, 1)), pygame.Color('red'))
+
+    def test_baked(self):
+        colors = ('red', 'green', 'blue')
+        tiles = []
+        for column in range(0, 60, 3):
+            image = pygame.Surface((tile_size * 2, tile_size), pygame.SRCALPHA)
+            image.fill(colors[column % 3])
+            image.fill((0, 0, 0, 0), (0, 0, tile_size, tile_size // 2))
+            tiles.append(StaticTile(tile_size, (column * tile_size, (column % 5) * tile_size), image))
+        group = StaticTileGroup(tiles)
+        layer = BakedLayer([group])
+        lazy = BakedLayer([group], lazy=True)
+        self.assertEqual(lazy.chunks, {})
+        for offset in (0, -tile_size * 10 - 7, -screen_width, 100, -screen_width * 5):
+            baked, drawn = pygame.Surface((screen_width, screen_height)), pygame.Surface((screen_width, screen_height))
+            layer.draw(baked, offset)
+            group.draw_visible(drawn, offset)
+            self.assertEqual(pygame.image.tostring(baked, 'RGB'), pygame.image.tostring(drawn, 'RGB'))
+            lazy.draw(drawn, offset)
+            self.assertEqual(pygame.image.tostring(baked, 'RGB'), pygame.image.tostring(drawn, 'RGB'))
+        self.assertEqual(set(lazy.chunks), {5})
+        self.assertIsNone(lazy.chunks[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,7 @@
 import unittest
+import subprocess
+import sys
+import os
 from unittest.mock import patch, Mock
 import tiles
 from settings import ANIMATION_SPEED, ENEMY_SPEED
@@ -6,6 +9,20 @@ from pygame import Surface
 
 
 class TestTiles(unittest.TestCase):
+    def test_lazy_images(self):
+        code = ("import sys, pygame, level\n"
+                "assert pygame.display.get_surface() is None and 'PIL' not in sys.modules\n"
+                "assert level.CoinTile.images is not None and pygame.display.get_surface() is not None")
+        result = subprocess.run([sys.executable, '-c', code], env={**os.environ, 'SDL_VIDEODRIVER': 'dummy'},
+                                capture_output=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        lazy = tiles.CoinTile.__dict__['images']
+        with patch.object(lazy, 'images', None), patch.object(lazy, 'loader', Mock(return_value=[1, 2])) as loader:
+            self.assertEqual(tiles.CoinTile.images, [1, 2])
+            self.assertIs(tiles.CoinTile.images, tiles.CoinTile.images)
+            loader.assert_called_once()
+        self.assertIsNot(tiles.CoinTile.images, loader.return_value)
+
     def test_tile(self):
         self.assertRaises(ValueError, tiles.Tile, -1, (10, 10))
         tile = tiles.Tile(1, (0, 0))
@@ -6,6 +6,10 @@ from unittest.mock import Mock
 
 
 class TestUtils(unittest.TestCase):
+    def setUp(self):
+        utils.clear_cache()
+        self.addCleanup(utils.clear_cache)
+
     def test_get_img(self):
         self.assertRaises(TypeError, utils.get_img, '', 123)
         with patch('utils.pygame.image.load'):
@@ -28,6 +32,24 @@ class TestUtils(unittest.TestCase):
         self.assertRaises(TypeError, utils.load_flipped, {'idle': 1})
         self.assertRaises(TypeError, utils.load_flipped, {'idle': [1,]})
 
+    def test_cache(self):
+        with patch('utils.pygame.image.load') as load:
+            load.side_effect = lambda path: Mock()
+            first = utils.load_image('image.png')
+            self.assertIs(utils.load_image('image.png'), first)
+            utils.load_image('image.png', alpha=False)
+            self.assertEqual(load.call_count, 2)
+            states = utils.get_img("tests/test_img_states", ['idle'])
+            states['idle'].clear()
+            self.assertEqual(len(utils.get_img("tests/test_img_states", ['idle'])['idle']), 1)
+            self.assertEqual(load.call_count, 3)
+            utils.clear_cache()
+            self.assertIsNot(utils.load_image('image.png'), first)
+
+        surface = pygame.Surface((2, 2))
+        flipped = utils.load_flipped({'idle': [surface]})
+        self.assertIs(utils.load_flipped({'idle': [surface]})['idle'][0], flipped['idle'][0])
+
 
 if __name__ == '__main__':
     unittest.main()
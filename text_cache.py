@@ -0,0 +1,78 @@
+from collections import OrderedDict
+import pygame
+import utils
+from settings import *
+
+
+def get_font(name, size, system=True):
+    """
+    Get font shared by all screens, every font is created once
+    :param name: name of system font or path to font file
+    :param size: font size
+    :param system: whether font is system font or loaded from file
+    :return: pygame font
+    """
+    def load():
+        pygame.font.init()
+        return pygame.font.SysFont(name, size) if system else pygame.font.Font(name, size)
+    return utils.cached(('font', name, size, system), load)
+
+
+class TextCache:
+    """
+    Cache of rendered text surfaces with LRU eviction. Text which doesn't change between frames (labels, counters,
+    NEAT info) is rendered once, surfaces are shared, so they should only be blitted and never modified.
+    """
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        """
+        surfaces - rendered surfaces from least to most recently used
+        hits, misses - cache statistics
+        :param size: maximum number of kept surfaces
+        """
+        if not isinstance(size, int) or size < 1:
+            raise ValueError(f'Text cache size should be positive integer, not {size}')
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """
+        Get rendered text, rendering it only if it isn't cached
+        :param font: pygame font, its style (bold, italic, underline) is part of the key
+        :param text: text or value to render, non strings are converted with str
+        :param color: color name or tuple
+        :param antialias: whether text is antialiased
+        :return: surface with text
+        """
+        text = str(text)
+        if not isinstance(color, (str, tuple)):
+            color = tuple(color)
+        key = (font, font.bold, font.italic, font.underline, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Cache shared by all screens
+text_cache = TextCache()
+
+
+def render(font, text, color, antialias=True):
+    """
+    Render text through shared cache, see TextCache.render
+    """
+    return text_cache.render(font, text, color, antialias)
@@ -0,0 +1,211 @@
+import pygame
+from settings import *
+
+
+class TileGroup(pygame.sprite.Group):
+    """
+    Sprite group for tiles kept in level coordinates. Tiles are drawn moved by camera offset, tiles outside of the
+    screen are skipped.
+    """
+    def draw_visible(self, surface, offset):
+        """
+        Draw tiles seen by the camera
+        :param surface: surface to draw on
+        :param offset: camera offset, tile with X coordinate x is drawn at x + offset
+        """
+        surface.blits([(sprite.image, sprite.rect.move(offset, 0)) for sprite in self.visible(offset)],
+                      doreturn=False)
+
+    def visible(self, offset):
+        """
+        Get tiles seen by the camera
+        :param offset: camera offset
+        :return: list of tiles in the order they were added
+        """
+        return [sprite for sprite in self.sprites()
+                if -sprite.image.get_width() < sprite.rect.x + offset < screen_width]
+
+
+class StaticTileGroup(TileGroup):
+    """
+    Sprite group for tiles that never move. Tiles are indexed by columns and cells (column and row) of the level
+    they cover, so drawing processes only tiles in columns seen by the camera and collision checks test only tiles
+    in cells the colliding sprite overlaps, no matter how long the level is. Index is built on the first query
+    after adding tiles.
+    """
+    def __init__(self, *sprites):
+        """
+        columns - tiles covering each column of the level, None if index should be rebuilt
+        cells - tiles covering each (column, row) cell of the level
+        order - order the tile was added in, columns and cells it was indexed by for every tile
+        """
+        self.columns = None
+        self.cells = {}
+        self.order = {}
+        super().__init__(*sprites)
+
+    @staticmethod
+    def span(start, end):
+        """
+        Get tile columns or rows covered by pixels [start, end)
+        """
+        return range(start // tile_size, max(start, end - 1) // tile_size + 1)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite)
+        self.columns = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if self.columns is not None:
+            index, columns, cells = self.order.pop(sprite)
+            for column in columns:
+                self.columns[column].remove(sprite)
+            for cell in cells:
+                self.cells[cell].remove(sprite)
+
+    def build_index(self):
+        """
+        Index tiles by columns and cells they cover
+        """
+        self.columns = {}
+        self.cells = {}
+        self.order = {}
+        for index, sprite in enumerate(self.sprites()):
+            rect = sprite.rect
+            columns = self.span(rect.left, rect.right)
+            cells = [(column, row) for column in columns for row in self.span(rect.top, rect.bottom)]
+            for column in columns:
+                self.columns.setdefault(column, []).append(sprite)
+            for cell in cells:
+                self.cells.setdefault(cell, []).append(sprite)
+            self.order[sprite] = index, columns, cells
+
+    def sort(self, sprites):
+        """
+        Sort tiles in the order they were added, which is the order pygame iterates over the group
+        """
+        return sorted(sprites, key=lambda sprite: self.order[sprite][0])
+
+    def visible(self, offset):
+        """
+        Get tiles seen by the camera
+        :param offset: camera offset
+        :return: list of tiles in the order they were added
+        """
+        offset = int(offset)
+        return self.overlapping(-offset, screen_width - offset)
+
+    def overlapping(self, left, right):
+        """
+        Get tiles in columns covered by level pixels [left, right)
+        :return: list of tiles in the order they were added
+        """
+        if self.columns is None:
+            self.build_index()
+        return self.sort({sprite for column in self.span(left, right) for sprite in self.columns.get(column, ())})
+
+    def collide(self, sprite):
+        """
+        Get tiles colliding with the sprite, same as pygame.sprite.spritecollide
+        :param sprite: sprite in level coordinates
+        :return: list of tiles in the order they were added
+        """
+        if self.columns is None:
+            self.build_index()
+        rect = sprite.rect
+        candidates = {tile for column in self.span(rect.left, rect.right) for row in self.span(rect.top, rect.bottom)
+                      for tile in self.cells.get((column, row), ())}
+        return self.sort(tile for tile in candidates if rect.colliderect(tile.rect))
+
+
+def spritecollide(sprite, group, dokill=False):
+    """
+    Find tiles in a group that collide with the sprite. Static tile groups are queried through their spatial index,
+    other groups are checked tile by tile with pygame.sprite.spritecollide.
+    :param sprite: sprite to check
+    :param group: group of tiles
+    :param dokill: whether to remove collided tiles from all groups
+    :return: list of collided tiles
+    """
+    if not isinstance(group, StaticTileGroup):
+        return pygame.sprite.spritecollide(sprite, group, dokill)
+    collided = group.collide(sprite)
+    if dokill:
+        for tile in collided:
+            tile.kill()
+    return collided
+
+
+class BakedLayer:
+    """
+    Tiles of static groups pre-composited into chunks one screen wide, so drawing them takes one or two blits per
+    frame no matter how many tiles there are. Chunks are baked once, layer has to be created anew if tiles of the
+    groups change.
+    Lazy layer bakes chunks from tiles of StaticTileGroups when they are drawn for the first time and drops chunks
+    the camera has left, so it can be used with streamed levels, where groups hold only tiles around the camera.
+    """
+    def __init__(self, groups, chunk_width=screen_width, height=screen_height, lazy=False):
+        """
+        chunks - surface for every chunk index, chunk with index i covers level pixels [i * chunk_width,
+        (i + 1) * chunk_width), None for baked chunks without tiles
+        :param groups: tile groups in order of drawing
+        :param chunk_width: width of one chunk in pixels
+        :param height: height of chunks, tiles below it are cut off
+        :param lazy: whether to bake chunks only when they are drawn
+        """
+        self.groups = groups
+        self.chunk_width = chunk_width
+        self.height = height
+        self.lazy = lazy
+        self.chunks = {}
+        if lazy:
+            return
+        for group in groups:
+            for sprite in group.sprites():
+                left = sprite.rect.x
+                right = left + sprite.image.get_width()
+                for index in range(left // chunk_width, (right - 1) // chunk_width + 1):
+                    chunk = self.chunks.get(index)
+                    if chunk is None:
+                        chunk = self.chunks[index] = pygame.Surface((chunk_width, height), pygame.SRCALPHA)
+                    chunk.blit(sprite.image, (left - index * chunk_width, sprite.rect.y))
+        # Chunks are mostly transparent, run-length encoding lets blits skip transparent runs
+        for chunk in self.chunks.values():
+            chunk.set_alpha(255, pygame.RLEACCEL)
+
+    def bake(self, index):
+        """
+        Bake single chunk from tiles of the groups covering it
+        :param index: index of the chunk
+        :return: surface of the chunk, None if there are no tiles in it
+        """
+        left = index * self.chunk_width
+        chunk = None
+        for group in self.groups:
+            for sprite in group.overlapping(left, left + self.chunk_width):
+                if chunk is None:
+                    chunk = pygame.Surface((self.chunk_width, self.height), pygame.SRCALPHA)
+                chunk.blit(sprite.image, (sprite.rect.x - left, sprite.rect.y))
+        if chunk is not None:
+            chunk.set_alpha(255, pygame.RLEACCEL)
+        return chunk
+
+    def draw(self, surface, offset):
+        """
+        Draw chunks seen by the camera
+        :param surface: surface to draw on
+        :param offset: camera offset, chunk starting at level X coordinate x is drawn at x + offset
+        """
+        offset = int(offset)
+        first, last = -offset // self.chunk_width, (screen_width - 1 - offset) // self.chunk_width
+        if self.lazy:
+            for index in [index for index in self.chunks if not first - 1 <= index <= last + 1]:
+                del self.chunks[index]
+            for index in range(first, last + 1):
+                if index not in self.chunks:
+                    self.chunks[index] = self.bake(index)
+        for index in range(first, last + 1):
+            chunk = self.chunks.get(index)
+            if chunk is not None:
+                surface.blit(chunk, (index * self.chunk_width + offset, 0))
@@ -1,45 +1,77 @@
 import pygame
 from settings import *
-from utils import get_tile_img
+from utils import get_tile_img, cached, init_display
 
 
 def get_coin_images():
     """
-    Function to load animated images once for every tile
+    Function to load animated images once for every tile. Images are loaded on first use and cached.
     :return:
     """
-    pygame.display.set_mode((screen_width, screen_height))
+    init_display()
     coin_tile_images = get_tile_img(COINS_DIR)
     return coin_tile_images
 
 
 def get_enemy_images():
     """
-    Function to load animated images once for every tile
+    Function to load animated images once for every tile. Images are loaded on first use and cached.
     :return:
     """
-    pygame.display.set_mode((screen_width, screen_height))
+    init_display()
     enemy_tile_images = get_tile_img(ENEMY_DIR)
     return enemy_tile_images
 
 
+class LazyImages:
+    """
+    Class attribute with images, which are loaded only when accessed for the first time instead of when module
+    is imported. Loaded images are kept and returned by later accesses.
+    """
+    def __init__(self, loader):
+        """
+        images - loaded images, None until the first access
+        :param loader: function loading images
+        """
+        self.loader = loader
+        self.images = None
+
+    def __get__(self, instance, owner):
+        if self.images is None:
+            self.images = self.loader()
+        return self.images
+
+
+def get_blank_image(size):
+    """
+    Get white square image for tiles without their own image, one image is shared by all tiles of the same size
+    :param size: size of the square
+    :return:
+    """
+    def create():
+        image = pygame.Surface((size, size))
+        image.fill('white')
+        return image
+    return cached(('blank tile', size), create)
+
+
 class Tile(pygame.sprite.Sprite):
     """
     Class for creating sprites of tiles
     """
-    def __init__(self, size, pos):
+    def __init__(self, size, pos, img=None):
         """
         :param size: size of a tile
         :param pos: position of a tile
+        :param img: image of a tile, white square if not given
         """
         super().__init__()
         if size < 0:
             raise ValueError('Size of the tile cannot be less than 0.')
-        self.image = pygame.Surface((size, size))
-        self.image.fill('white')
-        self.rect = self.image.get_rect(topleft=pos)
+        self.image = get_blank_image(size) if img is None else img
+        self.rect = pygame.Rect(pos, (size, size))
 
-    def update(self, x_shift):
+    def update(self, x_shift=0):
         """
         Method for updating tiles position if camera moves.
         :param x_shift: speed of camera movement
@@ -65,7 +97,7 @@ class WideTile(pygame.sprite.Sprite):
         self.image.fill('white')
         self.rect = self.image.get_rect(topleft=pos)
 
-    def update(self, x_shift):
+    def update(self, x_shift=0):
         """
         Method for updating tiles position if camera moves.
         :param x_shift: speed of camera movement
@@ -79,8 +111,7 @@ class TerrainTile(Tile):
     Class for terrain tiles with image
     """
     def __init__(self, size, pos, img):
-        super().__init__(size, pos)
-        self.image = img
+        super().__init__(size, pos, img)
 
 
 class StaticTile(Tile):
@@ -88,8 +119,7 @@ class StaticTile(Tile):
     Class for static tiles with repositioning
     """
     def __init__(self, size, pos, img):
-        super().__init__(size, pos)
-        self.image = img
+        super().__init__(size, pos, img)
         x, y = pos
         self.rect = self.image.get_rect(bottomleft=(x, y+size))
 
@@ -112,8 +142,7 @@ class AnimatedTile(Tile):
     Class for animated tiles
     """
     def __init__(self, size, pos, img):
-        super().__init__(size, pos)
-        self.image = img
+        super().__init__(size, pos, img)
         self.images = []
 
         # Animation parameters
@@ -129,7 +158,7 @@ class AnimatedTile(Tile):
             self.frame_index = 0
         self.image = self.images[int(self.frame_index)]
 
-    def update(self, x_shift):
+    def update(self, x_shift=0):
         super().update(x_shift)
         if self.animated:
             self.animate()
@@ -139,7 +168,7 @@ class CoinTile(AnimatedTile):
     """
     Class for animated coin tiles
     """
-    images = get_coin_images()
+    images = LazyImages(get_coin_images)
 
     def __init__(self, size, pos, img):
         super().__init__(size, pos, img)
@@ -159,7 +188,7 @@ class EnemyTile(AnimatedTile):
     Class for enemy tiles and animation
     We use a bit smaller rect for checking collisions to provide better visuals
     """
-    images = get_enemy_images()
+    images = LazyImages(get_enemy_images)
 
     def __init__(self, size, pos, img):
         """
@@ -190,7 +219,7 @@ class EnemyTile(AnimatedTile):
         if not isinstance(self.enemy_speed, int) and not isinstance(self.enemy_speed, float):
             raise TypeError(f'Enemy speed should be a number, not {type(self.enemy_speed)}')
 
-    def update(self, x_shift):
+    def update(self, x_shift=0):
         """
         Update enemy based on its speed and moving direction. Also deal with collision hitbox
         :param x_shift:
@@ -1,5 +1,6 @@
 import pygame
 from settings import *
+from text_cache import get_font, render
 
 
 class UI:
@@ -27,8 +28,7 @@ class UI:
         self.hp_color = HEALTH_BAR_COLOR
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.Font(UI_FONT_DIR, 30)
+        self.font = get_font(UI_FONT_DIR, 30, system=False)
         self.check_parameters()
 
     def check_parameters(self):
@@ -54,7 +54,7 @@ class UI:
         :return:
         """
         # Display number of coins
-        surf_coins = self.font.render(str(self.player.coins), True, 'black')
+        surf_coins = render(self.font, self.player.coins, 'black')
         coin_rect = surf_coins.get_rect(midleft=(self.coin_rect.right+5, self.coin_rect.centery))
         self.surface.blit(surf_coins, coin_rect)
 
@@ -2,6 +2,144 @@ from csv import reader
 import pygame
 from settings import *
 import os
+import weakref
+from contextlib import contextmanager
+
+# Dummy video driver has to be chosen before the display is initialized for the first time
+if HEADLESS_FLAG:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+
+def init_headless():
+    """
+    Initialize pygame for running without window and sound. Dummy video driver is used, so images can still be
+    loaded and converted, while mixer isn't initialized at all.
+    :return: surface to draw on
+    """
+    if pygame.display.get_init() and pygame.display.get_driver() != 'dummy':
+        pygame.display.quit()
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.init()
+    return pygame.display.set_mode((screen_width, screen_height))
+
+
+@contextmanager
+def environment(**variables):
+    """
+    Set environment variables for the duration of the block, previous values are restored afterwards
+    :param variables: values of variables by name
+    """
+    saved_env = {key: os.environ.get(key) for key in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                del os.environ[key]
+            else:
+                os.environ[key] = value
+
+
+def headless_environment():
+    """
+    Set environment variables of headless mode while worker processes are spawned, so that workers don't open window
+    or sound and run headless before any of the game modules are imported. Variables are restored afterwards.
+    """
+    return environment(PLATFORMER_HEADLESS='1', SDL_VIDEODRIVER='dummy')
+
+
+@contextmanager
+def display_surface():
+    """
+    Current display surface, or surface of dummy display opened for the duration of the block if nothing is
+    displayed, e.g. to build levels in a process which hasn't opened its window yet. Dummy display is closed and
+    video driver is restored afterwards, so the process can still open a window.
+    """
+    surface = pygame.display.get_surface()
+    if surface is not None:
+        yield surface
+        return
+    initialized = pygame.display.get_init()
+    pygame.display.quit()
+    try:
+        with environment(SDL_VIDEODRIVER='dummy'):
+            pygame.display.init()
+            yield pygame.display.set_mode((screen_width, screen_height))
+    finally:
+        pygame.display.quit()
+        if initialized:
+            pygame.display.init()
+
+
+def init_display():
+    """
+    Set video mode if it isn't set yet, images can't be converted without it
+    """
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((screen_width, screen_height))
+
+
+def load_sound(path, volume=None):
+    """
+    Load sound if mixer was initialized
+    :param path: path to sound file
+    :param volume: volume of the sound
+    :return: sound or None if running without mixer
+    """
+    if not pygame.mixer.get_init():
+        return None
+    sound = pygame.mixer.Sound(path)
+    if volume is not None:
+        sound.set_volume(volume)
+    return sound
+
+
+# Process-wide cache of loaded assets, keyed by kind of asset, path and transform
+asset_cache = dict()
+# Flipped versions of surfaces, entries disappear together with original surfaces
+flipped_cache = weakref.WeakKeyDictionary()
+
+
+def cached(key, loader):
+    """
+    Get asset from the cache, loading it on the first request
+    :param key: key of the asset, includes path and transform
+    :param loader: function without arguments that loads the asset
+    :return: cached asset
+    """
+    asset = asset_cache.get(key)
+    if asset is None:
+        asset = asset_cache[key] = loader()
+    return asset
+
+
+def clear_cache():
+    """
+    Forget all cached assets, e.g. after images on disk were changed
+    """
+    asset_cache.clear()
+    flipped_cache.clear()
+
+
+def load_image(path, alpha=True, flip=False, scale=None):
+    """
+    Load image through the asset cache. Cached surfaces are shared, so they shouldn't be changed in place.
+    :param path: path to image
+    :param alpha: whether to convert image with per pixel alpha or without it
+    :param flip: whether to flip image horizontally
+    :param scale: size to scale image to, None to keep original size
+    :return: surface with image
+    """
+    def loader():
+        image = pygame.image.load(path)
+        image = image.convert_alpha() if alpha else image.convert()
+        if scale is not None:
+            image = pygame.transform.scale(image, scale)
+        if flip:
+            image = pygame.transform.flip(image, True, False)
+        return image
+    return cached(('image', path, alpha, flip, scale), loader)
 
 
 def import_csv(path):
@@ -22,7 +160,14 @@ def import_tileset(path):
     :param path: path to look for a tileset
     :return: list of cut tiles from tileset, base on their position in tileset (first row, then column)
     """
-    surface = pygame.image.load(path).convert_alpha()
+    return list(cached(('tileset', path), lambda: cut_tileset(path)))
+
+
+def cut_tileset(path):
+    """
+    Cut tileset without using the cache
+    """
+    surface = load_image(path)
     tile_num_x = surface.get_size()[0] // tile_size
     tile_num_y = surface.get_size()[1] // tile_size
 
@@ -50,19 +195,26 @@ def get_img(img_dir, states):
         raise TypeError("States should be dictionary, tuple or list.")
     new_states = dict()
     for state in states:
-        new_states[state] = []
-        state_path = os.path.join(img_dir, state)
-        for file in os.listdir(state_path):
-            if file.lower().find(state) != -1:
-                path = os.path.join(state_path, file)
-                img_load = pygame.image.load(path).convert_alpha()
-                new_states[state].append(img_load)
+        new_states[state] = list(cached(('state', img_dir, state), lambda: load_state(img_dir, state)))
     return new_states
 
 
+def load_state(img_dir, state):
+    """
+    Load images for one state without using the cache for directory listing
+    """
+    images = []
+    state_path = os.path.join(img_dir, state)
+    for file in os.listdir(state_path):
+        if file.lower().find(state) != -1:
+            images.append(load_image(os.path.join(state_path, file)))
+    return images
+
+
 def load_flipped(states):
     """
-    Function for pre-generating flipped images to gain additional performance speed
+    Function for pre-generating flipped images to gain additional performance speed.
+    Flipped images are cached, so same surfaces are flipped only once.
     :param states: dict with states and images
     :return:
     """
@@ -79,7 +231,9 @@ def load_flipped(states):
             raise TypeError("States should contain list as values.")
         for item in value:
             try:
-                flip = pygame.transform.flip(item, True, False)
+                flip = flipped_cache.get(item)
+                if flip is None:
+                    flip = flipped_cache[item] = pygame.transform.flip(item, True, False)
             except TypeError:
                 raise TypeError(f"{item} should be surface object, not {type(item)}")
             flipped[key].append(flip)
@@ -92,9 +246,5 @@ def get_tile_img(img_dir):
     :param img_dir: image directory
     :return: list of images from given directory
     """
-    images = []
-    for file in os.listdir(img_dir):
-        path = os.path.join(img_dir, file)
-        img_load = pygame.image.load(path).convert_alpha()
-        images.append(img_load)
-    return images
+    return list(cached(('tile images', img_dir),
+                       lambda: [load_image(os.path.join(img_dir, file)) for file in os.listdir(img_dir)]))
@@ -1,6 +1,8 @@
 import pygame
 from settings import *
 from highscore import HighScore
+from dirty_rects import DirtyRects
+from text_cache import get_font, render
 
 
 class Victory:
@@ -13,10 +15,10 @@ class Victory:
         self.name = str()
         self.to_highscore = False
         self.highscore = HighScore(self.surface)
+        self.dirty = DirtyRects()
 
         # Font
-        pygame.font.init()
-        self.font = pygame.font.SysFont("Arial", 60)
+        self.font = get_font("Arial", 60)
 
     def check_inputs(self, events):
         """
@@ -33,37 +35,57 @@ class Victory:
                 elif 65 <= event.key <= 122:
                     self.name += chr(event.key)
 
+    def text_rect(self, text, **position):
+        """
+        Get rect text will take when rendered
+        :param text: text to render
+        :param position: position of the rect, e.g. midtop=(x, y)
+        """
+        rect = pygame.Rect((0, 0), self.font.size(text))
+        for name, value in position.items():
+            setattr(rect, name, value)
+        return rect
+
+    def layout(self):
+        """
+        Get texts of the message and their rects
+        :return: list of (text, rect)
+        """
+        won_rect = self.text_rect("YOU WON!", midtop=(screen_width / 2, screen_height / 5))
+        name_rect = self.text_rect("Your name:", midtop=(won_rect.left - 20, won_rect.bottom + 30))
+        input_rect = self.text_rect(self.name, topleft=(name_rect.right + 10, won_rect.bottom + 30))
+        highscore_text = "Press ENTER to proceed to High scores."
+        highscore_rect = self.text_rect(highscore_text, midtop=(won_rect.centerx, name_rect.bottom + 300))
+        return [("YOU WON!", won_rect), ("Your name:", name_rect), (self.name, input_rect),
+                (highscore_text, highscore_rect)]
+
     def display_message(self):
         """
         Displays text on screen
         :return:
         """
-        # Message
-        surf_won = self.font.render("YOU WON!", True, "red")
-        won_rect = surf_won.get_rect(midtop=(screen_width / 2, screen_height / 5))
-        surf_name = self.font.render("Your name:", True, "red")
-        name_rect = surf_name.get_rect(midtop=(won_rect.left - 20, won_rect.bottom + 30))
-
-        # Name input
-        surf_input = self.font.render(self.name, True, "red")
-
-        # High score
-        surf_highscore = self.font.render("Press ENTER to proceed to High scores.", True, "red")
-        highscore_rect = surf_highscore.get_rect(midtop=(won_rect.centerx, name_rect.bottom + 300))
-
-        self.surface.blit(surf_won, won_rect)
-        self.surface.blit(surf_name, name_rect)
-        self.surface.blit(surf_input, (name_rect.right + 10, won_rect.bottom + 30))
-        self.surface.blit(surf_highscore, highscore_rect)
+        self.surface.fill("grey")
+        for text, rect in self.layout():
+            self.surface.blit(render(self.font, text, "red"), rect)
 
     def draw(self, events):
         """
-        Displays end-game message with player's statistics or goes to high scores
+        Displays end-game message with player's statistics or goes to high scores.
+        Message is redrawn only where it changed, e.g. where name is typed.
         :return:
         """
         if self.to_highscore:
             self.highscore.draw()
         else:
             self.check_inputs(events)
-            self.surface.fill("grey")
-            self.display_message()
+            self.dirty.add(self.dirty.screen, 'background')
+            for text, rect in self.layout():
+                self.dirty.add(rect, text)
+            self.dirty.collect()
+            self.dirty.redraw(self.surface, self.display_message)
+
+    def updated_rects(self):
+        """
+        Rects of the screen changed by last drawn frame
+        """
+        return self.highscore.dirty.rects if self.to_highscore else self.dirty.rects